@@ -10,21 +10,40 @@ import os
 import glob
 import re
 import shutil
+import time
 import argparse
 from datetime import datetime, timedelta
 from pathlib import Path
 import sys
 from typing import Dict, List, Tuple, Optional
 import json
+import copy
 import calendar
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the current directory to the path to ensure we can import from tools
 sys.path.append('.')
-from tools.llm_api import query_llm
-
-# Import do512_scraper functionality
-import do512_scraper
+from tools.llm_api import query_llm, get_rate_limiter, get_client_stats, get_llm_client, build_request
+from tools.batch_api import (BatchJobStore, submit_batch, refresh_job, read_batch_results, result_content,
+                             track_batch_usage, TERMINAL_STATES)
+from tools.hedging import get_request_hedger, HEDGE_PROVIDER_ENV_VAR
+from tools.token_tracker import get_token_tracker
+from tools.extraction_cache import ExtractionCache, hash_file, fingerprint_text
+from tools.image_hash import NearDuplicateIndex, dhash
+from tools.extraction_journal import ExtractionJournal
+from tools.response_parser import parse_activities_response, load_json_response
+from tools.activity_schema import ACTIVITY_RESPONSE_SCHEMA, BATCH_RESPONSE_SCHEMA, validate_activities
+from tools.raw_store import get_raw_store
+from tools.activity_store import ActivityStore, activity_signature
+from tools.activity_archive import ActivityArchive
+from tools.activity_json import write_activities
+from tools.activity_record import Activity, activities_from_dicts, activities_to_dicts, location_name
+from tools.dir_watcher import DirectoryWatcher
+from tools.model_router import ModelRouter, ModelTier
+from tools.image_preprocess import estimate_file_tokens
+from tools.image_tiler import Tile, split_image
+from tools.ocr import OCRPool, DEFAULT_ENGINE as DEFAULT_OCR_ENGINE, DEFAULT_MIN_CONFIDENCE as DEFAULT_OCR_CONFIDENCE
 
 # Define constants
 INPUT_DIR = "input"
@@ -32,26 +51,30 @@ NEW_INPUT_DIR = os.path.join(INPUT_DIR, "new")  # Directory for new images
 OUTPUT_DIR = "output"
 OUTPUT_FILE = "activities.md"
 JSON_FILE = "activities.json"
+DEFAULT_WORKERS = 8  # Number of vision requests kept in flight at once
+DEFAULT_DEBOUNCE = 2.0  # Seconds of quiet before a burst of new images is processed in watch mode
+IMAGE_EXTENSIONS = ['jpg', 'jpeg', 'png', 'JPG', 'JPEG', 'PNG']
 
 # Ensure directories exist
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(INPUT_DIR, exist_ok=True)
 os.makedirs(NEW_INPUT_DIR, exist_ok=True)
 
-def extract_activity_info(image_path: str, save_raw: bool = False) -> List[Dict]:
-    """
-    Extract activity information from an image using the vision model.
-    
-    Args:
-        image_path (str): Path to the image file
-        save_raw (bool): Whether to save the raw LLM response to a file
-        
-    Returns:
-        List[Dict]: List of dictionaries containing extracted information (location, date, time, etc.)
-    """
-    print(f"Processing image: {image_path}")
-    
-    prompt = """
+# Vision model used for extraction
+EXTRACTION_PROVIDER = "openai"
+EXTRACTION_MODEL = "gpt-4o"
+# With --route, images go to this cheaper model first and escalate to EXTRACTION_MODEL
+# only when its extraction looks unreliable
+CHEAP_EXTRACTION_MODEL = "gpt-4o-mini"
+DEFAULT_ROUTE_THRESHOLD = 0.75  # Share of activities that must pass assess_extraction's checks
+ZIP_CODE_PATTERN = r'\b\d{5}(?:-\d{4})?\b'  # Basic US ZIP code pattern (5 digits or 5+4)
+# With --low-detail-first, an image is re-sent at high detail unless every activity has these
+CRITICAL_FIELDS = ("activity_name", "date", "location")
+MAX_TILE_WORKERS = 4  # Tiles of one tall screenshot extracted at once
+# With --ocr, images whose text is recognized confidently go to this text model instead of the vision model
+OCR_TEXT_MODEL = "gpt-4o-mini"
+
+EXTRACTION_PROMPT = """
     Please analyze this image of a kids' activity announcement and extract the following information in JSON format:
     
     1. Activity name (if available)
@@ -105,93 +128,866 @@ def extract_activity_info(image_path: str, save_raw: bool = False) -> List[Dict]
         }
     ]
     """
+
+# Appended to EXTRACTION_PROMPT when several images are packed into one request
+BATCH_PROMPT_SUFFIX = """
+    You are given {count} images, labelled "Image 1" to "Image {count}". Apply the instructions above to each image separately.
     
-    # Use vision model to extract information
+    Respond with a single JSON object of the form {{"results": [{{"image_index": 1, "activities": [...]}}, ...]}} containing exactly one entry per image, where "activities" is the array of activity objects for that image. Use an empty array for an image with no activities.
+    """
+
+# Text-only follow-up sent when a response cannot be parsed or fails validation
+REPAIR_PROMPT = """
+    The JSON below was returned for an activity extraction request but could not be used: {error}
+    
+    Return the corrected JSON only. Fix the structure and field types; do not add, remove or change any activity information.
+    
+    {response}
+    """
+
+# Appended to EXTRACTION_PROMPT when the image's OCR text is sent instead of the image
+OCR_PROMPT_SUFFIX = """
+    The image is not attached. Its text was recognized with OCR and is given below, one line per line of text in the image; treat it as the content of the image. OCR may misread some characters, so correct obvious recognition errors in names, dates and addresses.
+    
+    {text}
+    """
+
+# Fingerprint of the prompts and response schemas; editing them invalidates cached extractions
+PROMPT_FINGERPRINT = fingerprint_text(
+    EXTRACTION_PROMPT + BATCH_PROMPT_SUFFIX + REPAIR_PROMPT + OCR_PROMPT_SUFFIX
+    + json.dumps(ACTIVITY_RESPONSE_SCHEMA, sort_keys=True) + json.dumps(BATCH_RESPONSE_SCHEMA, sort_keys=True)
+)
+
+def list_image_files(directory: str) -> List[str]:
+    """
+    List the image files directly inside a directory (subdirectories are not included).
+    
+    Args:
+        directory (str): Directory to scan
+        
+    Returns:
+        List[str]: Sorted list of image paths
+    """
+    image_files = set()
+    for ext in IMAGE_EXTENSIONS:
+        image_files.update(glob.glob(os.path.join(directory, f"*.{ext}")))
+    return sorted(image_files)
+
+def get_perceptual_hash(image_path: str, image_hash: str, cache: ExtractionCache) -> Optional[int]:
+    """
+    Get the perceptual hash of an image, computing and caching it on first use.
+    
+    Args:
+        image_path (str): Path to the image file
+        image_hash (str): Content hash of the image
+        cache (ExtractionCache): Cache that stores perceptual hashes by content hash
+        
+    Returns:
+        Optional[int]: The perceptual hash, or None if the image could not be hashed
+    """
+    phash = cache.get_phash(image_hash)
+    if phash is None:
+        try:
+            phash = dhash(image_path)
+        except Exception as e:
+            print(f"Error computing perceptual hash for {image_path}: {e}")
+            return None
+        cache.set_phash(image_hash, phash)
+    return phash
+
+def build_extraction_router(min_confidence: float = DEFAULT_ROUTE_THRESHOLD, route: bool = True,
+                            low_detail_first: bool = False) -> ModelRouter:
+    """
+    Build the escalation chain used for single-image extraction.
+    
+    Args:
+        min_confidence (float): Score an extraction needs to be accepted when routing
+        route (bool): Try CHEAP_EXTRACTION_MODEL before EXTRACTION_MODEL
+        low_detail_first (bool): Send the image to the first model at low detail, then
+            to every model at high detail
+        
+    Returns:
+        ModelRouter: The router
+    """
+    models = [CHEAP_EXTRACTION_MODEL, EXTRACTION_MODEL] if route else [EXTRACTION_MODEL]
+    if low_detail_first:
+        tiers = [ModelTier(EXTRACTION_PROVIDER, models[0], "low")]
+        tiers += [ModelTier(EXTRACTION_PROVIDER, model, "high") for model in models]
+    else:
+        tiers = [ModelTier(EXTRACTION_PROVIDER, model) for model in models]
+    # Without routing only the image detail escalates, which is done whenever a critical field is missing
+    return ModelRouter(tiers, min_confidence=min_confidence if route else 1.0)
+
+def cache_model() -> str:
+    """
+    Model name vision extractions are cached under.
+    
+    Routing only escalates until an extraction is good enough, so every routing mode shares
+    the entries of the model its chain ends at.
+    """
+    return EXTRACTION_MODEL
+
+def build_near_duplicate_index(cache: ExtractionCache) -> NearDuplicateIndex:
+    """
+    Index the perceptual hashes of every image in input/ and input/new/ that already has a
+    cached extraction, so near-duplicate screenshots can reuse it.
+    
+    Args:
+        cache (ExtractionCache): Cache of earlier extractions
+        
+    Returns:
+        NearDuplicateIndex: Index of images with a reusable extraction
+    """
+    index = NearDuplicateIndex()
+    for image_file in list_image_files(INPUT_DIR) + list_image_files(NEW_INPUT_DIR):
+        image_hash = hash_file(image_file)
+        if not cache.contains(image_hash, PROMPT_FINGERPRINT, EXTRACTION_PROVIDER, cache_model()):
+            continue
+        phash = get_perceptual_hash(image_file, image_hash, cache)
+        if phash is not None:
+            index.add(phash, image_hash)
+    print(f"Indexed {len(index)} previously extracted images for near-duplicate detection")
+    return index
+
+def extraction_error(image_path: str, message: str) -> List[Dict]:
+    """
+    Build the placeholder result recorded for an image that could not be extracted.
+    
+    Args:
+        image_path (str): Path to the image file
+        message (str): Description of the error
+        
+    Returns:
+        List[Dict]: A single activity with null fields and the error message
+    """
+    return [{
+        "activity_name": None,
+        "location": None,
+        "date": None,
+        "time": None,
+        "description": None,
+        "additional_details": None,
+        "raw_datetime": None,
+        "error": message,
+        "source_file": os.path.basename(image_path)
+    }]
+
+def save_raw_response(image_path: str, response: str):
+    """
+    Save a raw LLM response to output/raw_responses/ so it can be reprocessed later.
+    
+    Args:
+        image_path (str): Path to the image the response belongs to
+        response (str): Raw response text
+    """
     try:
-        response = query_llm(prompt, provider="openai", image_path=image_path)
+        raw_file_path = get_raw_store().save(image_path, response, PROMPT_FINGERPRINT)
+        print(f"Saved raw LLM response to {raw_file_path}")
+    except Exception as e:
+        print(f"Error saving raw response: {e}")
+
+def lookup_cached_extraction(image_path: str, cache: Optional[ExtractionCache],
+                             near_duplicates: Optional[NearDuplicateIndex]) -> Tuple[Optional[List[Dict]], Optional[str], Optional[int]]:
+    """
+    Look up an image in the extraction cache, falling back to a near-duplicate match.
+    
+    Args:
+        image_path (str): Path to the image file
+        cache (ExtractionCache, optional): Cache of earlier extractions
+        near_duplicates (NearDuplicateIndex, optional): Perceptual hash index
+        
+    Returns:
+        Tuple: (cached activities or None, image content hash, perceptual hash)
+    """
+    if cache is None:
+        return None, None, None
+    
+    # Serve unchanged images from the cache
+    image_hash = hash_file(image_path)
+    model = cache_model()
+    cached_activities = cache.get(image_hash, PROMPT_FINGERPRINT, EXTRACTION_PROVIDER, model)
+    if cached_activities is not None:
+        print(f"Using cached extraction for {image_path}")
+        return cached_activities, image_hash, None
+    
+    # Reuse the extraction of a near-duplicate screenshot (cropped, recompressed, etc.)
+    phash = None
+    if near_duplicates is not None:
+        phash = get_perceptual_hash(image_path, image_hash, cache)
+        match = near_duplicates.find_nearest(phash, exclude=image_hash) if phash is not None else None
+        if match:
+            distance, match_hash = match
+            duplicate_activities = cache.get(match_hash, PROMPT_FINGERPRINT, EXTRACTION_PROVIDER, model)
+            if duplicate_activities is not None:
+                print(f"Reusing extraction of near-duplicate image for {image_path} (distance {distance})")
+                near_duplicates.record_match()
+                cache.put(image_hash, PROMPT_FINGERPRINT, EXTRACTION_PROVIDER, model,
+                          duplicate_activities, source_file=os.path.basename(image_path))
+                return duplicate_activities, image_hash, phash
+    
+    return None, image_hash, phash
+
+def store_extraction(image_path: str, activities: List[Dict], image_hash: Optional[str], phash: Optional[int],
+                     cache: Optional[ExtractionCache], near_duplicates: Optional[NearDuplicateIndex]):
+    """
+    Store a successful extraction in the cache and the near-duplicate index.
+    
+    Only successful extractions are cached so failures are retried on the next run.
+    """
+    if cache is None:
+        return
+    cache.put(image_hash, PROMPT_FINGERPRINT, EXTRACTION_PROVIDER, cache_model(),
+              activities, source_file=os.path.basename(image_path))
+    if near_duplicates is not None and phash is not None:
+        near_duplicates.add(phash, image_hash)
+
+def parse_and_validate(response: str) -> List[Dict]:
+    """
+    Parse the activities out of a response and check them against the activity schema.
+    
+    Args:
+        response (str): Raw text returned by the LLM
+        
+    Returns:
+        List[Dict]: List of activity dictionaries
+        
+    Raises:
+        ValueError: If the response has no usable JSON or an activity has fields of the wrong type
+    """
+    activities = parse_activities_response(response)
+    errors = validate_activities(activities)
+    if errors:
+        raise ValueError("; ".join(errors[:5]))
+    return activities
+
+def repair_response(response: str, error: Exception, response_schema: Dict,
+                    model: str = EXTRACTION_MODEL) -> Optional[str]:
+    """
+    Ask the model to fix a response that could not be used, without resending the images.
+    
+    Args:
+        response (str): The unusable response
+        error (Exception): Why it could not be used
+        response_schema (Dict): Schema the corrected response must follow
+        model (str): Model to ask for the repair
+        
+    Returns:
+        Optional[str]: The repaired response, or None if the request failed
+    """
+    print(f"Requesting a repair of the response ({error})")
+    return query_llm(REPAIR_PROMPT.format(error=error, response=response), provider=EXTRACTION_PROVIDER,
+                     model=model, response_schema=response_schema)
+
+def assess_extraction(activities: List[Dict]) -> float:
+    """
+    Score how reliable an extraction looks, to decide whether it needs a stronger model.
+    
+    An activity passes when it has a name, a date parse_date understands and a location
+    with a ZIP code.
+    
+    Args:
+        activities (List[Dict]): Activities parsed from a response
+        
+    Returns:
+        float: Share of activities that pass (0.0 when nothing was extracted)
+    """
+    if not activities:
+        return 0.0
+    passed = 0
+    for activity in activities:
+        name = activity.get("activity_name")
+        location = activity.get("location")
+        if (name and str(name).strip()
+                and parse_date(activity.get("date")) is not None
+                and location and re.search(ZIP_CODE_PATTERN, str(location))):
+            passed += 1
+    return passed / len(activities)
+
+def critical_fields_score(activities: List[Dict]) -> float:
+    """Share of activities that have every CRITICAL_FIELDS value (0.0 when nothing was extracted)"""
+    if not activities:
+        return 0.0
+    complete = sum(1 for activity in activities if all(activity.get(field) for field in CRITICAL_FIELDS))
+    return complete / len(activities)
+
+def record_low_detail_savings(image_path: str, router: ModelRouter, attempts: List[Tuple[ModelTier, float]],
+                              accepted: ModelTier):
+    """
+    Record on the token tracker what trying an image at low detail first saved.
+    
+    An image accepted at low detail saves the difference between its estimated high- and
+    low-detail image tokens, and the time by which it beat the average high-detail request
+    of the same model so far. An image that had to be re-sent at high detail costs its
+    low-detail tokens and time.
+    
+    Args:
+        image_path (str): Path to the image file
+        router (ModelRouter): Router the image went through
+        attempts (List[Tuple[ModelTier, float]]): Tiers tried and their latency in seconds
+        accepted (ModelTier): Tier whose result was used
+    """
+    low_attempts = [(tier, elapsed) for tier, elapsed in attempts if tier.detail == "low"]
+    if not low_attempts:
+        return
+    low_tier, low_elapsed = low_attempts[0]
+    try:
+        low_tokens = estimate_file_tokens(image_path, low_tier.provider, "low")
+        high_tokens = estimate_file_tokens(image_path, low_tier.provider, "high")
+    except Exception as e:
+        print(f"Could not estimate image tokens for {image_path}: {e}")
+        return
+    
+    if accepted == low_tier:
+        high_tier = ModelTier(low_tier.provider, low_tier.model, "high")
+        high_latency = router.get_stats().get(high_tier.name, {}).get("mean_latency", 0.0)
+        get_token_tracker().record_savings(
+            "low_detail",
+            images=1,
+            tokens_saved=high_tokens - low_tokens,
+            ms_saved=(high_latency - low_elapsed) * 1000 if high_latency else 0.0
+        )
+    else:
+        get_token_tracker().record_savings(
+            "low_detail",
+            high_detail_retries=1,
+            tokens_saved=-low_tokens,
+            ms_saved=-low_elapsed * 1000
+        )
+
+def request_extraction(image_path: str, model: str = EXTRACTION_MODEL, repair: bool = True,
+                       detail: Optional[str] = None) -> Tuple[Optional[List[Dict]], Optional[str], Optional[Exception]]:
+    """
+    Send a single image to a vision model and parse and validate its response.
+    
+    Args:
+        image_path (str): Path to the image file
+        model (str): The model to send the image to
+        repair (bool): Make one text-only repair request if the response is unusable
+        detail (str, optional): Image detail ("low" or "high"); the provider default if not given
+        
+    Returns:
+        Tuple: (activities or None, response text worth saving or None, error or None)
+    """
+    response = query_llm(EXTRACTION_PROMPT, provider=EXTRACTION_PROVIDER, model=model,
+                         image_path=image_path, response_schema=ACTIVITY_RESPONSE_SCHEMA,
+                         image_detail=detail)
+    if response is None:
+        return None, None, RuntimeError("No response from the vision model")
+    
+    try:
+        return parse_and_validate(response), response, None
+    except ValueError as e:
+        print(f"Error parsing JSON response for {image_path}: {e}")
+        print(f"Response: {response}")
+        if not repair:
+            return None, response, e
+        repaired = repair_response(response, e, ACTIVITY_RESPONSE_SCHEMA, model)
+        try:
+            activities = parse_and_validate(repaired) if repaired is not None else None
+        except ValueError as repair_error:
+            activities, e = None, repair_error
+        if activities is None:
+            return None, response, e
+        return activities, repaired, None
+
+def query_and_parse(image_path: str, save_raw: bool = False,
+                    router: Optional[ModelRouter] = None) -> Tuple[List[Dict], bool]:
+    """
+    Send a single image to the vision model and parse the activities from its response.
+    
+    The response is requested as schema-constrained JSON. If it still cannot be parsed or
+    validated, one text-only repair request is made instead of re-extracting the image.
+    
+    With a router, the image goes to the cheapest tier first. Unusable responses and
+    extractions that score below the router's threshold escalate to the next tier; only
+    the last tier makes a repair request. Extractions are scored with assess_extraction
+    when the router chains different models, and with critical_fields_score when it only
+    retries at high detail.
+    
+    Args:
+        image_path (str): Path to the image file
+        save_raw (bool): Whether to save the raw LLM response to a file
+        router (ModelRouter, optional): Cheap-first model router (see build_extraction_router)
+        
+    Returns:
+        Tuple[List[Dict], bool]: The activities (or an error placeholder) and whether extraction succeeded
+    """
+    try:
+        if router is None:
+            activities, response, error = request_extraction(image_path)
+        else:
+            score = assess_extraction if len({tier.model for tier in router.tiers}) > 1 else critical_fields_score
+            attempts = []
+            def attempt(tier: ModelTier):
+                start = time.perf_counter()
+                try:
+                    result = request_extraction(image_path, tier.model, repair=tier == router.tiers[-1],
+                                                detail=tier.detail)
+                finally:
+                    attempts.append((tier, time.perf_counter() - start))
+                return result, score(result[0]) if result[0] is not None else 0.0
+            (activities, response, error), accepted = router.run(attempt)
+            record_low_detail_savings(image_path, router, attempts, accepted)
+        
+        if activities is None:
+            if response is None:
+                return extraction_error(image_path, str(error)), False
+            if save_raw:
+                save_raw_response(image_path, response)
+            return extraction_error(image_path, f"Failed to parse response: {str(error)}"), False
         
         # Save raw response if requested
         if save_raw:
-            base_name = os.path.basename(image_path)
-            file_name = os.path.splitext(base_name)[0]
-            raw_dir = os.path.join(OUTPUT_DIR, "raw_responses")
-            os.makedirs(raw_dir, exist_ok=True)
-            raw_file_path = os.path.join(raw_dir, f"{file_name}_response.json")
-            
-            try:
-                with open(raw_file_path, "w") as f:
-                    f.write(response)
-                print(f"Saved raw LLM response to {raw_file_path}")
-            except Exception as e:
-                print(f"Error saving raw response: {e}")
+            save_raw_response(image_path, response)
+        return activities, True
+    
+    except Exception as e:
+        print(f"Error processing image {image_path}: {e}")
+        return extraction_error(image_path, str(e)), False
+
+def tile_image(image_path: str) -> List[Tile]:
+    """Split a tall screenshot into tiles (see tools.image_tiler); empty if it is not tall or cannot be read"""
+    try:
+        return split_image(image_path)
+    except Exception as e:
+        print(f"Could not tile {image_path}: {e}")
+        return []
+
+def activity_key(activity: Dict) -> Tuple[str, str]:
+    """Normalized (name, date) used to spot one activity seen in two tiles"""
+    name = re.sub(r'[^a-z0-9]+', ' ', str(activity.get("activity_name") or "").lower()).strip()
+    date = re.sub(r'\s+', ' ', str(activity.get("date") or "").lower()).strip()
+    return name, date
+
+def merge_activity(activity: Dict, other: Dict) -> Dict:
+    """Combine two extractions of the same activity, keeping the longer value of each field
+    (an activity cut by a tile edge is usually complete in one tile and truncated in the other)"""
+    merged = dict(activity)
+    for field, value in other.items():
+        current = merged.get(field)
+        if current is None or (isinstance(value, str) and isinstance(current, str) and len(value) > len(current)):
+            merged[field] = value
+    return merged
+
+def merge_tile_activities(per_tile: List[List[Dict]], tile_count: Optional[int] = None) -> List[Dict]:
+    """
+    Merge the activities extracted from the tiles of one image.
+    
+    Tiles overlap, so an activity near a tile boundary can be extracted from both
+    neighbouring tiles. An activity is merged into one from the previous tile when their
+    normalized names match and their dates match (or one of them has no date). Each
+    activity records the tiles it came from in `source_tile`, e.g. "2/5" or "2-3/5".
+    
+    Args:
+        per_tile (List[List[Dict]]): Activities of each tile, top to bottom
+        tile_count (int, optional): Number of tiles; defaults to len(per_tile)
+        
+    Returns:
+        List[Dict]: The merged activities in reading order
+    """
+    tile_count = tile_count or len(per_tile)
+    merged: List[Dict] = []
+    spans: List[List[int]] = []  # [first, last] tile of each merged activity
+    for index, activities in enumerate(per_tile, start=1):
+        claimed = set()
+        for activity in activities:
+            name, date = activity_key(activity)
+            match = None
+            if name:
+                for i, previous in enumerate(merged):
+                    if spans[i][1] != index - 1 or i in claimed:
+                        continue
+                    previous_name, previous_date = activity_key(previous)
+                    if previous_name == name and (previous_date == date or not previous_date or not date):
+                        match = i
+                        break
+            if match is None:
+                merged.append(dict(activity))
+                spans.append([index, index])
+            else:
+                merged[match] = merge_activity(merged[match], activity)
+                spans[match][1] = index
+                claimed.add(match)
+    
+    for activity, (first, last) in zip(merged, spans):
+        activity["source_tile"] = f"{first}/{tile_count}" if first == last else f"{first}-{last}/{tile_count}"
+    return merged
+
+def extract_tiled(image_path: str, tiles: List[Tile], save_raw: bool = False,
+                  router: Optional[ModelRouter] = None) -> Tuple[List[Dict], bool]:
+    """
+    Extract a tall screenshot tile by tile and merge the results.
+    
+    The tiles are sent in parallel, so a long list of events takes about as long as one
+    screen of it and no single response has to hold every activity.
+    
+    Args:
+        image_path (str): Path to the image the tiles were cut from
+        tiles (List[Tile]): Tiles from tools.image_tiler.split_image
+        save_raw (bool): Whether to save the merged activities as the image's raw response
+        router (ModelRouter, optional): Cheap-first model router used for each tile
+        
+    Returns:
+        Tuple[List[Dict], bool]: The merged activities (or an error placeholder) and
+            whether every tile was extracted
+    """
+    print(f"Extracting {image_path} in {len(tiles)} tiles")
+    with ThreadPoolExecutor(max_workers=min(len(tiles), MAX_TILE_WORKERS)) as executor:
+        results = list(executor.map(lambda tile: query_and_parse(tile.path, False, router), tiles))
+    
+    failed = [tile.label for tile, (_, ok) in zip(tiles, results) if not ok]
+    if len(failed) == len(tiles):
+        return extraction_error(image_path, results[0][0][0].get("error") or "All tiles failed"), False
+    if failed:
+        print(f"Tiles {', '.join(failed)} of {image_path} failed; keeping the other tiles' activities")
+    
+    activities = merge_tile_activities([activities if ok else [] for activities, ok in results], len(tiles))
+    if save_raw:
+        save_raw_response(image_path, json.dumps({"activities": activities}, indent=2))
+    return activities, not failed
+
+def ocr_cache_model(ocr: OCRPool) -> str:
+    """Model name extractions from OCR text are cached under, apart from vision extractions"""
+    return f"{OCR_TEXT_MODEL}@ocr-{ocr.engine}"
+
+def extract_from_ocr(image_path: str, ocr: OCRPool, save_raw: bool = False,
+                     cache: Optional[ExtractionCache] = None,
+                     image_hash: Optional[str] = None) -> Optional[List[Dict]]:
+    """
+    Extract activity information from an image's OCR text with a text model.
+    
+    Only text the OCR engine recognized confidently is used; the caller falls back to the
+    vision model when this returns None (low confidence, no response, an unusable response
+    or no activity with every critical field).
+    
+    Args:
+        image_path (str): Path to the image file
+        ocr (OCRPool): OCR pool the image was submitted to
+        save_raw (bool): Whether to save the raw LLM response to a file
+        cache (ExtractionCache, optional): Cache of earlier extractions
+        image_hash (str, optional): Content hash of the image, when the cache has computed it
+        
+    Returns:
+        Optional[List[Dict]]: The activities, or None to use the vision model instead
+    """
+    result = ocr.get(image_path)
+    if not ocr.confident(result):
+        get_token_tracker().record_savings("ocr", vision_fallbacks=1)
+        return None
+    
+    model = ocr_cache_model(ocr)
+    if cache is not None:
+        image_hash = image_hash or hash_file(image_path)
+        cached_activities = cache.get(image_hash, PROMPT_FINGERPRINT, EXTRACTION_PROVIDER, model)
+        if cached_activities is not None:
+            print(f"Using cached OCR extraction for {image_path}")
+            return cached_activities
+    
+    print(f"Extracting {image_path} from its OCR text ({result.words} words, {result.confidence:.0%} confidence)")
+    response = query_llm(EXTRACTION_PROMPT + OCR_PROMPT_SUFFIX.format(text=result.text),
+                         provider=EXTRACTION_PROVIDER, model=OCR_TEXT_MODEL,
+                         response_schema=ACTIVITY_RESPONSE_SCHEMA)
+    try:
+        activities = parse_and_validate(response) if response is not None else None
+    except ValueError as e:
+        print(f"Error parsing OCR extraction for {image_path}: {e}")
+        activities = None
+    if not activities or critical_fields_score(activities) == 0:
+        print(f"OCR extraction of {image_path} is incomplete; using the vision model")
+        get_token_tracker().record_savings("ocr", vision_fallbacks=1)
+        return None
+    
+    if save_raw:
+        save_raw_response(image_path, response)
+    if cache is not None:
+        cache.put(image_hash, PROMPT_FINGERPRINT, EXTRACTION_PROVIDER, model,
+                  activities, source_file=os.path.basename(image_path))
+    try:
+        image_tokens = estimate_file_tokens(image_path, EXTRACTION_PROVIDER)
+    except Exception:
+        image_tokens = 0
+    # Roughly four characters of text per token
+    get_token_tracker().record_savings("ocr", images=1, tokens_saved=max(0, image_tokens - len(result.text) // 4))
+    return activities
+
+def extract_activity_info(image_path: str, save_raw: bool = False,
+                          cache: Optional[ExtractionCache] = None,
+                          near_duplicates: Optional[NearDuplicateIndex] = None,
+                          router: Optional[ModelRouter] = None,
+                          ocr: Optional[OCRPool] = None) -> List[Dict]:
+    """
+    Extract activity information from an image using the vision model.
+    
+    Tall screenshots are extracted in overlapping tiles (see extract_tiled). With an OCR
+    pool, images whose text is recognized confidently are extracted from that text instead
+    (see extract_from_ocr).
+    
+    Args:
+        image_path (str): Path to the image file
+        save_raw (bool): Whether to save the raw LLM response to a file
+        cache (ExtractionCache, optional): Cache of earlier extractions; unchanged images
+            are served from it instead of calling the LLM
+        near_duplicates (NearDuplicateIndex, optional): Perceptual hash index; when given
+            together with a cache, near-duplicate screenshots reuse the nearest cached extraction
+        router (ModelRouter, optional): Try a cheaper model first (see query_and_parse)
+        ocr (OCRPool, optional): OCR pre-pass; confident text is sent to a text model
         
-        # Extract JSON from response
+    Returns:
+        List[Dict]: List of dictionaries containing extracted information (location, date, time, etc.)
+    """
+    print(f"Processing image: {image_path}")
+    
+    cached_activities, image_hash, phash = lookup_cached_extraction(image_path, cache, near_duplicates)
+    if cached_activities is not None:
+        return cached_activities
+    
+    if ocr is not None:
+        activities = extract_from_ocr(image_path, ocr, save_raw, cache, image_hash)
+        if activities is not None:
+            return activities
+    
+    # Use vision model to extract information
+    tiles = tile_image(image_path)
+    if tiles:
+        activities, ok = extract_tiled(image_path, tiles, save_raw, router)
+    else:
+        activities, ok = query_and_parse(image_path, save_raw, router)
+    if ok:
+        store_extraction(image_path, activities, image_hash, phash, cache, near_duplicates)
+    return activities
+
+def parse_batch_response(response: str, image_count: int) -> List[List[Dict]]:
+    """
+    Split a multi-image response into one activity list per image slot.
+    
+    Args:
+        response (str): Raw text returned for a batch request
+        image_count (int): Number of images sent in the batch
+        
+    Returns:
+        List[List[Dict]]: Activities for each image, in the order the images were sent
+        
+    Raises:
+        ValueError: If the response does not contain exactly one valid result slot per image
+    """
+    data = load_json_response(response)
+    
+    if not isinstance(data, dict) or not isinstance(data.get('results'), list):
+        raise ValueError("Batch response has no 'results' array")
+    
+    slots: Dict[int, List[Dict]] = {}
+    for result in data['results']:
+        if not isinstance(result, dict):
+            raise ValueError("Unexpected result slot structure")
+        index = result.get('image_index')
+        activities = result.get('activities')
+        if not isinstance(index, int) or not 1 <= index <= image_count or index in slots:
+            raise ValueError(f"Invalid or repeated image_index: {index}")
+        if isinstance(activities, dict):
+            activities = [activities]
+        if not isinstance(activities, list):
+            raise ValueError(f"Result slot {index} has no activities array")
+        errors = validate_activities(activities)
+        if errors:
+            raise ValueError(f"Result slot {index}: {'; '.join(errors[:5])}")
+        slots[index] = activities
+    
+    if len(slots) != image_count:
+        raise ValueError(f"Expected {image_count} result slots, got {len(slots)}")
+    return [slots[index] for index in range(1, image_count + 1)]
+
+def query_and_parse_batch(image_paths: List[str], save_raw: bool = False) -> List[Tuple[List[Dict], bool]]:
+    """
+    Send several images in one vision request. If the response cannot be mapped back to
+    the individual images even after a repair request, the batch is split in half and retried.
+    
+    Args:
+        image_paths (List[str]): Paths to the image files
+        save_raw (bool): Whether to save each image's slot of the response to a file
+        
+    Returns:
+        List[Tuple[List[Dict], bool]]: Activities and success flag for each image, in order
+    """
+    if len(image_paths) == 1:
+        return [query_and_parse(image_paths[0], save_raw)]
+    
+    print(f"Processing batch of {len(image_paths)} images: {', '.join(os.path.basename(p) for p in image_paths)}")
+    prompt = EXTRACTION_PROMPT + BATCH_PROMPT_SUFFIX.format(count=len(image_paths))
+    try:
+        response = query_llm(prompt, provider=EXTRACTION_PROVIDER, model=EXTRACTION_MODEL,
+                             image_paths=image_paths, response_schema=BATCH_RESPONSE_SCHEMA)
+        if response is None:
+            raise RuntimeError("No response from the vision model")
         try:
-            # Try to parse the entire response as JSON first
-            try:
-                data = json.loads(response)
-                
-                # Handle both single objects and arrays
-                if isinstance(data, dict):
-                    # Check if it has an 'activities' field with an array
-                    if 'activities' in data and isinstance(data['activities'], list):
-                        return data['activities']  # Return the activities array directly
-                    else:
-                        return [data]  # Convert single object to a list for consistent handling
-                elif isinstance(data, list):
-                    return data
-                else:
-                    raise ValueError("Unexpected JSON structure")
-                
-            except json.JSONDecodeError:
-                # If that fails, look for JSON object or array pattern in the response
-                json_pattern = re.search(r'(\[.*\]|\{.*\})', response, re.DOTALL)
-                if json_pattern:
-                    json_str = json_pattern.group(1)
-                    data = json.loads(json_str)
-                    
-                    # Handle both single objects and arrays
-                    if isinstance(data, dict):
-                        # Check if it has an 'activities' field with an array
-                        if 'activities' in data and isinstance(data['activities'], list):
-                            return data['activities']  # Return the activities array directly
-                        else:
-                            return [data]  # Convert single object to a list for consistent handling
-                    elif isinstance(data, list):
-                        return data
-                    else:
-                        raise ValueError("Unexpected JSON structure")
-                else:
-                    raise ValueError("No JSON object or array found in response")
-                
-        except (json.JSONDecodeError, ValueError) as e:
-            print(f"Error parsing JSON response for {image_path}: {e}")
-            print(f"Response: {response}")
-            return [{
-                "activity_name": None,
-                "location": None,
-                "date": None,
-                "time": None,
-                "description": None,
-                "additional_details": None,
-                "raw_datetime": None,
-                "error": f"Failed to parse response: {str(e)}",
-                "source_file": os.path.basename(image_path)
-            }]
+            per_image = parse_batch_response(response, len(image_paths))
+        except ValueError as e:
+            # A text-only repair is much cheaper than resending the images
+            repaired = repair_response(response, e, BATCH_RESPONSE_SCHEMA)
+            if repaired is None:
+                raise
+            per_image = parse_batch_response(repaired, len(image_paths))
+    except Exception as e:
+        middle = len(image_paths) // 2
+        print(f"Batch of {len(image_paths)} images failed ({e}); retrying as batches of {middle} and {len(image_paths) - middle}")
+        return query_and_parse_batch(image_paths[:middle], save_raw) + query_and_parse_batch(image_paths[middle:], save_raw)
+    
+    # Save each slot as that image's raw response so --from-raw keeps working
+    if save_raw:
+        for image_path, activities in zip(image_paths, per_image):
+            save_raw_response(image_path, json.dumps(activities, indent=2))
+    return [(activities, True) for activities in per_image]
+
+def extract_activity_batch(image_paths: List[str], save_raw: bool = False,
+                           cache: Optional[ExtractionCache] = None,
+                           near_duplicates: Optional[NearDuplicateIndex] = None) -> List[List[Dict]]:
+    """
+    Extract activity information from several images with a single vision request.
+    
+    Images that are cached (or near-duplicates of cached images) are not sent, and tall
+    screenshots are extracted in tiles on their own; the rest are packed into one request
+    with a result slot per image.
+    
+    Args:
+        image_paths (List[str]): Paths to the image files
+        save_raw (bool): Whether to save the raw LLM responses to files
+        cache (ExtractionCache, optional): Cache of earlier extractions
+        near_duplicates (NearDuplicateIndex, optional): Perceptual hash index
+        
+    Returns:
+        List[List[Dict]]: Activities for each image, in the order of image_paths
+    """
+    results: List[Optional[List[Dict]]] = [None] * len(image_paths)
+    pending = []
+    for i, image_path in enumerate(image_paths):
+        cached_activities, image_hash, phash = lookup_cached_extraction(image_path, cache, near_duplicates)
+        if cached_activities is not None:
+            results[i] = cached_activities
+            continue
+        tiles = tile_image(image_path)
+        if tiles:
+            activities, ok = extract_tiled(image_path, tiles, save_raw)
+            if ok:
+                store_extraction(image_path, activities, image_hash, phash, cache, near_duplicates)
+            results[i] = activities
+        else:
+            pending.append((i, image_path, image_hash, phash))
+    
+    if pending:
+        extracted = query_and_parse_batch([image_path for _, image_path, _, _ in pending], save_raw)
+        for (i, image_path, image_hash, phash), (activities, ok) in zip(pending, extracted):
+            if ok:
+                store_extraction(image_path, activities, image_hash, phash, cache, near_duplicates)
+            results[i] = activities
+    return results
+
+def extract_images_concurrently(image_files: List[str], workers: int = DEFAULT_WORKERS,
+                                save_raw: bool = False, cache: Optional[ExtractionCache] = None,
+                                near_duplicates: Optional[NearDuplicateIndex] = None,
+                                batch_size: int = 1, router: Optional[ModelRouter] = None,
+                                ocr: Optional[OCRPool] = None):
+    """
+    Extract activity information from many images with a bounded number of requests in flight.
+    
+    Results are yielded in the same order as image_files regardless of which request
+    finishes first, so the output stays deterministic across runs.
+    
+    Args:
+        image_files (List[str]): Paths to the image files to process
+        workers (int): Maximum number of concurrent vision requests
+        save_raw (bool): Whether to save the raw LLM responses to files
+        cache (ExtractionCache, optional): Cache of earlier extractions shared by all workers
+        near_duplicates (NearDuplicateIndex, optional): Perceptual hash index shared by all workers
+        batch_size (int): Number of images packed into each vision request
+        router (ModelRouter, optional): Cheap-first model router for single-image requests
+        ocr (OCRPool, optional): OCR pre-pass for single-image requests
+        
+    Yields:
+        Tuple[str, List[Dict]]: The image path and the activities extracted from it
+    """
+    workers = max(1, workers)
+    batch_size = max(1, batch_size)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if batch_size == 1:
+            futures = [
+                executor.submit(extract_activity_info, image_file, save_raw, cache, near_duplicates, router, ocr)
+                for image_file in image_files
+            ]
+            for image_file, future in zip(image_files, futures):
+                yield image_file, future.result()
+            return
+        
+        batches = [image_files[i:i + batch_size] for i in range(0, len(image_files), batch_size)]
+        futures = [
+            executor.submit(extract_activity_batch, batch, save_raw, cache, near_duplicates)
+            for batch in batches
+        ]
+        for batch, future in zip(batches, futures):
+            yield from zip(batch, future.result())
+
+def build_ocr_pool(image_files: List[str], engine: str, min_confidence: float,
+                   cache: Optional[ExtractionCache] = None) -> Optional[OCRPool]:
+    """
+    Start an OCR pool and submit the images that have no cached extraction, so recognition
+    runs in worker processes while the first LLM requests are in flight.
     
+    Args:
+        image_files (List[str]): Paths to the image files to process
+        engine (str): OCR engine name or "module:function"
+        min_confidence (float): Mean word confidence needed to use the recognized text
+        cache (ExtractionCache, optional): Cache of earlier extractions
+        
+    Returns:
+        Optional[OCRPool]: The pool, or None if the engine cannot run here
+    """
+    try:
+        ocr = OCRPool(engine, min_confidence=min_confidence)
     except Exception as e:
-        print(f"Error processing image {image_path}: {e}")
-        return [{
-            "activity_name": None,
-            "location": None,
-            "date": None,
-            "time": None,
-            "description": None,
-            "additional_details": None,
-            "raw_datetime": None,
-            "error": str(e),
-            "source_file": os.path.basename(image_path)
-        }]
+        print(f"OCR disabled, using the vision model for every image: {e}")
+        return None
+    if cache is not None:
+        image_files = [image_file for image_file in image_files
+                       if not cache.contains(hash_file(image_file), PROMPT_FINGERPRINT,
+                                             EXTRACTION_PROVIDER, cache_model())]
+    ocr.submit(image_files)
+    return ocr
+
+def print_router_stats(router: ModelRouter):
+    """Print per-tier acceptance rates and latency so the routing threshold can be tuned"""
+    for name, stats in router.get_stats().items():
+        if stats["attempts"]:
+            print(f"Router ({name}): {stats['attempts']} attempts, {stats['success_rate']:.0%} accepted, "
+                  f"{stats['escalated']} escalated, {stats['low_confidence']} low confidence, {stats['errors']} errors, "
+                  f"{stats['mean_latency']:.1f}s mean / {stats['max_latency']:.1f}s max latency")
+
+def print_rate_limit_stats():
+    """Print how long requests waited for rate-limit capacity and how often they were throttled"""
+    for name, stats in get_rate_limiter().get_stats().items():
+        if stats["wait_time"] or stats["retries"]:
+            print(f"Rate limiter ({name}): {stats['requests']} requests, waited {stats['wait_time']:.1f}s "
+                  f"(max {stats['max_wait']:.1f}s, up to {stats['max_queued']} queued), "
+                  f"{stats['throttled']} throttled, {stats['retries']} retries")
+
+def print_hedge_stats():
+    """Print how often slow requests were hedged to the backup provider and how often the backup won"""
+    for name, stats in get_request_hedger().get_stats().items():
+        if stats["hedged"] or stats["failovers"]:
+            print(f"Hedging ({name}): {stats['hedged']} of {stats['requests']} requests hedged "
+                  f"({stats['hedge_rate']:.0%}), backup won {stats['backup_wins']} ({stats['win_rate']:.0%}), "
+                  f"{stats['failovers']} failovers")
+
+def print_run_savings(savings_before: Dict[str, Dict[str, float]]):
+    """
+    Print the savings recorded on the token tracker since savings_before was taken.
+    
+    Args:
+        savings_before (Dict): Copy of the tracker's savings at the start of the run
+    """
+    for category, totals in get_token_tracker().savings.items():
+        previous = savings_before.get(category, {})
+        deltas = {name: amount - previous.get(name, 0) for name, amount in totals.items()}
+        if any(deltas.values()):
+            details = ", ".join(f"{name}={amount:,.6g}" for name, amount in deltas.items())
+            print(f"Savings this run ({category}): {details}")
 
 def parse_date(date_str: Optional[str]) -> Optional[datetime]:
     """
@@ -414,91 +1210,75 @@ def parse_time_range(time_str: str) -> Tuple[Optional[datetime], Optional[dateti
     
     return None, None
 
-def validate_location(activities: List[Dict]) -> List[Dict]:
+def validate_location(activities: List[Activity]) -> List[Activity]:
     """
     Validate and enhance location data to ensure it includes ZIP code information.
     
     Args:
-        activities (List[Dict]): List of activity dictionaries
+        activities (List[Activity]): List of activities
         
     Returns:
-        List[Dict]: Updated list with validated location data
+        List[Activity]: Updated list with validated location data
     """
-    zip_code_pattern = r'\b\d{5}(?:-\d{4})?\b'  # Basic US ZIP code pattern (5 digits or 5+4)
+    zip_code_pattern = re.compile(ZIP_CODE_PATTERN)
+    
+    # Distinct locations that already have a ZIP code, in the order they first appear.
+    # Locations given a placeholder ZIP code below are not used to enhance others.
+    zip_locations = [location_name(location_id) for location_id in dict.fromkeys(
+        activity.location_id for activity in activities if activity.location_id is not None)
+        if zip_code_pattern.search(location_name(location_id))]
     
     for activity in activities:
-        if not isinstance(activity, dict):
-            continue
-            
-        location = activity.get('location')
+        location = activity.location
         
         # Skip if no location or if location already has a ZIP code
-        if not location or not isinstance(location, str):
+        if activity.location_id is None or not location:
             continue
             
         # Check if ZIP code already exists
-        if re.search(zip_code_pattern, location):
+        if zip_code_pattern.search(location):
             continue
-            
-        # If no ZIP code found, try to enhance the location
-        activity_name = activity.get('activity_name', '')
-        if activity_name is None: activity_name = ''
         
         # First, try to see if we have any other activities at the same location but with ZIP code
-        similar_locations = []
-        for other_activity in activities:
-            if other_activity is activity:  # Skip self
-                continue
-                
-            other_location = other_activity.get('location', '')
-            if not other_location or not isinstance(other_location, str):
-                continue
-                
-            # If other location has a ZIP code and contains our location string
-            if re.search(zip_code_pattern, other_location) and location in other_location:
-                similar_locations.append(other_location)
+        similar_locations = [other_location for other_location in zip_locations if location in other_location]
         
         # If we found a similar location with ZIP code, use that
         if similar_locations:
-            activity['location'] = similar_locations[0]
+            activity.location = similar_locations[0]
             print(f"Enhanced location: '{location}' -> '{similar_locations[0]}'")
             continue
             
         # If Texas is not mentioned, add it as a reasonable assumption for this dataset
         if "TX" not in location and "Texas" not in location:
-            # Keep track of the original for logging purposes
-            original_location = location
-            
             # Add Texas and a placeholder ZIP code
             # Placeholder approach 1: Add generic Austin area code
-            activity['location'] = f"{location}, Austin, TX 78701"
-            print(f"Added state/zip to location: '{original_location}' -> '{activity['location']}'")
+            activity.location = f"{location}, Austin, TX 78701"
+            print(f"Added state/zip to location: '{location}' -> '{activity.location}'")
             
             # Mark this location as uncertain
-            activity['location_uncertain'] = True
+            activity.location_uncertain = True
             
         # If TX is mentioned but no ZIP, add a placeholder ZIP
-        elif re.search(r'\b(TX|Texas)\b', location) and not re.search(zip_code_pattern, location):
-            original_location = location
-            activity['location'] = f"{location} 78701"  # Add generic Austin area code
-            print(f"Added zip to location: '{original_location}' -> '{activity['location']}'")
-            activity['location_uncertain'] = True
+        elif re.search(r'\b(TX|Texas)\b', location):
+            activity.location = f"{location} 78701"  # Add generic Austin area code
+            print(f"Added zip to location: '{location}' -> '{activity.location}'")
+            activity.location_uncertain = True
     
     return activities
 
-def generate_markdown(activities: List[Dict]) -> str:
+def generate_markdown(activities: List[Activity]) -> str:
     """
     Generate a markdown file from the extracted activities.
     
     Args:
-        activities (List[Dict]): List of activity dictionaries
+        activities (List[Activity]): List of activities
         
     Returns:
         str: Markdown content
     """
     # Sort activities by date
     def get_activity_date(activity):
-        date_obj = parse_date(activity.get("date"))
+        date_obj = parse_date(activity.date)
         return date_obj if date_obj else datetime.max
     
     sorted_activities = sorted(activities, key=get_activity_date)
@@ -507,44 +1287,47 @@ def generate_markdown(activities: List[Dict]) -> str:
     markdown = "# Kids Activities\n\n"
     
     for activity in sorted_activities:
-        activity_name = activity.get("activity_name") or "Unnamed Activity"
+        activity_name = activity.activity_name or "Unnamed Activity"
         markdown += f"## {activity_name}\n\n"
         
-        if activity.get("date"):
-            markdown += f"**Date:** {activity['date']}\n\n"
+        if activity.date:
+            markdown += f"**Date:** {activity.date}\n\n"
             
-        if activity.get("time"):
-            markdown += f"**Time:** {activity['time']}\n\n"
+        if activity.time:
+            markdown += f"**Time:** {activity.time}\n\n"
             
-        if activity.get("location"):
-            location_text = activity['location']
-            if activity.get('location_uncertain', False):
+        if activity.location:
+            location_text = activity.location
+            if activity.location_uncertain:
                 location_text += " *(ZIP code estimated)*"
             markdown += f"**Location:** {location_text}\n\n"
             
-        if activity.get("description"):
-            markdown += f"**Description:** {activity['description']}\n\n"
+        if activity.description:
+            markdown += f"**Description:** {activity.description}\n\n"
             
-        if activity.get("additional_details"):
-            markdown += f"**Additional Details:** {activity['additional_details']}\n\n"
+        if activity.additional_details:
+            markdown += f"**Additional Details:** {activity.additional_details}\n\n"
             
-        markdown += f"**Source:** {activity.get('source_file', 'Unknown')}\n\n"
+        source = activity.source_file or 'Unknown'
+        if activity.source_tile:
+            source += f" (tile {activity.source_tile})"
+        markdown += f"**Source:** {source}\n\n"
         
         markdown += "---\n\n"
     
     return markdown
 
-def sanitize_dates(activities: List[Dict]) -> List[Dict]:
+def sanitize_dates(activities: List[Activity]) -> List[Activity]:
     """
     Sanitize dates in activities to ensure they're not in the past.
     Activities without a year or with dates before the current year will be updated to the current year.
     For activities with null dates, use raw_datetime or other text to infer the most likely date.
     
     Args:
-        activities (List[Dict]): List of activity dictionaries
+        activities (List[Activity]): List of activities
         
     Returns:
-        List[Dict]: Updated list with sanitized dates
+        List[Activity]: Updated list with sanitized dates
     """
     from datetime import datetime, timedelta
     import calendar
@@ -586,17 +1369,7 @@ def sanitize_dates(activities: List[Dict]) -> List[Dict]:
         return next_date.strftime("%Y-%m-%d")
     
     for activity in activities:
-        # Skip invalid activities
-        if not isinstance(activity, dict):
-            print(f"Warning: Skipping invalid activity (not a dictionary): {activity}")
-            continue
-            
-        date_str = activity.get('date')
-        raw_datetime = activity.get('raw_datetime', '')
-        
-        # Handle None values safely
-        if raw_datetime is None:
-            raw_datetime = ''
+        date_str = activity.date
         
         # Case 1: Handle dates with years not equal to current year
         if date_str:
@@ -616,32 +1389,18 @@ def sanitize_dates(activities: List[Dict]) -> List[Dict]:
                     if int(year) < current_year:
                         # Create new date string with current year
                         new_date = f"{current_year}-{month}-{day}"
-                        activity['date'] = new_date
+                        activity.date = new_date
                         print(f"Sanitized date: {date_str} -> {new_date}")
             except (ValueError, TypeError) as e:
                 print(f"Error sanitizing date {date_str}: {e}")
         
         # Case 2: Handle null dates
         else:
-            # Get all text fields that might contain date information
-            name_str = activity.get('activity_name', '')
-            if name_str is None: name_str = ''
-            
-            time_str = activity.get('time', '')
-            if time_str is None: time_str = ''
-            
-            description_str = activity.get('description', '')
-            if description_str is None: description_str = ''
-            
-            details_str = activity.get('additional_details', '')
-            if details_str is None: details_str = ''
-            
-            # Convert all strings to lowercase for matching
-            name_str = name_str.lower() if isinstance(name_str, str) else ''
-            time_str = time_str.lower() if isinstance(time_str, str) else ''
-            description_str = description_str.lower() if isinstance(description_str, str) else ''
-            details_str = details_str.lower() if isinstance(details_str, str) else ''
-            raw_datetime = raw_datetime.lower() if isinstance(raw_datetime, str) else ''
+            # Get all text fields that might contain date information, lowercased for matching
+            name_str, time_str, description_str, details_str, raw_datetime = (
+                value.lower() if isinstance(value, str) else ''
+                for value in (activity.activity_name, activity.time, activity.description,
+                              activity.additional_details, activity.raw_datetime))
             
             # Prioritize raw_datetime if available
             all_text = raw_datetime if raw_datetime else ' '.join([name_str, time_str, description_str, details_str])
@@ -655,8 +1414,8 @@ def sanitize_dates(activities: List[Dict]) -> List[Dict]:
                 next_date = next_day_of_week(day_name)
                 
                 if next_date:
-                    activity['date'] = next_date
-                    print(f"Added date for {day_name}: {next_date} to activity: {activity.get('activity_name')}")
+                    activity.date = next_date
+                    print(f"Added date for {day_name}: {next_date} to activity: {activity.activity_name}")
                     continue  # Skip to next activity
             
             # APPROACH 2: Look for month names with days
@@ -678,8 +1437,8 @@ def sanitize_dates(activities: List[Dict]) -> List[Dict]:
                     day_num_padded = day_num.zfill(2) if len(day_num) == 1 else day_num
                     specific_date = f"{current_year}-{month_num}-{day_num_padded}"
                     
-                    activity['date'] = specific_date
-                    print(f"Added date from month+day: {specific_date} to activity: {activity.get('activity_name')}")
+                    activity.date = specific_date
+                    print(f"Added date from month+day: {specific_date} to activity: {activity.activity_name}")
                     continue
             
             # APPROACH 3: If we can identify a specific month, just log a warning
@@ -696,52 +1455,390 @@ def sanitize_dates(activities: List[Dict]) -> List[Dict]:
                 
                 month_short = month_name.lower()[:3]
                 if month_short in month_map:
-                    print(f"Warning: Found month '{month_name}' but no specific day for activity: {activity.get('activity_name')}")
+                    print(f"Warning: Found month '{month_name}' but no specific day for activity: {activity.activity_name}")
                     continue
     return activities
 
-def mark_archived_activities(activities: List[Dict]) -> List[Dict]:
+def mark_archived_activities(activities: List[Activity]) -> List[Activity]:
     """
     Mark activities as archived based on date criteria.
-    Activities with dates that have already passed will be marked as archived.
+    Activities with dates that have already passed will be marked as archived;
+    save_activities then moves them from the activity store to the cold archive.
     
     Args:
-        activities (List[Dict]): List of activity dictionaries
+        activities (List[Activity]): List of activities
         
     Returns:
-        List[Dict]: Updated list with archive flags
+        List[Activity]: Updated list with archive flags
     """
     print("Marking archived activities...")
-    today = datetime.now().date()
+    today = datetime.now().date().toordinal()
     marked_count = 0
     
     for activity in activities:
-        # Skip invalid activities
-        if not isinstance(activity, dict):
-            continue
-            
         # Initialize is_archived flag if it doesn't exist
-        if 'is_archived' not in activity:
-            activity['is_archived'] = False
+        if activity.is_archived is None:
+            activity.is_archived = False
             
-        date_str = activity.get('date')
-        if date_str:
-            try:
-                # Parse the date string to a date object
-                activity_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-                
-                # Mark as archived if the date has passed
-                if activity_date < today:
-                    activity['is_archived'] = True
-                    marked_count += 1
-                    
-            except (ValueError, TypeError) as e:
-                print(f"Error parsing date {date_str} for archiving: {e}")
-                # In case of error, don't change archive status
+        if activity.date:
+            # Mark as archived if the date has passed
+            if activity.date_ordinal is None:
+                # In case of an unparseable date, don't change archive status
+                print(f"Error parsing date {activity.date} for archiving")
+            elif activity.date_ordinal < today:
+                activity.is_archived = True
+                marked_count += 1
     
     print(f"Marked {marked_count} activities as archived (past date)")
     return activities
 
+def extract_images(image_files: List[str], args: argparse.Namespace, journal: ExtractionJournal,
+                   move_processed: bool = False) -> List[Dict]:
+    """
+    Extract activities from images, journaling each result as soon as it arrives.
+    
+    Args:
+        image_files (List[str]): Paths to the image files to process
+        args (argparse.Namespace): Parsed command-line options (cache, dedupe, batching, workers, routing)
+        journal (ExtractionJournal): Journal that every successful extraction is appended to
+        move_processed (bool): Move each image from input/new to input once it is journaled
+        
+    Returns:
+        List[Dict]: The extracted activities, tagged with their source file
+    """
+    # Unchanged images are served from the extraction cache, and near-duplicate
+    # screenshots reuse the extraction of the closest cached image
+    cache = None if args.no_cache else ExtractionCache()
+    
+    # Optionally try the cheaper model first and escalate only unreliable extractions
+    router = None
+    if args.route or args.low_detail_first:
+        if args.batch_size > 1:
+            print(f"Routing and low-detail-first apply to single-image requests; batches go to {EXTRACTION_MODEL}")
+        else:
+            router = build_extraction_router(args.route_threshold, route=args.route,
+                                             low_detail_first=args.low_detail_first)
+    
+    near_duplicates = None
+    if cache is not None and not args.no_dedupe and image_files:
+        near_duplicates = build_near_duplicate_index(cache)
+    
+    # Optionally recognize the text locally first and send confident text to a text model
+    ocr = None
+    if args.ocr and image_files:
+        if args.batch_size > 1:
+            print("OCR applies to single-image requests; batches go to the vision model")
+        else:
+            ocr = build_ocr_pool(image_files, args.ocr_engine, args.ocr_confidence, cache)
+    
+    # Process the images concurrently; results come back in input order
+    new_activities = []
+    savings_before = copy.deepcopy(get_token_tracker().savings)
+    for image_file, activity_info_list in extract_images_concurrently(
+            image_files, workers=args.workers, save_raw=args.save_raw, cache=cache,
+            near_duplicates=near_duplicates, batch_size=args.batch_size, router=router, ocr=ocr):
+        # Add source file for reference to each activity
+        for activity_info in activity_info_list:
+            activity_info["source_file"] = os.path.basename(image_file)
+            new_activities.append(activity_info)
+        
+        # Failed extractions are not journaled, and their images stay in input/new, so a
+        # later run retries them
+        if any("error" in activity_info for activity_info in activity_info_list):
+            continue
+        # The result is durable once journaled, so a new image can be moved right away
+        journal.append(image_file, activity_info_list)
+        if move_processed:
+            dest_path = os.path.join(INPUT_DIR, os.path.basename(image_file))
+            print(f"Moving processed image to {dest_path}")
+            shutil.move(image_file, dest_path)
+    
+    if args.save_raw:
+        get_raw_store().flush()
+    if cache is not None:
+        cache.save()
+        stats = cache.get_stats()
+        print(f"Extraction cache: {stats['hits']} hits, {stats['misses']} misses ({stats['entries']} entries)")
+    if near_duplicates is not None:
+        print(f"Near-duplicate images reused: {near_duplicates.get_stats()['matches']}")
+    if ocr is not None:
+        ocr.close()
+        stats = ocr.get_stats()
+        print(f"OCR: {stats['confident']} of {stats['images']} images recognized confidently, "
+              f"{stats['errors']} errors, {stats['ocr_time']:.1f}s recognizing")
+    print_run_savings(savings_before)
+    if router is not None:
+        print_router_stats(router)
+    print_rate_limit_stats()
+    print_hedge_stats()
+    connections = get_client_stats()
+    if connections["requests"]:
+        print(f"HTTP connections: {connections['requests']} requests over {connections['connections_opened']} connections "
+              f"({connections['connection_reuses']} reused)")
+    
+    return new_activities
+
+def batch_extraction_requests(image_files: List[str]):
+    """Yield a (custom_id, request body) pair per image for the batch API; the custom id is the image name"""
+    for image_file in image_files:
+        try:
+            body = build_request(EXTRACTION_PROMPT, EXTRACTION_PROVIDER, EXTRACTION_MODEL, [image_file],
+                                 ACTIVITY_RESPONSE_SCHEMA)
+        except Exception as e:
+            print(f"Skipping {image_file}: {e}")
+            continue
+        yield os.path.basename(image_file), body
+
+def submit_batch_extraction(image_files: List[str], store: Optional[BatchJobStore] = None,
+                            client=None) -> List[Dict]:
+    """
+    Submit images for extraction through the provider's batch API instead of one request each.
+    
+    Batch requests cost half as much but complete within 24 hours, which suits bulk
+    re-extraction of the whole archive. The jobs are recorded in output/batch_jobs.json;
+    collect_batch_extraction ingests their results once they are ready.
+    
+    Args:
+        image_files (List[str]): Paths to the image files to extract
+        store (BatchJobStore, optional): Job store (defaults to output/batch_jobs.json)
+        client: OpenAI-style client (defaults to the shared client for EXTRACTION_PROVIDER)
+        
+    Returns:
+        List[Dict]: The submitted jobs
+    """
+    if not image_files:
+        print("No image files to submit.")
+        return []
+    store = store or BatchJobStore()
+    client = client or get_llm_client(EXTRACTION_PROVIDER)
+    jobs = submit_batch(client, batch_extraction_requests(image_files), store, EXTRACTION_PROVIDER,
+                        EXTRACTION_MODEL, metadata={"prompt_fingerprint": PROMPT_FINGERPRINT})
+    print(f"Submitted {sum(len(job['custom_ids']) for job in jobs)} images in {len(jobs)} batch jobs. "
+          f"Run with --batch-collect to ingest the results once they are ready.")
+    return jobs
+
+def collect_batch_extraction(store: Optional[BatchJobStore] = None, client=None) -> Dict[str, int]:
+    """
+    Check submitted batch jobs and save the responses of finished ones to the raw response store.
+    
+    Jobs still running are left for a later collect. A response is stored under its image
+    like a --save-raw response, so --from-raw turns the collected responses into activities.
+    
+    Args:
+        store (BatchJobStore, optional): Job store (defaults to output/batch_jobs.json)
+        client: OpenAI-style client (defaults to the shared client for EXTRACTION_PROVIDER)
+        
+    Returns:
+        Dict[str, int]: Counts of jobs still running, jobs collected, responses saved and failed requests
+    """
+    store = store or BatchJobStore()
+    pending = store.pending()
+    counts = {"running": 0, "collected": 0, "saved": 0, "failed": 0}
+    if not pending:
+        print("No batch jobs waiting to be collected.")
+        return counts
+    
+    client = client or get_llm_client(EXTRACTION_PROVIDER)
+    raw_store = get_raw_store()
+    savings_before = copy.deepcopy(get_token_tracker().savings)
+    for job in pending:
+        refresh_job(client, job)
+        if job["status"] not in TERMINAL_STATES:
+            counts["running"] += 1
+            print(f"Batch {job['batch_id']} is {job['status']}")
+            continue
+        
+        # Expired and cancelled batches still return the requests they finished
+        results = read_batch_results(client, job.get("output_file_id"))
+        results.update(read_batch_results(client, job.get("error_file_id")))
+        for custom_id in job["custom_ids"]:
+            result = results.get(custom_id)
+            content, token_usage, error = result_content(result) if result else (None, None, "No result")
+            if error is not None:
+                counts["failed"] += 1
+                print(f"Batch request for {custom_id} failed: {error}")
+                continue
+            track_batch_usage(token_usage, job["provider"], job["model"])
+            raw_store.save(custom_id, content, job.get("prompt_fingerprint"))
+            counts["saved"] += 1
+        job["collected"] = True
+        counts["collected"] += 1
+        print(f"Batch {job['batch_id']} {job['status']}: collected {len(job['custom_ids'])} requests")
+    
+    store.save()
+    raw_store.flush()
+    print_run_savings(savings_before)
+    print(f"Saved {counts['saved']} responses to {raw_store.raw_dir} ({counts['failed']} failed requests, "
+          f"{counts['running']} jobs still running)")
+    if counts["saved"]:
+        print("Run with --from-raw to build activities from the collected responses.")
+    return counts
+
+def archive_past_activities(store: ActivityStore, archive: Optional[ActivityArchive] = None) -> int:
+    """
+    Move archived activities out of the activity store into the monthly cold archive.
+    
+    Args:
+        store (ActivityStore): The activity store
+        archive (ActivityArchive, optional): The cold archive (defaults to output/archive)
+        
+    Returns:
+        int: Number of activities moved
+    """
+    archive = archive if archive is not None else ActivityArchive()
+    moved = archive.archive_store(store)
+    if moved:
+        print(f"Moved {moved} archived activities to {archive.archive_dir}")
+    return moved
+
+def load_activities(store: ActivityStore) -> List[Activity]:
+    """
+    Load the current activities from the activity store, importing activities.json the first time.
+    
+    Activities still marked archived in the store are moved to the cold archive first,
+    so only current and future activities are loaded.
+    
+    Args:
+        store (ActivityStore): The activity store
+        
+    Returns:
+        List[Activity]: All saved current activities
+    """
+    json_output_path = os.path.join(OUTPUT_DIR, JSON_FILE)
+    store.import_json(json_output_path)
+    if archive_past_activities(store):
+        store.export_json(json_output_path)
+    activities = activities_from_dicts(store.load())
+    print(f"Loaded {len(activities)} existing activities from {store.db_file}")
+    return activities
+
+def save_activities(activities: List[Activity], store: Optional[ActivityStore] = None) -> List[Activity]:
+    """
+    Save the activities to the activity store and write the markdown and JSON output files.
+    
+    Only new and changed activities are written to the store. Activities marked
+    archived are then moved to the cold archive, and activities.json is exported from
+    the store for the map and other readers.
+    
+    Args:
+        activities (List[Activity]): All activities, as loaded from the store plus any new ones
+        store (ActivityStore, optional): The activity store (defaults to output/activities.db)
+        
+    Returns:
+        List[Activity]: The current activities left in the store
+    """
+    store = store if store is not None else ActivityStore()
+    json_output_path = os.path.join(OUTPUT_DIR, JSON_FILE)
+    changes = store.sync(activities_to_dicts(activities))
+    print(f"Activity store: {changes['inserted']} inserted, {changes['updated']} updated, "
+          f"{changes['deleted']} deleted")
+    moved = archive_past_activities(store)
+    if moved:
+        # Reload so the list lines up with the store again for the next sync
+        activities = activities_from_dicts(store.load())
+    if any(changes.values()) or moved or not os.path.exists(json_output_path):
+        store.export_json(json_output_path)
+    
+    try:
+        markdown_content = generate_markdown(activities)
+        with open(os.path.join(OUTPUT_DIR, OUTPUT_FILE), "w") as f:
+            f.write(markdown_content)
+    except Exception as e:
+        print(f"Error generating markdown: {e}")
+    return activities
+
+def process_new_images(image_files: List[str], all_activities: List[Activity], args: argparse.Namespace,
+                       journal: ExtractionJournal, splash_pads: List[Dict],
+                       recovered_activities: Optional[List[Dict]] = None,
+                       store: Optional[ActivityStore] = None) -> List[Activity]:
+    """
+    Run the extraction pipeline for a batch of new images and publish the results.
+    
+    Only the new records are extracted, sanitized, archived and location-validated; the
+    existing activities are left untouched. Only the new records are written to the
+    activity store; the markdown, JSON export and map are then regenerated.
+    
+    Args:
+        image_files (List[str]): New images in input/new
+        all_activities (List[Activity]): Activities already saved
+        args (argparse.Namespace): Parsed command-line options
+        journal (ExtractionJournal): Journal for crash-safe extraction
+        splash_pads (List[Dict]): Splash pads shown on the map
+        recovered_activities (List[Dict], optional): Activities replayed from an unfinished journal
+        store (ActivityStore, optional): The activity store the activities were loaded from
+        
+    Returns:
+        List[Activity]: The updated list of all activities
+    """
+    from map_generator import write_map
+    
+    new_activities = list(recovered_activities or [])
+    new_activities.extend(extract_images(image_files, args, journal, move_processed=True))
+    new_activities = activities_from_dicts(new_activities)
+    
+    try:
+        new_activities = sanitize_dates(new_activities)
+        new_activities = mark_archived_activities(new_activities)
+        new_activities = validate_location(new_activities)
+    except Exception as e:
+        print(f"Error post-processing new activities: {e}")
+        import traceback
+        traceback.print_exc()
+    
+    all_activities = save_activities(all_activities + new_activities, store)
+    write_map(all_activities, args.base_url, splash_pads)
+    
+    # The journal's results are now in the activity store
+    journal.clear()
+    print(f"Added {len(new_activities)} new activities from {len(image_files)} images "
+          f"({len(all_activities)} total)")
+    return all_activities
+
+def watch_new_images(all_activities: List[Activity], args: argparse.Namespace,
+                     store: Optional[ActivityStore] = None):
+    """
+    Watch input/new and process images as they arrive until interrupted.
+    
+    Bursts of files are debounced into one batch, and images already waiting in
+    input/new when the watcher starts are processed first.
+    
+    Args:
+        all_activities (List[Activity]): Activities already saved
+        args (argparse.Namespace): Parsed command-line options
+        store (ActivityStore, optional): The activity store the activities were loaded from
+    """
+    from map_generator import load_splash_pads
+    
+    journal = ExtractionJournal()
+    recovered_activities = []
+    if args.resume:
+        recovered_activities = [activity for entry in journal.replay() for activity in entry["activities"]]
+        print(f"Resuming: {len(recovered_activities)} activities recovered from {journal.journal_file}")
+    elif journal.exists():
+        print(f"Found an unfinished extraction journal at {journal.journal_file}.")
+        print("Run again with --resume to reuse its results, or delete it to start over.")
+        return
+    
+    os.makedirs(NEW_INPUT_DIR, exist_ok=True)
+    splash_pads = load_splash_pads()
+    watcher = DirectoryWatcher(NEW_INPUT_DIR, IMAGE_EXTENSIONS, debounce=args.debounce)
+    
+    # Images that arrived while nothing was watching
+    image_files = list_image_files(NEW_INPUT_DIR)
+    print(f"Watching {NEW_INPUT_DIR} for new images (using {watcher.backend}). Press Ctrl-C to stop.")
+    try:
+        while True:
+            if image_files or recovered_activities:
+                print(f"Processing {len(image_files)} new images...")
+                all_activities = process_new_images(image_files, all_activities, args, journal,
+                                                    splash_pads, recovered_activities, store)
+                recovered_activities = []
+            image_files = watcher.wait_for_batch()
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    finally:
+        watcher.close()
+
 async def fetch_web_activities() -> List[Dict]:
     """
     Fetch activities from web sources (do512family.com).
@@ -752,6 +1849,9 @@ async def fetch_web_activities() -> List[Dict]:
     print("\nFetching activities from web sources...")
     
     try:
+        # Imported here so commands that never scrape don't pay for bs4 and playwright
+        import do512_scraper
+        
         # Call the do512 scraper to get activities
         web_activities = await do512_scraper.fetch_weekend_activities()
         print(f"Fetched {len(web_activities)} activities from web sources")
@@ -762,6 +1862,30 @@ async def fetch_web_activities() -> List[Dict]:
         traceback.print_exc()
         return []
 
+async def extract_images_and_fetch_web(image_files: List[str], args: argparse.Namespace, journal: ExtractionJournal,
+                                       fetch_web: bool = True) -> Tuple[List[Dict], Optional[List[Dict]]]:
+    """
+    Extract activities from images and fetch web activities concurrently in one event loop.
+    
+    The thread-pool based image extraction runs in a worker thread while the asyncio
+    scraper runs in the loop, so scraping overlaps with the vision requests.
+    
+    Args:
+        image_files (List[str]): Paths to the image files to process
+        args (argparse.Namespace): Parsed command-line options
+        journal (ExtractionJournal): Journal that every extraction is appended to
+        fetch_web (bool): Whether to fetch web activities as well
+        
+    Returns:
+        Tuple[List[Dict], Optional[List[Dict]]]: The image activities and the web activities
+            (None when fetch_web is False)
+    """
+    extraction = asyncio.to_thread(extract_images, image_files, args, journal, args.new_only)
+    if not fetch_web:
+        return await extraction, None
+    image_activities, web_activities = await asyncio.gather(extraction, fetch_web_activities())
+    return image_activities, web_activities
+
 def main():
     # Set up command line arguments
     parser = argparse.ArgumentParser(description='Extract activity information from images and web sources')
@@ -771,20 +1895,50 @@ def main():
     parser.add_argument('--save-raw', action='store_true', help='Save raw LLM responses to files for later reprocessing')
     parser.add_argument('--from-raw', action='store_true', help='Process activities from saved raw responses instead of calling the LLM')
     parser.add_argument('--skip-web', action='store_true', help='Skip fetching activities from web sources')
-    parser.add_argument('--archive-past', action='store_true', help='Mark past activities as archived')
+    parser.add_argument('--archive-past', action='store_true', help='Move past activities to the monthly archive in output/archive')
+    parser.add_argument('--resume', action='store_true', help='Resume an interrupted extraction run from its journal')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore the extraction cache and call the LLM for every image')
+    parser.add_argument('--no-dedupe', action='store_true', help='Do not reuse extractions of near-duplicate screenshots')
+    parser.add_argument('--batch-size', type=int, default=1, help='Number of images packed into each vision request (default: 1)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help=f'Number of images to extract concurrently (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--route', action='store_true', help=f'Try {CHEAP_EXTRACTION_MODEL} first and escalate unreliable extractions to {EXTRACTION_MODEL}')
+    parser.add_argument('--route-threshold', type=float, default=DEFAULT_ROUTE_THRESHOLD, help=f'Share of activities that must have a name, a parseable date and a ZIP code to accept the cheaper model (default: {DEFAULT_ROUTE_THRESHOLD})')
+    parser.add_argument('--low-detail-first', action='store_true', help='Send images at low detail first and re-send at high detail only when critical fields are missing')
+    parser.add_argument('--ocr', action='store_true', help=f'Recognize text locally first and send confidently recognized text to {OCR_TEXT_MODEL} instead of the image')
+    parser.add_argument('--ocr-engine', type=str, default=DEFAULT_OCR_ENGINE, help=f'OCR engine: tesseract or module:function for a custom engine (default: {DEFAULT_OCR_ENGINE})')
+    parser.add_argument('--ocr-confidence', type=float, default=DEFAULT_OCR_CONFIDENCE, help=f'Mean word confidence needed to use the OCR text instead of the image (default: {DEFAULT_OCR_CONFIDENCE})')
+    parser.add_argument('--hedge', choices=['anthropic', 'azure', 'local'], help='Backup provider for vision requests that are slow or fail (hedged requests with failover); local needs a vision model in LLM_HEDGE_MODEL')
+    parser.add_argument('--batch-submit', action='store_true', help='Submit the images to the batch API (half price, results within 24 hours) instead of extracting them now')
+    parser.add_argument('--batch-collect', action='store_true', help='Save the results of finished batch jobs to the raw response store')
+    parser.add_argument('--watch', action='store_true', help='Keep running and process images as they arrive in input/new')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE, help=f'Seconds to wait for a burst of new images to settle in watch mode (default: {DEFAULT_DEBOUNCE})')
+    parser.add_argument('--base-url', type=str, default="", help="Base URL for the map regenerated in watch mode (e.g., '/repo-name')")
     args = parser.parse_args()
     
-    # Load existing activities if available
+    # Every query_llm call picks up the backup provider from the environment
+    if args.hedge:
+        os.environ[HEDGE_PROVIDER_ENV_VAR] = args.hedge
+    
+    # Load existing activities from the activity store
     json_output_path = os.path.join(OUTPUT_DIR, JSON_FILE)
-    existing_activities = []
+    processed_new_images = []  # journaled input/new files to move once the activities are saved
+    journal = None
+    web_activities = None  # fetched alongside image extraction when there are images to process
+    store = ActivityStore()
+    existing_activities = load_activities(store)
     
-    if os.path.exists(json_output_path):
-        try:
-            with open(json_output_path, "r") as f:
-                existing_activities = json.load(f)
-            print(f"Loaded {len(existing_activities)} existing activities from {json_output_path}")
-        except json.JSONDecodeError:
-            print(f"Error loading existing activities from {json_output_path}. Starting with empty list.")
+    # Watch mode only extracts new images and never refetches web sources
+    if args.watch:
+        watch_new_images(existing_activities, args, store)
+        return
+    
+    # Bulk re-extraction through the batch API happens in two separate runs
+    if args.batch_submit:
+        submit_batch_extraction(list_image_files(NEW_INPUT_DIR if args.new_only else INPUT_DIR))
+        return
+    if args.batch_collect:
+        collect_batch_extraction()
+        return
     
     # If sanitize-only mode or validate-locations mode, skip image processing
     if args.sanitize_only or args.validate_locations or args.archive_past:
@@ -796,102 +1950,49 @@ def main():
         elif args.archive_past:
             print(f"Archive-past mode: Marking past activities as archived in {len(all_activities)} existing activities...")
     elif args.from_raw:
-        # Process saved raw responses
-        raw_dir = os.path.join(OUTPUT_DIR, "raw_responses")
-        if not os.path.exists(raw_dir):
-            print(f"Error: Raw responses directory not found at {raw_dir}")
+        # Process saved raw responses; only new or changed responses are re-parsed
+        raw_store = get_raw_store()
+        if not raw_store.raw_dir.exists():
+            print(f"Error: Raw responses directory not found at {raw_store.raw_dir}")
             return
             
-        new_activities = []
-        raw_files = glob.glob(os.path.join(raw_dir, "*.json"))
-        
-        if not raw_files:
-            print(f"No raw response files found in {raw_dir}")
+        new_activities = raw_store.replay()
+        stats = raw_store.get_stats()
+        if not stats["responses"]:
+            print(f"No raw response files found in {raw_store.raw_dir}")
             return
             
-        print(f"Found {len(raw_files)} raw response files to process")
-        
-        for raw_file in raw_files:
-            try:
-                with open(raw_file, "r") as f:
-                    response = f.read()
-                    
-                # Extract file name (which came from the original image name)
-                base_name = os.path.basename(raw_file)
-                original_image = base_name.replace("_response.json", "")
-                    
-                # Try to parse the entire response as JSON
-                try:
-                    data = json.loads(response)
-                    
-                    # Handle both single objects and arrays
-                    if isinstance(data, dict):
-                        if 'activities' in data and isinstance(data['activities'], list):
-                            activities = data['activities']
-                        else:
-                            activities = [data]
-                    elif isinstance(data, list):
-                        activities = data
-                    else:
-                        print(f"Unexpected JSON structure in {raw_file}")
-                        continue
-                        
-                    # Add source file for reference to each activity
-                    for activity in activities:
-                        activity["source_file"] = f"{original_image}.jpg"  # Assume jpg extension
-                        new_activities.append(activity)
-                        
-                except json.JSONDecodeError:
-                    # Try to extract JSON from text
-                    json_pattern = re.search(r'(\[.*\]|\{.*\})', response, re.DOTALL)
-                    if json_pattern:
-                        json_str = json_pattern.group(1)
-                        try:
-                            data = json.loads(json_str)
-                            
-                            # Handle both single objects and arrays
-                            if isinstance(data, dict):
-                                if 'activities' in data and isinstance(data['activities'], list):
-                                    activities = data['activities']
-                                else:
-                                    activities = [data]
-                            elif isinstance(data, list):
-                                activities = data
-                            else:
-                                print(f"Unexpected JSON structure in {raw_file}")
-                                continue
-                                
-                            # Add source file for reference to each activity
-                            for activity in activities:
-                                activity["source_file"] = f"{original_image}.jpg"  # Assume jpg extension
-                                new_activities.append(activity)
-                                
-                        except json.JSONDecodeError:
-                            print(f"Could not parse JSON in {raw_file}")
-                    else:
-                        print(f"No JSON found in {raw_file}")
-                        
-            except Exception as e:
-                print(f"Error processing raw response file {raw_file}: {e}")
-                
+        print(f"Found {stats['responses']} raw response files: {stats['reparsed']} parsed, "
+              f"{stats['reused']} unchanged, {stats['errors']} unparseable")
         print(f"Processed {len(new_activities)} activities from raw responses")
-        all_activities = existing_activities + new_activities
+        all_activities = existing_activities + activities_from_dicts(new_activities)
     else:
         # Determine which directory to process
         process_dir = NEW_INPUT_DIR if args.new_only else INPUT_DIR
         
-        # Get image files from the selected directory
-        image_files = []
-        for ext in ['jpg', 'jpeg', 'png', 'JPG', 'JPEG', 'PNG']:
-            if args.new_only:
-                image_files.extend(glob.glob(os.path.join(process_dir, f"*.{ext}")))
-            else:
-                # When processing all images, don't include images in the 'new' subdirectory
-                image_files.extend(glob.glob(os.path.join(process_dir, f"*.{ext}")))
-                # Also don't include any other subdirectories
-                image_files = [f for f in image_files if os.path.dirname(f) == process_dir]
+        # Get image files from the selected directory (sorted so the output order is stable).
+        # When processing all images, images in the 'new' subdirectory are not included.
+        image_files = list_image_files(process_dir)
+        
+        # Every extraction is journaled as it completes so an interrupted run can be resumed
+        journal = ExtractionJournal()
+        journaled_entries = []
+        if args.resume:
+            journaled_entries = journal.replay()
+            print(f"Resuming: {len(journaled_entries)} images already extracted in {journal.journal_file}")
+        elif journal.exists():
+            print(f"Found an unfinished extraction journal at {journal.journal_file}.")
+            print("Run again with --resume to reuse its results, or delete it to start over.")
+            return
+        
+        # Skip images the journal already covers; images still in input/new are moved at the end
+        journaled_files = {entry["source_file"] for entry in journaled_entries}
+        if args.new_only:
+            processed_new_images.extend(f for f in image_files if os.path.basename(f) in journaled_files)
+        image_files = [f for f in image_files if os.path.basename(f) not in journaled_files]
+        new_activities = [activity for entry in journaled_entries for activity in entry["activities"]]
         
-        if not image_files:
+        if not image_files and not journaled_entries:
             print(f"No image files found in {process_dir} directory.")
             if not existing_activities:
                 if args.skip_web:
@@ -902,45 +2003,33 @@ def main():
                 print("Will proceed with existing activities only.")
             all_activities = existing_activities
         else:
-            print(f"Found {len(image_files)} image files to process.")
-            
-            # Process each image
-            new_activities = []
-            for image_file in image_files:
-                activity_info_list = extract_activity_info(image_file, save_raw=args.save_raw)
-                
-                # Add source file for reference to each activity
-                for activity_info in activity_info_list:
-                    activity_info["source_file"] = os.path.basename(image_file)
-                    new_activities.append(activity_info)
-                
-                # If processing new images, move the processed image to the main input directory
-                if args.new_only:
-                    dest_path = os.path.join(INPUT_DIR, os.path.basename(image_file))
-                    print(f"Moving processed image to {dest_path}")
-                    shutil.move(image_file, dest_path)
+            print(f"Found {len(image_files)} image files to process with {args.workers} workers.")
+            # Scrape the web sources while the images are being extracted
+            image_activities, web_activities = asyncio.run(
+                extract_images_and_fetch_web(image_files, args, journal, fetch_web=not args.skip_web))
+            new_activities.extend(image_activities)
             
             # Combine existing and new activities
-            all_activities = existing_activities + new_activities
+            all_activities = existing_activities + activities_from_dicts(new_activities)
     
     # Fetch activities from web sources if not skipped
     if not args.skip_web and not args.sanitize_only and not args.validate_locations:
-        web_activities = asyncio.run(fetch_web_activities())
+        if web_activities is None:
+            web_activities = asyncio.run(fetch_web_activities())
         
         # Add web activities to all activities
         if web_activities:
-            # Create a set of existing activity signatures for deduplication
-            existing_signatures = {
-                f"{a.get('activity_name')}_{a.get('date')}_{a.get('location')}"
-                for a in all_activities
-            }
+            # Create a set of existing activity signatures for deduplication, including
+            # activities already moved to the cold archive
+            existing_signatures = {activity.signature for activity in all_activities}
+            existing_signatures.update(ActivityArchive().archived_signatures(web_activities))
             
             # Add new web activities if they don't already exist
             new_web_activities = []
             for activity in web_activities:
-                signature = f"{activity.get('activity_name')}_{activity.get('date')}_{activity.get('location')}"
+                signature = activity_signature(activity)
                 if signature not in existing_signatures:
-                    new_web_activities.append(activity)
+                    new_web_activities.append(Activity.from_dict(activity))
                     existing_signatures.add(signature)
             
             print(f"Adding {len(new_web_activities)} new web activities")
@@ -957,8 +2046,7 @@ def main():
             traceback.print_exc()
             # Save the current state in case of error
             error_file = os.path.join(OUTPUT_DIR, "activities_error.json")
-            with open(error_file, "w") as f:
-                json.dump(all_activities, f, indent=2)
+            write_activities(error_file, (activity.to_dict() for activity in all_activities))
             print(f"Saved current state to {error_file}")
             return
     
@@ -971,8 +2059,7 @@ def main():
         traceback.print_exc()
         # Save the current state in case of error
         error_file = os.path.join(OUTPUT_DIR, "archiving_error.json")
-        with open(error_file, "w") as f:
-            json.dump(all_activities, f, indent=2)
+        write_activities(error_file, (activity.to_dict() for activity in all_activities))
         print(f"Saved current state to {error_file}")
         # Continue with the process even if archiving fails
     
@@ -986,25 +2073,23 @@ def main():
         traceback.print_exc()
         # Save the current state in case of error
         error_file = os.path.join(OUTPUT_DIR, "locations_error.json")
-        with open(error_file, "w") as f:
-            json.dump(all_activities, f, indent=2)
+        write_activities(error_file, (activity.to_dict() for activity in all_activities))
         print(f"Saved current state to {error_file}")
         # Continue with the process even if location validation fails
     
-    # Generate markdown
-    try:
-        markdown_content = generate_markdown(all_activities)
-        
-        # Write to output files
-        output_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE)
-        with open(output_path, "w") as f:
-            f.write(markdown_content)
-    except Exception as e:
-        print(f"Error generating markdown: {e}")
+    # Save to the activity store and write the markdown and JSON files
+    output_path = os.path.join(OUTPUT_DIR, OUTPUT_FILE)
+    all_activities = save_activities(all_activities, store)
+    
+    # Now that the results are saved, move any journaled new images that were not moved yet
+    for image_file in processed_new_images:
+        dest_path = os.path.join(INPUT_DIR, os.path.basename(image_file))
+        print(f"Moving processed image to {dest_path}")
+        shutil.move(image_file, dest_path)
     
-    # Save JSON
-    with open(json_output_path, "w") as f:
-        json.dump(all_activities, f, indent=2)
+    # The journal's results are now in the activity store
+    if journal is not None:
+        journal.clear()
     
     print(f"Activity information saved to {output_path}")
     print(f"Raw data saved to {json_output_path}")
@@ -1014,7 +2099,7 @@ def main():
     elif args.validate_locations:
         print(f"Location validation completed for {len(all_activities)} activities.")
     elif args.archive_past:
-        print(f"Archive marking completed for {len(all_activities)} activities.")
+        print(f"Archiving completed: {len(all_activities)} current activities remain.")
     elif args.from_raw:
         print(f"Processed {len(all_activities)} total activities from raw responses.")
     elif args.new_only:
@@ -27,6 +27,8 @@ from bs4 import BeautifulSoup, NavigableString, Tag
 # Add the current directory to path to ensure we can import from tools
 sys.path.append('.')
 from tools.web_scraper import fetch_page
+from tools.activity_store import ActivityStore
+from tools.activity_archive import ActivityArchive
 
 # Define constants
 OUTPUT_DIR = "output"
@@ -904,48 +906,34 @@ async def fetch_calendar_activities(days_to_fetch: int = 7) -> List[Dict]:
     # Format activities to match app structure
     return adapt_to_app_format(processed_events)
 
-async def merge_with_app_data(activities: List[Dict], app_file: str = APP_JSON_FILE) -> None:
+async def merge_with_app_data(activities: List[Dict], app_file: str = APP_JSON_FILE,
+                              store: Optional[ActivityStore] = None,
+                              archive: Optional[ActivityArchive] = None) -> None:
     """
     Merge activities with existing app data.
     
+    New activities are appended to the activity store (existing records are not rewritten)
+    and app_file is re-exported from it. Activities that were already moved to the cold
+    archive are not added again.
+    
     Args:
         activities (List[Dict]): New activities to merge
         app_file (str): Path to app data file
+        store (ActivityStore, optional): The activity store (defaults to output/activities.db)
+        archive (ActivityArchive, optional): The cold archive (defaults to output/archive)
     """
-    if not os.path.exists(app_file):
-        print(f"App data file {app_file} not found. Creating new file.")
-        with open(app_file, 'w') as f:
-            json.dump(activities, f, indent=2)
-        return
-    
     try:
-        # Load existing activities
-        with open(app_file, 'r') as f:
-            existing_activities = json.load(f)
-        
-        # Create a set of existing activity signatures for deduplication
-        existing_signatures = {
-            f"{a.get('activity_name')}_{a.get('date')}_{a.get('location')}"
-            for a in existing_activities
-        }
+        store = store if store is not None else ActivityStore()
+        archive = archive if archive is not None else ActivityArchive()
+        # The first merge imports the existing app data file into the store
+        store.import_json(app_file)
         
-        # Add new activities if they don't already exist
-        new_activities = []
-        for activity in activities:
-            signature = f"{activity.get('activity_name')}_{activity.get('date')}_{activity.get('location')}"
-            if signature not in existing_signatures:
-                new_activities.append(activity)
-                existing_signatures.add(signature)
+        # Activities whose name, date and location are already stored or archived are skipped
+        new_activities = store.add(activities, skip=archive.archived_signatures(activities))
         
-        # Only update if we have new activities
-        if new_activities:
+        if new_activities or not os.path.exists(app_file):
             print(f"Adding {len(new_activities)} new activities to app data")
-            existing_activities.extend(new_activities)
-            
-            # Save updated activities
-            with open(app_file, 'w') as f:
-                json.dump(existing_activities, f, indent=2)
-            
+            store.export_json(app_file)
             print(f"Successfully merged activities with app data")
         else:
             print("No new activities to add")
@@ -16,6 +16,9 @@ from typing import Dict, List, Optional, Tuple
 from urllib.parse import quote
 from dotenv import load_dotenv
 
+from tools.activity_store import ActivityStore
+from tools.activity_record import Activity, activities_from_dicts
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -182,13 +185,13 @@ def parse_time_period(time_str: Optional[str]) -> str:
     else:
         return "unknown"
 
-def get_unique_dates(activities: List[Dict]) -> List[str]:
+def get_unique_dates(activities: List[Activity]) -> List[str]:
     """
     Get a sorted list of unique dates from activities.
     For dates where all activities are archived, they will be excluded from the list.
     
     Args:
-        activities (List[Dict]): List of activity dictionaries
+        activities (List[Activity]): List of activities
     
     Returns:
         List[str]: Sorted list of unique date strings from active activities
@@ -196,8 +199,8 @@ def get_unique_dates(activities: List[Dict]) -> List[str]:
     # Group activities by date
     date_groups = {}
     for activity in activities:
-        date_str = activity.get('date')
-        is_archived = activity.get('is_archived', False)
+        date_str = activity.date
+        is_archived = activity.is_archived
         
         if date_str:
             if date_str not in date_groups:
@@ -233,12 +236,28 @@ def get_unique_dates(activities: List[Dict]) -> List[str]:
     
     return sorted_dates
 
-def generate_html(activities: List[Dict], base_url: str = "", splash_pads: List[Dict] = []) -> str:
+def time_period_from_minutes(minutes: int) -> str:
+    """
+    Classify a start time given in minutes after midnight as morning, afternoon, or evening.
+    
+    Args:
+        minutes (int): Start time in minutes after midnight
+        
+    Returns:
+        str: "morning", "afternoon", "evening", or "unknown"
+    """
+    hour = minutes // 60
+    for period, (start, end) in (("morning", MORNING), ("afternoon", AFTERNOON), ("evening", EVENING)):
+        if start <= hour < end:
+            return period
+    return "unknown"
+
+def generate_html(activities: List[Activity], base_url: str = "", splash_pads: List[Dict] = []) -> str:
     """
     Generate an HTML file with a Google Map showing all activity locations with filtering options.
     
     Args:
-        activities (List[Dict]): List of activity dictionaries
+        activities (List[Activity]): List of activities
         base_url (str): Optional base URL for GitHub Pages or other hosted environment
         splash_pads (List[Dict]): List of splash pad dictionaries
         
@@ -246,10 +265,15 @@ def generate_html(activities: List[Dict], base_url: str = "", splash_pads: List[
         str: HTML content
     """
     # Filter activities to only include those with locations and that are not archived
+    # Addresses are extracted once per distinct location
+    addresses = {}
+    for activity in activities:
+        if activity.location_id is not None and activity.location_id not in addresses:
+            addresses[activity.location_id] = extract_address(activity.location) if activity.location else None
     activities_with_locations = [
         activity for activity in activities 
-        if activity.get('location') and extract_address(activity.get('location'))
-        and not activity.get('is_archived', False)  # Only include non-archived activities
+        if activity.location_id is not None and addresses[activity.location_id]
+        and not activity.is_archived  # Only include non-archived activities
     ]
     
     # Filter splash pads to only include those with addresses
@@ -315,7 +339,7 @@ def generate_html(activities: List[Dict], base_url: str = "", splash_pads: List[
     # This ensures the date filter only shows dates for activities that are actually visible
     active_dates = []
     for activity in activities_with_locations:
-        date_str = activity.get('date')
+        date_str = activity.date
         if date_str and date_str not in active_dates:
             active_dates.append(date_str)
     
@@ -338,24 +362,27 @@ def generate_html(activities: List[Dict], base_url: str = "", splash_pads: List[
     # Prepare marker data with additional attributes for filtering
     markers_data = []
     for activity in activities_with_locations:
-        name = activity.get('activity_name', 'Unnamed Activity')
-        location = activity.get('location', '')
-        date_str = activity.get('date')
-        time_str = activity.get('time', 'Time not specified')
-        description = activity.get('description', '')
-        additional_details = activity.get('additional_details', '')
-        source_file = activity.get('source_file', '')
-        source_url = activity.get('source_url', '')
+        name = activity.activity_name or 'Unnamed Activity'
+        location = activity.location
+        date_str = activity.date
+        time_str = activity.time or 'Time not specified'
+        description = activity.description or ''
+        additional_details = activity.additional_details or ''
+        source_file = activity.source_file or ''
+        source_url = activity.source_url or ''
         
-        # Parse additional data for filtering
-        time_period = parse_time_period(time_str)
+        # Parse additional data for filtering (the start time is usually parsed already)
+        if activity.start_minutes is not None:
+            time_period = time_period_from_minutes(activity.start_minutes)
+        else:
+            time_period = parse_time_period(activity.time)
         
         # Get color based on time period
         color = PIN_COLORS.get(time_period, PIN_COLORS["unknown"])
         
         markers_data.append({
             "name": name,
-            "address": extract_address(location),
+            "address": addresses[activity.location_id],
             "full_location": location,
             "date": date_str,
             "time": time_str,
@@ -857,38 +884,16 @@ def generate_html(activities: List[Dict], base_url: str = "", splash_pads: List[
     
     return html
 
-def main():
+def load_splash_pads(debug: bool = False) -> List[Dict]:
     """
-    Main function to parse arguments and generate the HTML map file.
-    """
-    parser = argparse.ArgumentParser(description="Generate a Google Map HTML file from activities JSON")
-    parser.add_argument('--base-url', type=str, default="", 
-                        help="Optional base URL for GitHub Pages (e.g., '/repo-name')")
-    # We're keeping the analytics parameter for backward compatibility but it's no longer needed
-    parser.add_argument('--analytics-id', type=str, default="", 
-                        help="[DEPRECATED] Google Analytics tracking ID is now hardcoded")
-    parser.add_argument('--debug', action='store_true',
-                        help="Enable debug output")
-    args = parser.parse_args()
-    
-    # Check if output directory exists, create if not
-    if not os.path.exists(OUTPUT_DIR):
-        os.makedirs(OUTPUT_DIR)
+    Load the splash pad data scraped by splash_pad_extractor.py.
     
-    # Read the activities JSON file
-    json_path = os.path.join(OUTPUT_DIR, JSON_FILE)
-    if not os.path.exists(json_path):
-        print(f"Error: {json_path} not found. Run activity_extractor.py first.")
-        return 1
-    
-    try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            activities = json.load(f)
-    except json.JSONDecodeError:
-        print(f"Error: Unable to parse {json_path}. The file may be corrupted.")
-        return 1
-    
-    # Load splash pad data
+    Args:
+        debug (bool): Print each splash pad that was loaded
+        
+    Returns:
+        List[Dict]: List of splash pad dictionaries (empty if the file is missing or corrupted)
+    """
     splash_pads_file = os.path.join(OUTPUT_DIR, SPLASH_PADS_FILE)
     splash_pads = []
     
@@ -899,7 +904,7 @@ def main():
             print(f"Loaded {len(splash_pads)} splash pads from {splash_pads_file}")
             
             # Print debugging info for each splash pad
-            if args.debug:
+            if debug:
                 print("\nSplash pad details:")
                 for i, pad in enumerate(splash_pads):
                     print(f"{i+1}. {pad.get('name')} - Address: {pad.get('address')}")
@@ -908,14 +913,27 @@ def main():
     else:
         print(f"Warning: Splash pads file not found at {splash_pads_file}")
     
-    # Generate HTML (analytics code is now hardcoded in the template)
-    html_content = generate_html(activities, args.base_url, splash_pads)
+    return splash_pads
+
+def write_map(activities: List[Activity], base_url: str = "", splash_pads: Optional[List[Dict]] = None) -> str:
+    """
+    Generate the map HTML from in-memory activities and write it to the output and root directories.
+    
+    Args:
+        activities (List[Activity]): List of activities
+        base_url (str): Optional base URL for GitHub Pages or other hosted environment
+        splash_pads (List[Dict], optional): Splash pads to include; loaded from disk if not given
+        
+    Returns:
+        str: Path of the generated HTML file in the output directory
+    """
+    if splash_pads is None:
+        splash_pads = load_splash_pads()
     
-    # If analytics ID is provided, display a notice that it's no longer needed
-    if args.analytics_id:
-        print("Note: The --analytics-id parameter is no longer needed as the Google Analytics code is now hardcoded.")
+    html_content = generate_html(activities, base_url, splash_pads)
     
     # Write the HTML file
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
     html_path = os.path.join(OUTPUT_DIR, HTML_FILE)
     with open(html_path, 'w', encoding='utf-8') as f:
         f.write(html_content)
@@ -928,6 +946,45 @@ def main():
         f.write(html_content)
     
     print(f"Also generated map at {HTML_FILE}")
+    return html_path
+
+def main():
+    """
+    Main function to parse arguments and generate the HTML map file.
+    """
+    parser = argparse.ArgumentParser(description="Generate a Google Map HTML file from activities JSON")
+    parser.add_argument('--base-url', type=str, default="", 
+                        help="Optional base URL for GitHub Pages (e.g., '/repo-name')")
+    # We're keeping the analytics parameter for backward compatibility but it's no longer needed
+    parser.add_argument('--analytics-id', type=str, default="", 
+                        help="[DEPRECATED] Google Analytics tracking ID is now hardcoded")
+    parser.add_argument('--debug', action='store_true',
+                        help="Enable debug output")
+    args = parser.parse_args()
+    
+    # Check if output directory exists, create if not
+    if not os.path.exists(OUTPUT_DIR):
+        os.makedirs(OUTPUT_DIR)
+    
+    # Stream the current activities from the activity store (importing the JSON file the
+    # first time); archived activities are never shown, so they are never read
+    json_path = os.path.join(OUTPUT_DIR, JSON_FILE)
+    store = ActivityStore()
+    store.import_json(json_path)
+    activities = activities_from_dicts(store.iter_load(archived=False))
+    if not activities and not len(store):
+        print(f"Error: No activities in {store.db_file} or {json_path}. Run activity_extractor.py first.")
+        return 1
+    
+    # Load splash pad data
+    splash_pads = load_splash_pads(debug=args.debug)
+    
+    # If analytics ID is provided, display a notice that it's no longer needed
+    if args.analytics_id:
+        print("Note: The --analytics-id parameter is no longer needed as the Google Analytics code is now hardcoded.")
+    
+    # Generate and write the HTML (analytics code is now hardcoded in the template)
+    write_map(activities, args.base_url, splash_pads)
     
     if GOOGLE_API_KEY == "YOUR_API_KEY":
         print("\nWarning: Using default Google API key. For a proper map:")
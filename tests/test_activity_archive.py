@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import sys
+import gzip
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.activity_archive import ActivityArchive
+from tools.activity_store import ActivityStore
+
+def activity(name, date, **fields):
+    return {"activity_name": name, "date": date, "location": "Zilker Park, Austin, TX 78746", **fields}
+
+class TestActivityArchive(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.archive = ActivityArchive(self.temp_dir / "archive")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_append_partitions_by_month(self):
+        added = self.archive.append([activity("Storytime", "2025-03-01"), activity("Egg Hunt", "2025-04-19"),
+                                     activity("Kite Day", "2025-04-05"), activity("Open Gym", "next Saturday")])
+        self.assertEqual(added, {"2025-03": 1, "2025-04": 2, "undated": 1})
+        self.assertEqual(self.archive.partitions(), ["2025-03", "2025-04", "undated"])
+        with gzip.open(self.archive.partition_file("2025-04"), "rt") as f:
+            self.assertEqual([json.loads(line)["activity_name"] for line in f], ["Egg Hunt", "Kite Day"])
+
+        # A second append adds a gzip member and skips activities that are already archived
+        added = self.archive.append([activity("Egg Hunt", "2025-04-19"), activity("Splash Day", "2025-04-26")])
+        self.assertEqual(added, {"2025-04": 1})
+        self.assertEqual([a["activity_name"] for a in self.archive.iter_load()],
+                         ["Storytime", "Egg Hunt", "Kite Day", "Splash Day", "Open Gym"])
+
+    def test_iter_load_reads_only_the_date_range(self):
+        self.archive.append([activity("Storytime", "2025-03-01"), activity("Egg Hunt", "2025-04-19"),
+                             activity("Kite Day", "2025-04-05"), activity("Open Gym", None)])
+        # Partitions outside the range are not opened
+        self.archive.partition_file("2025-03").write_bytes(b"not gzip")
+        names = lambda **dates: [a["activity_name"] for a in self.archive.iter_load(**dates)]
+        self.assertEqual(names(date_from="2025-04-10"), ["Egg Hunt"])
+        self.assertEqual(names(date_from="2025-04-01", date_to="2025-04-10"), ["Kite Day"])
+
+    def test_archived_signatures_reads_only_candidate_partitions(self):
+        self.archive.append([activity("Storytime", "2025-03-01"), activity("Egg Hunt", "2025-04-19")])
+        self.archive.partition_file("2025-03").write_bytes(b"not gzip")
+        signatures = self.archive.archived_signatures([activity("Egg Hunt", "2025-04-19"),
+                                                       activity("Kite Day", "2025-04-05"),
+                                                       activity("Open Gym", "2025-05-03")])
+        self.assertEqual(signatures, {"Egg Hunt_2025-04-19_Zilker Park, Austin, TX 78746"})
+
+    def test_truncated_member_keeps_earlier_activities(self):
+        self.archive.append([activity("Egg Hunt", "2025-04-19")])
+        partition_file = self.archive.partition_file("2025-04")
+        intact = partition_file.read_bytes()
+        self.archive.append([activity("Kite Day", "2025-04-05")])
+        partition_file.write_bytes(partition_file.read_bytes()[:len(intact) + 10])
+        self.assertEqual([a["activity_name"] for a in self.archive.iter_load()], ["Egg Hunt"])
+
+    def test_archive_store_moves_archived_activities(self):
+        store = ActivityStore(self.temp_dir / "activities.db")
+        try:
+            store.sync([activity("Egg Hunt", "2025-04-19", is_archived=True), activity("Splash Day", "2025-06-01")])
+            loaded = store.load()
+            loaded[1]["is_archived"] = True
+            loaded.append(activity("Kite Day", "2099-04-05"))
+            store.sync(loaded)
+
+            self.assertEqual(self.archive.archive_store(store), 2)
+            self.assertEqual(self.archive.archive_store(store), 0)
+            self.assertEqual(store.load(), [activity("Kite Day", "2099-04-05")])
+            self.assertEqual(self.archive.partitions(), ["2025-04", "2025-06"])
+            self.assertEqual([a["activity_name"] for a in self.archive.iter_history(store)],
+                             ["Egg Hunt", "Splash Day", "Kite Day"])
+            self.assertEqual([a["activity_name"] for a in self.archive.iter_history(store, date_from="2025-05-01")],
+                             ["Splash Day", "Kite Day"])
+        finally:
+            store.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+
+import unittest
+from unittest.mock import patch, MagicMock
+import json
+import os
+import sys
+import time
+import asyncio
+import argparse
+import shutil
+import tempfile
+
+# Add the parent directory to the Python path so we can import the module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import activity_extractor
+from tools.ocr import OCRResult
+from tools.extraction_journal import ExtractionJournal
+
+class TestConcurrentExtraction(unittest.TestCase):
+    @patch('activity_extractor.extract_activity_info')
+    def test_results_keep_input_order(self, mock_extract):
+        """Results are yielded in input order even when later images finish first"""
+        def slow_first(image_path, *args, **kwargs):
+            # The first image is the slowest, so it completes last
+            if image_path.endswith('a.jpg'):
+                time.sleep(0.2)
+            return [{"activity_name": os.path.basename(image_path)}]
+        mock_extract.side_effect = slow_first
+
+        image_files = ['input/a.jpg', 'input/b.jpg', 'input/c.jpg']
+        results = list(activity_extractor.extract_images_concurrently(image_files, workers=3))
+
+        self.assertEqual([image for image, _ in results], image_files)
+        self.assertEqual(results[0][1][0]["activity_name"], 'a.jpg')
+        self.assertEqual(mock_extract.call_count, 3)
+
+    @patch('activity_extractor.extract_activity_info')
+    def test_workers_lower_bound(self, mock_extract):
+        """A worker count below one still processes every image"""
+        mock_extract.return_value = []
+        results = list(activity_extractor.extract_images_concurrently(['input/a.jpg'], workers=0))
+        self.assertEqual(len(results), 1)
+
+class TestOverlappedPipeline(unittest.TestCase):
+    @patch('activity_extractor.fetch_web_activities')
+    @patch('activity_extractor.extract_images')
+    def test_web_fetch_overlaps_image_extraction(self, mock_extract, mock_fetch):
+        """Scraping runs while the images are extracted instead of after them"""
+        def extract(*args):
+            time.sleep(0.3)
+            return [{"activity_name": "From image"}]
+        
+        async def fetch():
+            await asyncio.sleep(0.3)
+            return [{"activity_name": "From web"}]
+        
+        mock_extract.side_effect = extract
+        mock_fetch.side_effect = fetch
+        args = argparse.Namespace(new_only=False)
+        
+        start = time.time()
+        image_activities, web_activities = asyncio.run(
+            activity_extractor.extract_images_and_fetch_web(['input/a.jpg'], args, journal=None))
+        elapsed = time.time() - start
+        
+        self.assertEqual(image_activities, [{"activity_name": "From image"}])
+        self.assertEqual(web_activities, [{"activity_name": "From web"}])
+        self.assertLess(elapsed, 0.55)
+
+    @patch('activity_extractor.fetch_web_activities')
+    @patch('activity_extractor.extract_images', return_value=[])
+    def test_web_fetch_skipped(self, mock_extract, mock_fetch):
+        args = argparse.Namespace(new_only=False)
+        result = asyncio.run(activity_extractor.extract_images_and_fetch_web([], args, journal=None, fetch_web=False))
+        self.assertEqual(result, ([], None))
+        mock_fetch.assert_not_called()
+
+GOOD_ACTIVITY = {"activity_name": "Storytime", "date": "2025-04-12", "location": "Central Library, Austin, TX 78701"}
+
+class TestModelRouting(unittest.TestCase):
+    def test_assess_extraction(self):
+        self.assertEqual(activity_extractor.assess_extraction([GOOD_ACTIVITY]), 1.0)
+        self.assertEqual(activity_extractor.assess_extraction([]), 0.0)
+        no_zip = dict(GOOD_ACTIVITY, location="Central Library")
+        no_date = dict(GOOD_ACTIVITY, date=None)
+        no_name = dict(GOOD_ACTIVITY, activity_name="")
+        self.assertEqual(activity_extractor.assess_extraction([GOOD_ACTIVITY, no_zip, no_date, no_name]), 0.25)
+
+    @patch('activity_extractor.query_llm')
+    def test_reliable_cheap_extraction_is_not_escalated(self, mock_query):
+        mock_query.return_value = json.dumps({"activities": [GOOD_ACTIVITY]})
+        router = activity_extractor.build_extraction_router()
+        activities, ok = activity_extractor.query_and_parse('input/a.jpg', router=router)
+        self.assertTrue(ok)
+        self.assertEqual(activities, [GOOD_ACTIVITY])
+        self.assertEqual([c.kwargs["model"] for c in mock_query.call_args_list], ["gpt-4o-mini"])
+
+    @patch('activity_extractor.query_llm')
+    def test_unreliable_cheap_extraction_is_escalated(self, mock_query):
+        vague = dict(GOOD_ACTIVITY, location="The library")
+        mock_query.side_effect = [
+            json.dumps({"activities": [vague]}),
+            json.dumps({"activities": [GOOD_ACTIVITY]})
+        ]
+        router = activity_extractor.build_extraction_router()
+        activities, ok = activity_extractor.query_and_parse('input/a.jpg', router=router)
+        self.assertEqual(activities, [GOOD_ACTIVITY])
+        self.assertEqual([c.kwargs["model"] for c in mock_query.call_args_list], ["gpt-4o-mini", "gpt-4o"])
+        stats = router.get_stats()
+        self.assertEqual(stats["openai/gpt-4o-mini"]["escalated"], 1)
+        self.assertEqual(stats["openai/gpt-4o"]["accepted"], 1)
+
+    @patch('activity_extractor.query_llm')
+    def test_unparseable_cheap_response_escalates_without_repair(self, mock_query):
+        mock_query.side_effect = ["no json here", json.dumps({"activities": [GOOD_ACTIVITY]})]
+        router = activity_extractor.build_extraction_router()
+        activities, ok = activity_extractor.query_and_parse('input/a.jpg', router=router)
+        self.assertTrue(ok)
+        # Both calls sent the image: no text-only repair of the cheap response
+        self.assertEqual([c.kwargs["image_path"] for c in mock_query.call_args_list], ['input/a.jpg'] * 2)
+
+    @patch('activity_extractor.query_llm')
+    @patch('activity_extractor.hash_file', return_value="abc")
+    def test_routing_modes_share_cached_extractions(self, mock_hash, mock_query):
+        cache = MagicMock()
+        cache.get.return_value = [GOOD_ACTIVITY]
+        for router in (None, activity_extractor.build_extraction_router(),
+                       activity_extractor.build_extraction_router(route=False, low_detail_first=True)):
+            activities = activity_extractor.extract_activity_info('input/a.jpg', cache=cache, router=router)
+            self.assertEqual(activities, [GOOD_ACTIVITY])
+        mock_query.assert_not_called()
+        for lookup in cache.get.call_args_list:
+            self.assertEqual(lookup.args, ("abc", activity_extractor.PROMPT_FINGERPRINT,
+                                           activity_extractor.EXTRACTION_PROVIDER, activity_extractor.EXTRACTION_MODEL))
+
+class TestLowDetailFirst(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from PIL import Image
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.image_path = os.path.join(cls.temp_dir, "flyer.png")
+        Image.new("RGB", (1170, 2532), "white").save(cls.image_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def setUp(self):
+        self.router = activity_extractor.build_extraction_router(route=False, low_detail_first=True)
+        self.tracker = MagicMock()
+        self.tracker_patcher = patch('activity_extractor.get_token_tracker', return_value=self.tracker)
+        self.tracker_patcher.start()
+
+    def tearDown(self):
+        self.tracker_patcher.stop()
+
+    def test_chain(self):
+        self.assertEqual(self.router.name, "gpt-4o@low>gpt-4o@high")
+        routed = activity_extractor.build_extraction_router(low_detail_first=True)
+        self.assertEqual(routed.name, "gpt-4o-mini@low>gpt-4o-mini@high>gpt-4o@high")
+
+    @patch('activity_extractor.query_llm')
+    def test_complete_low_detail_result_is_kept(self, mock_query):
+        # No ZIP code: only the critical fields matter when the model stays the same
+        activity = dict(GOOD_ACTIVITY, location="Central Library")
+        mock_query.return_value = json.dumps({"activities": [activity]})
+        activities, ok = activity_extractor.query_and_parse(self.image_path, router=self.router)
+        self.assertTrue(ok)
+        self.assertEqual([c.kwargs["image_detail"] for c in mock_query.call_args_list], ["low"])
+        self.tracker.record_savings.assert_called_once()
+        category, amounts = self.tracker.record_savings.call_args
+        self.assertEqual(category, ("low_detail",))
+        self.assertEqual(amounts["images"], 1)
+        self.assertEqual(amounts["tokens_saved"], 170 * 8)  # 2x4 high-detail tiles
+
+    @patch('activity_extractor.query_llm')
+    def test_missing_critical_field_is_retried_at_high_detail(self, mock_query):
+        mock_query.side_effect = [
+            json.dumps({"activities": [dict(GOOD_ACTIVITY, date=None)]}),
+            json.dumps({"activities": [GOOD_ACTIVITY]})
+        ]
+        activities, ok = activity_extractor.query_and_parse(self.image_path, router=self.router)
+        self.assertEqual(activities, [GOOD_ACTIVITY])
+        self.assertEqual([c.kwargs["image_detail"] for c in mock_query.call_args_list], ["low", "high"])
+        amounts = self.tracker.record_savings.call_args.kwargs
+        self.assertEqual(amounts["high_detail_retries"], 1)
+        self.assertEqual(amounts["tokens_saved"], -85)
+        self.assertLessEqual(amounts["ms_saved"], 0)
+
+class TestTiledExtraction(unittest.TestCase):
+    def test_activities_spanning_tiles_are_merged(self):
+        per_tile = [
+            [{"activity_name": "Storytime", "date": "2025-04-12", "description": "Songs and"}],
+            [{"activity_name": "STORYTIME", "date": "2025-04-12", "description": "Songs and stories"},
+             {"activity_name": "Lego Club", "date": "2025-04-13", "description": None}],
+            [{"activity_name": "Lego Club", "date": None, "description": "Build"}],
+        ]
+        merged = activity_extractor.merge_tile_activities(per_tile)
+        self.assertEqual([a["activity_name"] for a in merged], ["Storytime", "Lego Club"])
+        self.assertEqual(merged[0]["description"], "Songs and stories")
+        self.assertEqual(merged[0]["source_tile"], "1-2/3")
+        self.assertEqual(merged[1]["date"], "2025-04-13")
+        self.assertEqual(merged[1]["description"], "Build")
+        self.assertEqual(merged[1]["source_tile"], "2-3/3")
+
+    def test_same_name_on_other_dates_or_far_tiles_is_kept(self):
+        per_tile = [
+            [{"activity_name": "Storytime", "date": "2025-04-12"}],
+            [{"activity_name": "Storytime", "date": "2025-04-19"}],
+            [{"activity_name": "Storytime", "date": "2025-04-12"}],
+        ]
+        merged = activity_extractor.merge_tile_activities(per_tile)
+        self.assertEqual([a["source_tile"] for a in merged], ["1/3", "2/3", "3/3"])
+
+    @patch('activity_extractor.query_and_parse')
+    @patch('activity_extractor.tile_image')
+    def test_tall_image_is_extracted_in_tiles(self, mock_tile, mock_query):
+        mock_tile.return_value = [
+            activity_extractor.Tile(f"tile{i}.png", i, 2, 0, 0) for i in (1, 2)
+        ]
+        mock_query.side_effect = lambda path, save_raw=False, router=None: (
+            [{"activity_name": "Storytime", "date": "2025-04-12"},
+             {"activity_name": f"Event from {path}", "date": None}], True
+        )
+        activities = activity_extractor.extract_activity_info("list.png")
+        self.assertEqual(sorted(c.args[0] for c in mock_query.call_args_list), ["tile1.png", "tile2.png"])
+        self.assertEqual([a["source_tile"] for a in activities], ["1-2/2", "1/2", "2/2"])
+
+    @patch('activity_extractor.query_and_parse')
+    def test_failed_tile_is_not_cached(self, mock_query):
+        tiles = [activity_extractor.Tile(f"tile{i}.png", i, 2, 0, 0) for i in (1, 2)]
+        mock_query.side_effect = [
+            ([GOOD_ACTIVITY], True),
+            (activity_extractor.extraction_error("tile2.png", "timeout"), False)
+        ]
+        activities, ok = activity_extractor.extract_tiled("list.png", tiles)
+        self.assertFalse(ok)
+        self.assertEqual(activities, [dict(GOOD_ACTIVITY, source_tile="1/2")])
+
+class TestOCRExtraction(unittest.TestCase):
+    def setUp(self):
+        self.ocr = MagicMock()
+        self.ocr.engine = "tesseract"
+        self.text = "Storytime Saturday April 12 Central Library"
+        self.ocr.get.return_value = OCRResult(self.text, 0.95, 6)
+        self.tracker = MagicMock()
+        patcher = patch('activity_extractor.get_token_tracker', return_value=self.tracker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('activity_extractor.estimate_file_tokens', return_value=765)
+    @patch('activity_extractor.query_and_parse')
+    @patch('activity_extractor.query_llm')
+    def test_confident_text_goes_to_text_model(self, mock_query, mock_vision, mock_tokens):
+        self.ocr.confident.return_value = True
+        mock_query.return_value = json.dumps({"activities": [GOOD_ACTIVITY]})
+        activities = activity_extractor.extract_activity_info("flyer.png", ocr=self.ocr)
+        self.assertEqual(activities, [GOOD_ACTIVITY])
+        mock_vision.assert_not_called()
+        self.assertIn("Central Library", mock_query.call_args.args[0])
+        self.assertEqual(mock_query.call_args.kwargs["model"], activity_extractor.OCR_TEXT_MODEL)
+        self.assertNotIn("image_path", mock_query.call_args.kwargs)
+        self.tracker.record_savings.assert_called_with("ocr", images=1, tokens_saved=765 - len(self.text) // 4)
+
+    @patch('activity_extractor.query_and_parse', return_value=([GOOD_ACTIVITY], True))
+    @patch('activity_extractor.query_llm')
+    def test_low_confidence_falls_back_to_vision(self, mock_query, mock_vision):
+        self.ocr.confident.return_value = False
+        self.assertEqual(activity_extractor.extract_activity_info("photo.png", ocr=self.ocr), [GOOD_ACTIVITY])
+        mock_query.assert_not_called()
+        mock_vision.assert_called_once()
+        self.tracker.record_savings.assert_called_with("ocr", vision_fallbacks=1)
+
+    @patch('activity_extractor.query_and_parse', return_value=([GOOD_ACTIVITY], True))
+    @patch('activity_extractor.query_llm')
+    def test_incomplete_text_extraction_falls_back_to_vision(self, mock_query, mock_vision):
+        self.ocr.confident.return_value = True
+        mock_query.return_value = json.dumps({"activities": [{"activity_name": "Storytime"}]})
+        self.assertEqual(activity_extractor.extract_activity_info("flyer.png", ocr=self.ocr), [GOOD_ACTIVITY])
+        mock_vision.assert_called_once()
+
+class TestBatchExtraction(unittest.TestCase):
+    def test_parse_batch_response(self):
+        """Result slots are mapped back to images by image_index, not by position"""
+        response = json.dumps({"results": [
+            {"image_index": 2, "activities": [{"activity_name": "B"}]},
+            {"image_index": 1, "activities": []}
+        ]})
+        self.assertEqual(activity_extractor.parse_batch_response(response, 2), [[], [{"activity_name": "B"}]])
+
+    def test_parse_batch_response_rejects_missing_slots(self):
+        response = json.dumps({"results": [{"image_index": 1, "activities": []}]})
+        with self.assertRaises(ValueError):
+            activity_extractor.parse_batch_response(response, 2)
+
+    @patch('activity_extractor.query_llm')
+    def test_failed_batch_is_split_and_retried(self, mock_query):
+        """A batch whose response cannot be parsed or repaired is split in half and retried"""
+        def respond(prompt, provider=None, model=None, image_path=None, image_paths=None, response_schema=None):
+            if image_paths and len(image_paths) == 4:
+                return "not json"
+            if not image_paths and not image_path:
+                return "still not json"  # repair request
+            if image_paths:
+                return json.dumps({"results": [
+                    {"image_index": i + 1, "activities": [{"activity_name": os.path.basename(p)}]}
+                    for i, p in enumerate(image_paths)
+                ]})
+            return json.dumps({"activity_name": os.path.basename(image_path)})
+        mock_query.side_effect = respond
+
+        image_files = ['input/a.jpg', 'input/b.jpg', 'input/c.jpg', 'input/d.jpg']
+        results = activity_extractor.extract_activity_batch(image_files)
+
+        self.assertEqual([r[0]["activity_name"] for r in results], ['a.jpg', 'b.jpg', 'c.jpg', 'd.jpg'])
+        self.assertEqual(mock_query.call_count, 4)  # failed batch of 4, failed repair, two batches of 2
+
+    @patch('activity_extractor.query_llm')
+    def test_invalid_response_is_repaired_without_resending_image(self, mock_query):
+        mock_query.side_effect = [
+            'Here are the activities: {"activities": [{"activity_name": "Storytime", "date": 20250412}]}',
+            '{"activities": [{"activity_name": "Storytime", "date": "2025-04-12"}]}'
+        ]
+        activities, ok = activity_extractor.query_and_parse('input/a.jpg')
+        self.assertTrue(ok)
+        self.assertEqual(activities, [{"activity_name": "Storytime", "date": "2025-04-12"}])
+        
+        extract_call, repair_call = mock_query.call_args_list
+        self.assertEqual(extract_call.kwargs["image_path"], 'input/a.jpg')
+        self.assertNotIn("image_path", repair_call.kwargs)
+        self.assertIn("20250412", repair_call.args[0])
+        self.assertEqual(repair_call.kwargs["response_schema"], activity_extractor.ACTIVITY_RESPONSE_SCHEMA)
+
+    @patch('activity_extractor.query_llm')
+    def test_failed_repair_returns_error_placeholder(self, mock_query):
+        mock_query.side_effect = ["no json here", "still no json"]
+        activities, ok = activity_extractor.query_and_parse('input/a.jpg')
+        self.assertFalse(ok)
+        self.assertIn("error", activities[0])
+        self.assertEqual(mock_query.call_count, 2)
+
+    @patch('activity_extractor.extract_activity_batch')
+    def test_concurrent_batches_keep_order(self, mock_batch):
+        mock_batch.side_effect = lambda batch, *args: [[{"activity_name": p}] for p in batch]
+        image_files = ['input/a.jpg', 'input/b.jpg', 'input/c.jpg']
+        results = list(activity_extractor.extract_images_concurrently(image_files, workers=2, batch_size=2))
+        self.assertEqual([image for image, _ in results], image_files)
+        self.assertEqual(mock_batch.call_count, 2)
+
+class TestExtractionJournal(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.journal = ExtractionJournal(os.path.join(self.temp_dir, "journal.jsonl"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    @patch('activity_extractor.shutil.move')
+    @patch('activity_extractor.extract_images_concurrently')
+    def test_failed_extractions_are_not_journaled_or_moved(self, mock_concurrent, mock_move):
+        """Images whose extraction failed stay in input/new and are retried by a later run"""
+        mock_concurrent.return_value = [
+            ('input/new/a.jpg', [dict(GOOD_ACTIVITY)]),
+            ('input/new/b.jpg', activity_extractor.extraction_error('input/new/b.jpg', "Rate limited")),
+        ]
+        args = argparse.Namespace(no_cache=True, route=False, low_detail_first=False, batch_size=1,
+                                  no_dedupe=True, ocr=False, workers=2, save_raw=False)
+        activities = activity_extractor.extract_images(['input/new/a.jpg', 'input/new/b.jpg'], args, self.journal,
+                                                       move_processed=True)
+
+        self.assertEqual(len(activities), 2)
+        self.assertEqual([entry["source_file"] for entry in self.journal.replay()], ["a.jpg"])
+        self.assertEqual([c.args[0] for c in mock_move.call_args_list], ['input/new/a.jpg'])
+
+if __name__ == '__main__':
+    unittest.main()
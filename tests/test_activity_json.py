@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import sys
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.activity_json import iter_activities, write_activities
+
+ACTIVITIES = [
+    {"activity_name": "Storytime", "date": "2025-03-01", "is_archived": True,
+     "description": "Songs, rhymes and \"big\" books\nfor ages 2-5 ☀"},
+    {"activity_name": "Lego Club", "date": "2025-04-13", "is_archived": False, "tags": ["lego", {"age": 6}]},
+    {"activity_name": "Zilker Kite Festival", "date": None},
+]
+
+class TestActivityJson(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.json_file = self.temp_dir / "activities.json"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_writer_matches_json_dump(self):
+        self.assertEqual(write_activities(str(self.json_file), iter(ACTIVITIES)), 3)
+        self.assertEqual(self.json_file.read_text(encoding="utf-8"), json.dumps(ACTIVITIES, indent=2))
+        write_activities(str(self.json_file), [])
+        self.assertEqual(self.json_file.read_text(), "[]")
+        self.assertEqual(os.listdir(self.temp_dir), ["activities.json"])
+
+    def test_reader_streams_across_chunks(self):
+        self.json_file.write_text(json.dumps(ACTIVITIES, indent=2), encoding="utf-8")
+        for chunk_size in (1, 7, 64, 65536):
+            self.assertEqual(list(iter_activities(str(self.json_file), chunk_size=chunk_size)), ACTIVITIES)
+        self.json_file.write_text(json.dumps(ACTIVITIES, separators=(",", ":")), encoding="utf-8")
+        self.assertEqual(list(iter_activities(str(self.json_file), chunk_size=5)), ACTIVITIES)
+
+    def test_reader_filters(self):
+        self.json_file.write_text(json.dumps(ACTIVITIES))
+        names = lambda **filters: [a["activity_name"] for a in iter_activities(str(self.json_file), **filters)]
+        self.assertEqual(names(archived=False), ["Lego Club", "Zilker Kite Festival"])
+        self.assertEqual(names(archived=True), ["Storytime"])
+        self.assertEqual(names(date_from="2025-04-01"), ["Lego Club"])
+        self.assertEqual(names(date_to="2025-04-01"), ["Storytime"])
+
+    def test_reader_rejects_malformed_files(self):
+        for content in ("", '{"activity_name": "Storytime"}', '[{"activity_name": "Storytime"}',
+                        '[{"activity_name": "Story'):
+            self.json_file.write_text(content)
+            with self.assertRaises(json.JSONDecodeError):
+                list(iter_activities(str(self.json_file), chunk_size=4))
+        self.json_file.write_text(" [ ] ")
+        self.assertEqual(list(iter_activities(str(self.json_file))), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import sys
+import json
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.activity_record import (Activity, activities_from_dicts, activities_to_dicts, location_name,
+                                   parse_minutes)
+
+def record(name, **fields):
+    return {"activity_name": name, "location": "Central Library, 710 W Cesar Chavez St, Austin, TX 78701",
+            "date": "2025-04-12", "time": "10:00 AM - 11:30 AM", "description": None,
+            "source_file": "flyer.png", **fields}
+
+class TestActivity(unittest.TestCase):
+    def test_round_trip_keeps_keys_and_order(self):
+        records = [record("Storytime", is_archived=False),
+                   {"date": None, "activity_name": "Kite Day", "source_name": "do512family.com", "custom": [1]}]
+        activities = activities_from_dicts(json.loads(json.dumps(records)))
+        round_tripped = activities_to_dicts(activities)
+        self.assertEqual(round_tripped, records)
+        self.assertEqual([list(r) for r in round_tripped], [list(r) for r in records])
+
+    def test_fields_are_parsed_when_set(self):
+        activity = Activity.from_dict(record("Storytime"))
+        self.assertEqual(activity.day, date(2025, 4, 12))
+        self.assertEqual((activity.start_minutes, activity.end_minutes), (600, 690))
+        self.assertEqual(location_name(activity.location_id), activity.location)
+
+        activity.date = "2025-05-01"
+        activity.time = "3 PM"
+        activity.location = "Zilker Park, Austin, TX 78746"
+        self.assertEqual(activity.date_ordinal, date(2025, 5, 1).toordinal())
+        self.assertEqual((activity.start_minutes, activity.end_minutes), (900, None))
+        self.assertEqual(location_name(activity.location_id), "Zilker Park, Austin, TX 78746")
+
+        activity.date = "next Saturday"
+        self.assertIsNone(activity.day)
+
+    def test_repeated_strings_are_shared(self):
+        first, second = activities_from_dicts(json.loads(json.dumps([record("Storytime"), record("Lego Club")])))
+        self.assertIs(first.location, second.location)
+        self.assertEqual(first.location_id, second.location_id)
+        self.assertIs(first.date, second.date)
+        self.assertIs(first.source_file, second.source_file)
+
+    def test_new_fields_are_written_after_the_original_keys(self):
+        activity = Activity.from_dict({"activity_name": "Storytime", "location": "Zilker Park"})
+        activity.location_uncertain = True
+        activity.is_archived = False
+        self.assertEqual(list(activity.to_dict()), ["activity_name", "location", "is_archived", "location_uncertain"])
+        self.assertEqual(activity.signature, "Storytime_None_Zilker Park")
+
+    def test_non_dict_records_are_skipped(self):
+        self.assertEqual(len(activities_from_dicts([record("Storytime"), "not an activity"])), 1)
+
+class TestParseMinutes(unittest.TestCase):
+    def test_ranges_and_single_times(self):
+        self.assertEqual(parse_minutes("10:00 AM - 11:30 AM"), (600, 690))
+        self.assertEqual(parse_minutes("3 - 5 PM"), (900, 1020))
+        self.assertEqual(parse_minutes("11 - 1 PM"), (660, 780))
+        self.assertEqual(parse_minutes("12 PM to 2 PM"), (720, 840))
+        self.assertEqual(parse_minutes("18:30"), (1110, None))
+        self.assertEqual(parse_minutes("Saturday at 10 AM"), (600, None))
+
+    def test_unparseable_times(self):
+        self.assertEqual(parse_minutes("All day"), (None, None))
+        self.assertEqual(parse_minutes(None), (None, None))
+        self.assertEqual(parse_minutes({"start": "10:00", "end": "13:00"}), (None, None))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+import unittest
+from tools.activity_schema import (
+    ACTIVITY_RESPONSE_SCHEMA, BATCH_RESPONSE_SCHEMA, compile_validator, validate_activities
+)
+
+class TestActivitySchema(unittest.TestCase):
+    def test_valid_activities(self):
+        activities = [
+            {"activity_name": "Storytime", "location": "Central Library", "date": "2025-04-12",
+             "time": "10:00 AM - 11:00 AM", "description": None, "additional_details": None,
+             "raw_datetime": "Saturday at 10"},
+            {"activity_name": "Splash Day"}  # fields may be missing without structured output
+        ]
+        self.assertEqual(validate_activities(activities), [])
+
+    def test_wrong_types_are_reported_with_paths(self):
+        errors = validate_activities([{"activity_name": "Storytime"}, {"date": 20250412}, "not an object"])
+        self.assertEqual(errors, [
+            "$[1].date: expected string or null, got int",
+            "$[2]: expected object, got str"
+        ])
+
+    def test_required_properties(self):
+        validate = compile_validator(ACTIVITY_RESPONSE_SCHEMA)
+        self.assertEqual(validate({}), ["$: missing required property 'activities'"])
+        self.assertEqual(validate({"activities": []}), [])
+
+    def test_batch_schema(self):
+        validate = compile_validator(BATCH_RESPONSE_SCHEMA, check_required=False)
+        self.assertEqual(validate({"results": [{"image_index": 1, "activities": []}]}), [])
+        self.assertEqual(validate({"results": [{"image_index": True, "activities": []}]}),
+                         ["$.results[0].image_index: expected integer, got bool"])
+
+    def test_strict_schema_lists_every_property_as_required(self):
+        """OpenAI strict structured outputs reject schemas with optional properties"""
+        item = ACTIVITY_RESPONSE_SCHEMA["properties"]["activities"]["items"]
+        self.assertEqual(set(item["required"]), set(item["properties"]))
+        self.assertFalse(item["additionalProperties"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import sys
+import json
+import shutil
+import asyncio
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.activity_store import ActivityStore
+from tools.activity_archive import ActivityArchive
+
+def activity(name, date="2025-04-12", source_file="flyer.png", **fields):
+    return {"activity_name": name, "date": date, "location": "Central Library, Austin, TX 78701",
+            "source_file": source_file, **fields}
+
+class TestActivityStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.store = ActivityStore(self.temp_dir / "activities.db")
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_sync_writes_only_changes(self):
+        activities = [activity("Storytime"), activity("Lego Club", date="2025-04-13")]
+        self.assertEqual(self.store.sync(activities), {"inserted": 2, "updated": 0, "deleted": 0})
+
+        loaded = self.store.load()
+        self.assertEqual(loaded, activities)
+        loaded[1]["is_archived"] = True
+        loaded.append(activity("Splash Day", date="2025-06-01"))
+        self.assertEqual(self.store.sync(loaded), {"inserted": 1, "updated": 1, "deleted": 0})
+        self.assertEqual(self.store.sync(loaded), {"inserted": 0, "updated": 0, "deleted": 0})
+
+        self.assertEqual(self.store.sync(loaded[:1]), {"inserted": 0, "updated": 0, "deleted": 2})
+        self.assertEqual(len(self.store), 1)
+
+    def test_load_filters(self):
+        self.store.sync([
+            activity("Storytime", is_archived=True, date="2025-03-01"),
+            activity("Lego Club", date="2025-04-13", source_file="lego.png"),
+            {"activity_name": "Zilker Kite Festival", "date": "2025-04-20", "source_name": "do512family.com"},
+        ])
+        names = lambda activities: [a["activity_name"] for a in activities]
+        self.assertEqual(names(self.store.load(archived=False)), ["Lego Club", "Zilker Kite Festival"])
+        self.assertEqual(names(self.store.load(archived=True)), ["Storytime"])
+        self.assertEqual(names(self.store.load(source="do512family.com")), ["Zilker Kite Festival"])
+        self.assertEqual(names(self.store.load(date_from="2025-04-01", date_to="2025-04-15")), ["Lego Club"])
+        self.assertEqual(names(self.store.load(location="Central Library, Austin, TX 78701")),
+                         ["Storytime", "Lego Club"])
+
+    def test_add_skips_stored_activities(self):
+        self.store.sync([activity("Storytime")])
+        added = self.store.add([activity("Storytime"), activity("Lego Club"), activity("Lego Club")])
+        self.assertEqual([a["activity_name"] for a in added], ["Lego Club"])
+        self.assertEqual([a["activity_name"] for a in self.store.load()], ["Storytime", "Lego Club"])
+
+    def test_import_and_export_json(self):
+        json_file = self.temp_dir / "activities.json"
+        activities = [activity("Storytime"), activity("Lego Club")]
+        json_file.write_text(json.dumps(activities))
+        self.assertEqual(self.store.import_json(str(json_file)), 2)
+        # Only an empty store is imported into
+        self.assertEqual(self.store.import_json(str(json_file)), 0)
+
+        self.store.add([activity("Splash Day")])
+        self.store.export_json(str(json_file))
+        self.assertEqual([a["activity_name"] for a in json.loads(json_file.read_text())],
+                         ["Storytime", "Lego Club", "Splash Day"])
+
+    def test_data_survives_reopening(self):
+        self.store.sync([activity("Storytime", location_uncertain=True)])
+        reopened = ActivityStore(self.store.db_file)
+        try:
+            self.assertEqual(reopened.load(), [activity("Storytime", location_uncertain=True)])
+        finally:
+            reopened.close()
+
+    def test_writes_append_to_change_log(self):
+        self.store.sync([activity("Storytime"), activity("Lego Club")])
+        loaded = self.store.load()
+        loaded[0]["is_archived"] = True
+        loaded[1]["time"] = "10:00 AM"
+        self.store.sync(loaded)
+
+        events = [json.loads(line) for line in self.store.log_file.read_text().splitlines()]
+        self.assertEqual([(e["op"], e["id"]) for e in events],
+                         [("add", 0), ("add", 1), ("archive", 0), ("update", 1)])
+        self.assertEqual(self.store.load(archived=True), [loaded[0]])
+
+    def test_concurrent_writers_keep_each_others_records(self):
+        self.store.sync([activity("Storytime")])
+        other = ActivityStore(self.store.db_file)
+        try:
+            mine, theirs = self.store.load(), other.load()
+            mine.append(activity("Lego Club"))
+            theirs[0]["is_archived"] = True
+            theirs.append(activity("Splash Day"))
+            self.store.sync(mine)
+            other.sync(theirs)
+            other.add([activity("Zilker Kite Festival"), activity("Lego Club")])
+        finally:
+            other.close()
+        self.assertEqual([(a["activity_name"], a.get("is_archived")) for a in self.store.load()],
+                         [("Storytime", True), ("Lego Club", None), ("Splash Day", None),
+                          ("Zilker Kite Festival", None)])
+
+    def test_compaction_folds_log_into_database(self):
+        store = ActivityStore(self.temp_dir / "compacted.db", compact_bytes=1)
+        store.sync([activity("Storytime"), activity("Lego Club")])
+        store.close()  # waits for the background compaction
+        self.assertEqual(store.log_file.stat().st_size, 0)
+        reopened = ActivityStore(self.temp_dir / "compacted.db")
+        try:
+            loaded = reopened.load()
+            self.assertEqual([a["activity_name"] for a in loaded], ["Storytime", "Lego Club"])
+            reopened.sync(loaded[:1])
+            self.assertEqual(reopened.compact(), 1)
+            self.assertEqual(reopened.load(), [activity("Storytime")])
+            self.assertEqual(reopened.load(location="Central Library, Austin, TX 78701"), [activity("Storytime")])
+        finally:
+            reopened.close()
+
+    def test_iter_load_merges_log_tail_in_order(self):
+        json_file = self.temp_dir / "activities.json"
+        json_file.write_text(json.dumps([activity("Storytime"), activity("Lego Club"), activity("Splash Day")]))
+        self.assertEqual(self.store.import_json(str(json_file)), 3)
+        loaded = self.store.load()
+        loaded[0]["is_archived"] = True
+        loaded[2]["time"] = "10:00 AM"
+        loaded.append(activity("Kite Day"))
+        self.store.sync(loaded)
+
+        self.assertEqual([a["activity_name"] for a in self.store.iter_load(archived=False)],
+                         ["Lego Club", "Splash Day", "Kite Day"])
+        self.store.export_json(str(json_file))
+        self.assertEqual(json.loads(json_file.read_text()), loaded)
+
+    def test_torn_log_line_is_skipped(self):
+        self.store.sync([activity("Storytime")])
+        with open(self.store.log_file, "a") as f:
+            f.write('{"op": "add", "id": 1, "activi')
+        self.store.load()
+        self.store.sync([activity("Storytime"), activity("Lego Club")])
+        self.assertEqual([a["activity_name"] for a in self.store.load()], ["Storytime", "Lego Club"])
+
+class TestMergeWithAppData(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.store = ActivityStore(self.temp_dir / "activities.db")
+        self.app_file = self.temp_dir / "activities.json"
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_new_web_activities_are_appended(self):
+        from do512_scraper import merge_with_app_data
+        self.app_file.write_text(json.dumps([activity("Storytime")]))
+        web = [{"activity_name": "Zilker Kite Festival", "date": "2025-04-20", "location": "Zilker Park"},
+               activity("Storytime")]
+        asyncio.run(merge_with_app_data(web, str(self.app_file), self.store))
+        self.assertEqual([a["activity_name"] for a in json.loads(self.app_file.read_text())],
+                         ["Storytime", "Zilker Kite Festival"])
+        # The caller's store is used even though it started out empty
+        self.assertEqual([a["activity_name"] for a in self.store.load()], ["Storytime", "Zilker Kite Festival"])
+
+    def test_archived_activities_are_not_added_again(self):
+        from do512_scraper import merge_with_app_data
+        archive = ActivityArchive(self.temp_dir / "archive")
+        archive.append([activity("Egg Hunt", "2025-04-19")])
+        web = [activity("Egg Hunt", "2025-04-19"), activity("Kite Day", "2025-04-05")]
+        asyncio.run(merge_with_app_data(web, str(self.app_file), self.store, archive))
+        self.assertEqual([a["activity_name"] for a in self.store.load()], ["Kite Day"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import sys
+import json
+import shutil
+import tempfile
+import threading
+import http.server
+from email.parser import BytesParser
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import activity_extractor
+from tools.batch_api import BatchJobStore, write_batch_files, result_content
+from tools.raw_store import RawResponseStore
+from tools.llm_api import _sdk
+
+class FakeBatchAPI(http.server.ThreadingHTTPServer):
+    """Local stand-in for the OpenAI files and batches endpoints.
+
+    Batches stay in_progress until `complete()` is called; each request is then answered
+    with the content `respond(custom_id)` returns, or an error when it returns None.
+    """
+    def __init__(self, respond):
+        super().__init__(("127.0.0.1", 0), FakeBatchHandler)
+        self.respond = respond
+        self.files = {}
+        self.batches = {}
+        self.completed = False
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def complete(self):
+        self.completed = True
+
+    def batch(self, batch_id):
+        batch = dict(self.batches[batch_id])
+        if not self.completed:
+            return batch
+        output, errors = [], []
+        for line in self.files[batch["input_file_id"]].decode("utf-8").splitlines():
+            request = json.loads(line)
+            content = self.respond(request["custom_id"])
+            if content is None:
+                errors.append({"id": "r", "custom_id": request["custom_id"], "response": None,
+                               "error": {"code": "invalid_request", "message": "Image could not be read"}})
+                continue
+            output.append({"id": "r", "custom_id": request["custom_id"], "error": None, "response": {
+                "status_code": 200,
+                "body": {"model": request["body"]["model"],
+                         "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                         "usage": {"prompt_tokens": 1000, "completion_tokens": 100, "total_tokens": 1100}}
+            }})
+        self.files[f"{batch_id}-output"] = "".join(json.dumps(line) + "\n" for line in output).encode("utf-8")
+        self.files[f"{batch_id}-errors"] = "".join(json.dumps(line) + "\n" for line in errors).encode("utf-8")
+        batch.update(status="completed", output_file_id=f"{batch_id}-output",
+                     error_file_id=f"{batch_id}-errors" if errors else None,
+                     request_counts={"total": len(output) + len(errors), "completed": len(output), "failed": len(errors)})
+        return batch
+
+class FakeBatchHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, data, status=200):
+        self._send(json.dumps(data).encode("utf-8"), "application/json", status)
+
+    def _send(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.path == "/v1/files":
+            message = BytesParser().parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + body)
+            content = next(part.get_payload(decode=True) for part in message.get_payload()
+                           if part.get_param("name", header="content-disposition") == "file")
+            file_id = f"file-{len(self.server.files) + 1}"
+            self.server.files[file_id] = content
+            self._send_json({"id": file_id, "object": "file", "bytes": len(content), "created_at": 0,
+                             "filename": "batch.jsonl", "purpose": "batch", "status": "processed"})
+        elif self.path == "/v1/batches":
+            request = json.loads(body)
+            batch_id = f"batch-{len(self.server.batches) + 1}"
+            self.server.batches[batch_id] = {
+                "id": batch_id, "object": "batch", "endpoint": request["endpoint"],
+                "input_file_id": request["input_file_id"], "completion_window": request["completion_window"],
+                "status": "in_progress", "created_at": 0
+            }
+            self._send_json(self.server.batches[batch_id])
+        else:
+            self._send_json({"error": {"message": "not found"}}, 404)
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts[:2] == ["v1", "batches"]:
+            self._send_json(self.server.batch(parts[2]))
+        elif parts[:2] == ["v1", "files"] and parts[3:] == ["content"]:
+            self._send(self.server.files[parts[2]], "application/octet-stream")
+        else:
+            self._send_json({"error": {"message": "not found"}}, 404)
+
+    def log_message(self, *args):
+        pass
+
+ACTIVITY = {"activity_name": "Storytime", "date": "2025-04-12", "location": "Central Library, Austin, TX 78701"}
+
+class TestBatchFiles(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_files_are_split_at_the_limits(self):
+        requests = [(f"r{i}", {"model": "gpt-4o", "messages": []}) for i in range(5)]
+        files = write_batch_files(requests, self.temp_dir, "test", max_requests=2)
+        self.assertEqual([ids for _, ids in files], [["r0", "r1"], ["r2", "r3"], ["r4"]])
+        with open(files[0][0]) as f:
+            line = json.loads(f.readline())
+        self.assertEqual(line, {"custom_id": "r0", "method": "POST", "url": "/v1/chat/completions",
+                                "body": {"model": "gpt-4o", "messages": []}})
+
+        line_size = len(json.dumps({"custom_id": "r0", "method": "POST", "url": "/v1/chat/completions",
+                                    "body": {"model": "gpt-4o", "messages": []}})) + 1
+        files = write_batch_files(requests, self.temp_dir, "sized", max_bytes=line_size * 3)
+        self.assertEqual([len(ids) for _, ids in files], [3, 2])
+
+    def test_result_content(self):
+        content, usage, error = result_content({"custom_id": "a", "error": None, "response": {
+            "status_code": 200,
+            "body": {"choices": [{"message": {"content": "{}"}}], "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}}
+        }})
+        self.assertEqual((content, usage.total_tokens, error), ("{}", 5, None))
+        self.assertEqual(result_content({"custom_id": "a", "error": {"message": "bad"}})[2], "bad")
+        self.assertIn("HTTP 400", result_content({"custom_id": "a", "response": {"status_code": 400, "body": {}}})[2])
+
+class TestBatchWorkflow(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.images = []
+        for name in ("a.jpg", "b.jpg", "broken.jpg"):
+            path = self.temp_dir / name
+            path.write_bytes(b"image")
+            self.images.append(str(path))
+
+        self.server = FakeBatchAPI(lambda custom_id: None if custom_id == "broken.jpg"
+                                   else json.dumps({"activities": [dict(ACTIVITY, activity_name=custom_id)]}))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = _sdk("OpenAI")(api_key="test-key", base_url=self.server.base_url, max_retries=0)
+
+        self.store = BatchJobStore(self.temp_dir / "batch_jobs.json")
+        self.raw_store = RawResponseStore(self.temp_dir / "raw")
+        self.tracker = MagicMock()
+        self.tracker.savings = {}
+        self.tracker.calculate_openai_cost.return_value = 0.02
+        self.patchers = [
+            patch('activity_extractor.get_raw_store', return_value=self.raw_store),
+            patch('tools.batch_api.get_token_tracker', return_value=self.tracker),
+            patch('activity_extractor.get_token_tracker', return_value=self.tracker),
+            # The stand-in does not look at the images
+            patch('tools.llm_api.encode_image_file', return_value=("aW1hZ2U=", "image/jpeg")),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_submit_and_collect(self):
+        jobs = activity_extractor.submit_batch_extraction(self.images, self.store, self.client)
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(jobs[0]["custom_ids"], ["a.jpg", "b.jpg", "broken.jpg"])
+        self.assertEqual(jobs[0]["prompt_fingerprint"], activity_extractor.PROMPT_FINGERPRINT)
+
+        # The job state survives a restart
+        store = BatchJobStore(self.store.jobs_file)
+        self.assertEqual(store.pending()[0]["batch_id"], jobs[0]["batch_id"])
+
+        # Nothing is ingested while the batch is running
+        counts = activity_extractor.collect_batch_extraction(store, self.client)
+        self.assertEqual((counts["running"], counts["saved"]), (1, 0))
+        self.assertEqual(store.pending()[0]["status"], "in_progress")
+
+        self.server.complete()
+        counts = activity_extractor.collect_batch_extraction(store, self.client)
+        self.assertEqual((counts["collected"], counts["saved"], counts["failed"]), (1, 2, 1))
+        self.assertEqual(BatchJobStore(self.store.jobs_file).pending(), [])
+
+        activities = self.raw_store.replay()
+        self.assertEqual(sorted((a["activity_name"], a["source_file"]) for a in activities),
+                         [("a.jpg", "a.jpg"), ("b.jpg", "b.jpg")])
+        self.tracker.record_savings.assert_called_with("batch_api", requests=1, cost_saved=0.01)
+        self.assertEqual(self.tracker.track_request.call_args[0][0].cost, 0.01)
+
+        # Collected jobs are not collected again
+        self.assertEqual(activity_extractor.collect_batch_extraction(store, self.client)["collected"], 0)
+
+    def test_requests_use_the_extraction_schema(self):
+        requests = list(activity_extractor.batch_extraction_requests(self.images[:1]))
+        custom_id, body = requests[0]
+        self.assertEqual(custom_id, "a.jpg")
+        self.assertEqual(body["model"], activity_extractor.EXTRACTION_MODEL)
+        self.assertEqual(body["response_format"]["type"], "json_schema")
+
+if __name__ == '__main__':
+    unittest.main()
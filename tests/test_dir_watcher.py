@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+from tools.dir_watcher import DirectoryWatcher
+
+class DirectoryWatcherTests:
+    """Shared tests run against both backends"""
+    use_inotify = True
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.watcher = DirectoryWatcher(self.temp_dir, extensions=["jpg", "png"], debounce=0.3,
+                                        poll_interval=0.05, use_inotify=self.use_inotify)
+
+    def tearDown(self):
+        self.watcher.close()
+        shutil.rmtree(self.temp_dir)
+
+    def write_file(self, name: str, delay: float = 0.0):
+        def write():
+            time.sleep(delay)
+            with open(os.path.join(self.temp_dir, name), "wb") as f:
+                f.write(b"image")
+        thread = threading.Thread(target=write)
+        thread.start()
+        return thread
+
+    def test_burst_is_returned_as_one_batch(self):
+        """Files arriving close together are debounced into a single batch"""
+        threads = [self.write_file("a.jpg", 0.05), self.write_file("b.png", 0.15), self.write_file("notes.txt", 0.1)]
+        batch = self.watcher.wait_for_batch(timeout=5)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(batch, [os.path.join(self.temp_dir, "a.jpg"), os.path.join(self.temp_dir, "b.png")])
+
+    def test_existing_files_are_not_reported(self):
+        """Only files that arrive after the watcher starts are reported"""
+        self.watcher.close()
+        self.write_file("old.jpg").join()
+        self.watcher = DirectoryWatcher(self.temp_dir, extensions=["jpg"], debounce=0.2,
+                                        poll_interval=0.05, use_inotify=self.use_inotify)
+        self.assertEqual(self.watcher.wait_for_batch(timeout=0.5), [])
+
+    def test_moved_in_file_is_reported(self):
+        source_dir = tempfile.mkdtemp()
+        try:
+            source = os.path.join(source_dir, "moved.jpg")
+            with open(source, "wb") as f:
+                f.write(b"image")
+            threading.Timer(0.05, shutil.move, args=(source, os.path.join(self.temp_dir, "moved.jpg"))).start()
+            self.assertEqual(self.watcher.wait_for_batch(timeout=5), [os.path.join(self.temp_dir, "moved.jpg")])
+        finally:
+            shutil.rmtree(source_dir)
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is only available on Linux")
+class TestInotifyWatcher(DirectoryWatcherTests, unittest.TestCase):
+    use_inotify = True
+
+    def test_backend(self):
+        self.assertEqual(self.watcher.backend, "inotify")
+
+class TestPollingWatcher(DirectoryWatcherTests, unittest.TestCase):
+    use_inotify = False
+
+    def test_backend(self):
+        self.assertEqual(self.watcher.backend, "polling")
+
+if __name__ == '__main__':
+    unittest.main()
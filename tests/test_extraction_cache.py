@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+import unittest
+import hashlib
+import tempfile
+import shutil
+from pathlib import Path
+from tools.extraction_cache import ExtractionCache, hash_file, fingerprint_text
+
+class TestExtractionCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.cache_file = self.temp_dir / "cache.json"
+        self.image_file = self.temp_dir / "image.jpg"
+        self.image_file.write_bytes(b"fake image bytes")
+        self.activities = [{"activity_name": "Story Time", "date": "2025-04-15"}]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_hash_file(self):
+        """Content hashes match the MD5 naming used for input images"""
+        self.assertEqual(hash_file(str(self.image_file)), hashlib.md5(b"fake image bytes").hexdigest())
+        other = self.temp_dir / "copy.jpg"
+        other.write_bytes(b"fake image bytes")
+        self.assertEqual(hash_file(str(self.image_file)), hash_file(str(other)))
+
+    def test_miss_then_hit(self):
+        """A stored extraction is returned on the next lookup and counted as a hit"""
+        cache = ExtractionCache(self.cache_file)
+        image_hash = hash_file(str(self.image_file))
+        prompt_fp = fingerprint_text("prompt v1")
+
+        self.assertIsNone(cache.get(image_hash, prompt_fp, "openai", "gpt-4o"))
+        cache.put(image_hash, prompt_fp, "openai", "gpt-4o", self.activities)
+        self.assertEqual(cache.get(image_hash, prompt_fp, "openai", "gpt-4o"), self.activities)
+
+        stats = cache.get_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+
+    def test_prompt_or_model_change_invalidates(self):
+        """Changing the prompt or the model misses the old entry"""
+        cache = ExtractionCache(self.cache_file)
+        image_hash = hash_file(str(self.image_file))
+        cache.put(image_hash, fingerprint_text("prompt v1"), "openai", "gpt-4o", self.activities)
+
+        self.assertIsNone(cache.get(image_hash, fingerprint_text("prompt v2"), "openai", "gpt-4o"))
+        self.assertIsNone(cache.get(image_hash, fingerprint_text("prompt v1"), "anthropic", "gpt-4o"))
+
+    def test_persistence(self):
+        """Saved entries are loaded by a new cache instance"""
+        cache = ExtractionCache(self.cache_file)
+        cache.put("abc", "fp", "openai", "gpt-4o", self.activities)
+        cache.save()
+
+        reloaded = ExtractionCache(self.cache_file)
+        self.assertEqual(reloaded.get("abc", "fp", "openai", "gpt-4o"), self.activities)
+
+    def test_returned_activities_are_copies(self):
+        """Mutating a returned activity does not change the cached entry"""
+        cache = ExtractionCache(self.cache_file)
+        cache.put("abc", "fp", "openai", "gpt-4o", self.activities)
+        cache.get("abc", "fp", "openai", "gpt-4o")[0]["date"] = "2030-01-01"
+        self.assertEqual(cache.get("abc", "fp", "openai", "gpt-4o")[0]["date"], "2025-04-15")
+
+if __name__ == '__main__':
+    unittest.main()
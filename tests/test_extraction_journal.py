@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from tools.extraction_journal import ExtractionJournal
+
+class TestExtractionJournal(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.journal = ExtractionJournal(self.temp_dir / "journal.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_append_and_replay(self):
+        """Entries are replayed in the order they were written"""
+        self.assertFalse(self.journal.exists())
+        self.journal.append("input/new/a.jpg", [{"activity_name": "A"}])
+        self.journal.append("input/new/b.jpg", [])
+        self.assertTrue(self.journal.exists())
+
+        entries = self.journal.replay()
+        self.assertEqual([e["source_file"] for e in entries], ["a.jpg", "b.jpg"])
+        self.assertEqual(entries[0]["activities"], [{"activity_name": "A"}])
+
+    def test_torn_last_line_is_ignored(self):
+        """A partially written entry from a crash does not break the replay"""
+        self.journal.append("input/a.jpg", [{"activity_name": "A"}])
+        with open(self.journal.journal_file, "a") as f:
+            f.write('{"image": "input/b.jpg", "source_fi')
+        entries = self.journal.replay()
+        self.assertEqual([e["source_file"] for e in entries], ["a.jpg"])
+
+    def test_latest_entry_wins(self):
+        self.journal.append("input/a.jpg", [{"activity_name": "old"}])
+        self.journal.append("input/a.jpg", [{"activity_name": "new"}])
+        entries = self.journal.replay()
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["activities"], [{"activity_name": "new"}])
+
+    def test_clear(self):
+        self.journal.append("input/a.jpg", [])
+        self.journal.clear()
+        self.assertFalse(self.journal.exists())
+        self.assertEqual(self.journal.replay(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+import unittest
+import time
+import asyncio
+import threading
+from tools.hedging import RequestHedger, CircuitBreaker, LatencyTracker
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_quantile_needs_enough_samples(self):
+        tracker = LatencyTracker()
+        for latency in range(1, 20):
+            tracker.record("openai", "gpt-4o", float(latency))
+        self.assertIsNone(tracker.quantile("openai", "gpt-4o", 0.95))
+        tracker.record("openai", "gpt-4o", 20.0)
+        self.assertEqual(tracker.quantile("openai", "gpt-4o", 0.95), 19.0)
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_consecutive_failures_and_recovers(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=3, cooldown=30, clock=clock)
+        for _ in range(2):
+            breaker.record_failure("openai")
+        breaker.record_success("openai")  # resets the count
+        for _ in range(3):
+            self.assertTrue(breaker.allow("openai"))
+            breaker.record_failure("openai")
+        self.assertEqual(breaker.state("openai"), "open")
+        self.assertFalse(breaker.allow("openai"))
+
+        # After the cooldown one trial request is let through
+        clock.now += 31
+        self.assertTrue(breaker.allow("openai"))
+        self.assertFalse(breaker.allow("openai"))
+        breaker.record_failure("openai")
+        self.assertEqual(breaker.state("openai"), "open")
+
+        clock.now += 31
+        self.assertTrue(breaker.allow("openai"))
+        breaker.record_success("openai")
+        self.assertEqual(breaker.state("openai"), "closed")
+        self.assertEqual(breaker.opened, 1)
+
+class TestRequestHedger(unittest.TestCase):
+    def setUp(self):
+        self.hedger = RequestHedger(default_delay=0.05)
+
+    def test_fast_primary_is_not_hedged(self):
+        backup_calls = []
+        result = self.hedger.call("openai", "gpt-4o", lambda: "primary",
+                                  "anthropic", "claude", lambda: backup_calls.append(1) or "backup")
+        self.assertEqual(result, ("primary", "openai", "gpt-4o"))
+        self.assertEqual(backup_calls, [])
+        stats = self.hedger.get_stats()["openai/gpt-4o"]
+        self.assertEqual((stats["requests"], stats["hedged"], stats["hedge_rate"]), (1, 0, 0.0))
+
+    def test_slow_primary_is_hedged_and_backup_wins(self):
+        release = threading.Event()
+        def slow():
+            release.wait(5)
+            return "primary"
+        try:
+            start = time.perf_counter()
+            result = self.hedger.call("openai", "gpt-4o", slow, "anthropic", "claude", lambda: "backup")
+            self.assertLess(time.perf_counter() - start, 1)
+        finally:
+            release.set()
+        self.assertEqual(result, ("backup", "anthropic", "claude"))
+        stats = self.hedger.get_stats()["openai/gpt-4o"]
+        self.assertEqual((stats["hedged"], stats["backup_wins"], stats["win_rate"]), (1, 1, 1.0))
+
+    def test_failed_primary_fails_over(self):
+        def fail():
+            raise RuntimeError("down")
+        self.assertEqual(self.hedger.call("openai", "gpt-4o", fail, "anthropic", "claude", lambda: "backup"),
+                         ("backup", "anthropic", "claude"))
+        stats = self.hedger.get_stats()["openai/gpt-4o"]
+        self.assertEqual((stats["hedged"], stats["failovers"]), (0, 1))
+
+    def test_open_circuit_routes_to_backup(self):
+        self.hedger.breaker = CircuitBreaker(failure_threshold=1)
+        primary_calls = []
+        def fail():
+            primary_calls.append(1)
+            raise RuntimeError("down")
+        self.hedger.call("openai", "gpt-4o", fail, "anthropic", "claude", lambda: "backup")
+        self.hedger.call("openai", "gpt-4o", fail, "anthropic", "claude", lambda: "backup")
+        self.assertEqual(len(primary_calls), 1)
+        self.assertEqual(self.hedger.get_stats()["openai/gpt-4o"]["failovers"], 2)
+
+    def test_capacity_is_reserved_only_for_requests_sent_to_primary(self):
+        self.hedger.breaker = CircuitBreaker(failure_threshold=1)
+        calls = []
+        def fail():
+            calls.append("primary")
+            raise RuntimeError("down")
+        for _ in range(2):
+            self.hedger.call("openai", "gpt-4o", fail, "anthropic", "claude", lambda: "backup",
+                             reserve=lambda: calls.append("reserve"))
+        # The second request goes straight to the backup without holding the primary's capacity
+        self.assertEqual(calls, ["reserve", "primary"])
+
+    def test_async_capacity_is_reserved_before_primary(self):
+        calls = []
+        async def reserve():
+            calls.append("reserve")
+        async def primary():
+            calls.append("primary")
+            return "primary"
+        async def backup():
+            return "backup"
+        result = asyncio.run(self.hedger.acall("openai", "gpt-4o", primary, "anthropic", "claude", backup,
+                                               reserve=reserve))
+        self.assertEqual(result, ("primary", "openai", "gpt-4o"))
+        self.assertEqual(calls, ["reserve", "primary"])
+
+    def test_error_when_both_fail(self):
+        def fail():
+            raise RuntimeError("down")
+        with self.assertRaisesRegex(RuntimeError, "down"):
+            self.hedger.call("openai", "gpt-4o", fail, "anthropic", "claude", fail)
+        self.assertEqual(self.hedger.get_stats()["openai/gpt-4o"]["errors"], 1)
+
+    def test_deadline_follows_p95_latency(self):
+        self.assertEqual(self.hedger.deadline("openai", "gpt-4o"), 0.05)
+        for latency in range(1, 21):
+            self.hedger.latencies.record("openai", "gpt-4o", float(latency))
+        self.assertEqual(self.hedger.deadline("openai", "gpt-4o"), 19.0)
+
+    def test_async_loser_is_cancelled(self):
+        cancelled = []
+        async def slow():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return "primary"
+        async def backup():
+            return "backup"
+        result = asyncio.run(self.hedger.acall("openai", "gpt-4o", slow, "anthropic", "claude", backup))
+        self.assertEqual(result, ("backup", "anthropic", "claude"))
+        self.assertEqual(cancelled, [True])
+        self.assertEqual(self.hedger.get_stats()["openai/gpt-4o"]["backup_wins"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+import unittest
+import random
+import tempfile
+import shutil
+from pathlib import Path
+from PIL import Image, ImageDraw
+from tools.image_hash import dhash, hamming_distance, BKTree, NearDuplicateIndex
+
+def make_flyer(path: Path, text_offset: int = 0, size=(400, 800), quality: int = 95):
+    """Draw a simple flyer-like image with some blocks of 'text'"""
+    image = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(image)
+    for i in range(10):
+        top = 40 + i * 70 + text_offset
+        draw.rectangle([30, top, 30 + (i * 37) % 300 + 40, top + 30], fill=(20 * i, 40, 120))
+    image.save(path, "JPEG", quality=quality)
+
+class TestPerceptualHash(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_recompressed_image_is_near_duplicate(self):
+        """A recompressed copy of a flyer hashes within a few bits of the original"""
+        original = self.temp_dir / "original.jpg"
+        recompressed = self.temp_dir / "recompressed.jpg"
+        other = self.temp_dir / "other.jpg"
+        make_flyer(original)
+        make_flyer(recompressed, quality=40)
+        image = Image.new("RGB", (400, 800), "white")
+        ImageDraw.Draw(image).ellipse([50, 50, 350, 750], fill="black")
+        image.save(other, "JPEG")
+
+        self.assertLessEqual(hamming_distance(dhash(str(original)), dhash(str(recompressed))), 4)
+        self.assertGreater(hamming_distance(dhash(str(original)), dhash(str(other))), 10)
+
+    def test_hamming_distance(self):
+        self.assertEqual(hamming_distance(0b1011, 0b1001), 1)
+        self.assertEqual(hamming_distance(0, (1 << 64) - 1), 64)
+
+class TestBKTree(unittest.TestCase):
+    def test_search_matches_brute_force(self):
+        """Range queries return exactly the hashes within the distance, closest first"""
+        rng = random.Random(42)
+        hashes = [rng.getrandbits(64) for _ in range(500)]
+        tree = BKTree()
+        for i, h in enumerate(hashes):
+            tree.add(h, i)
+        self.assertEqual(len(tree), 500)
+
+        query = hashes[17] ^ 0b101  # two bits away from an indexed hash
+        expected = sorted(i for i, h in enumerate(hashes) if hamming_distance(query, h) <= 6)
+        results = tree.search(query, 6)
+        self.assertEqual(sorted(value for _, value in results), expected)
+        self.assertEqual(results[0], (2, 17))
+
+    def test_duplicate_hashes_keep_all_values(self):
+        tree = BKTree()
+        tree.add(123, "a")
+        tree.add(123, "b")
+        self.assertEqual(sorted(v for _, v in tree.search(123, 0)), ["a", "b"])
+
+    def test_empty_tree(self):
+        self.assertEqual(BKTree().search(1, 10), [])
+
+class TestNearDuplicateIndex(unittest.TestCase):
+    def test_find_nearest_excludes_self(self):
+        index = NearDuplicateIndex(max_distance=3)
+        index.add(0b1111, "self")
+        index.add(0b1110, "other")
+        self.assertEqual(index.find_nearest(0b1111, exclude="self"), (1, "other"))
+        self.assertIsNone(index.find_nearest(0b1111 ^ (0xFF << 8), exclude="self"))
+        # Only matches whose extraction is reused are counted
+        self.assertEqual(index.get_stats(), {"indexed": 2, "matches": 0})
+        index.record_match()
+        self.assertEqual(index.get_stats(), {"indexed": 2, "matches": 1})
+
+if __name__ == '__main__':
+    unittest.main()
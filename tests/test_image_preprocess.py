@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from PIL import Image
+from tools.image_preprocess import prepare_image, target_size, estimate_image_tokens, estimate_file_tokens
+
+class TestImagePreprocess(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = Path(tempfile.mkdtemp())
+        # A tall phone screenshot with EXIF metadata
+        cls.image_path = cls.temp_dir / "screenshot.png"
+        image = Image.effect_noise((234, 506), 60).resize((1170, 2532)).convert("RGB")
+        exif = Image.Exif()
+        exif[0x010F] = "Test Phone"  # Make
+        image.save(cls.image_path, "PNG", exif=exif, compress_level=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir)
+
+    def setUp(self):
+        self.cache_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_target_size(self):
+        """Images are scaled to the size each provider actually uses"""
+        self.assertEqual(target_size(1170, 2532, "openai"), (768, 1662))
+        self.assertEqual(target_size(1170, 2532, "anthropic"), (725, 1568))
+        self.assertEqual(target_size(400, 300, "openai"), (400, 300))  # never upscaled
+        self.assertEqual(target_size(1170, 2532, "openai", max_dimension=1024), (473, 1024))
+
+    def test_estimate_image_tokens(self):
+        # 768x1662 -> 2x4 tiles
+        self.assertEqual(estimate_image_tokens(1170, 2532, "openai"), 85 + 170 * 8)
+        self.assertEqual(estimate_image_tokens(750, 1000, "anthropic"), 1000)
+
+    def test_low_detail(self):
+        """Low detail costs a flat 85 tokens on OpenAI and means a 512px image elsewhere"""
+        self.assertEqual(target_size(1170, 2532, "openai", detail="low"), (237, 512))
+        self.assertEqual(estimate_image_tokens(1170, 2532, "openai", detail="low"), 85)
+        self.assertEqual(estimate_image_tokens(1170, 2532, "anthropic", detail="low"), 162)  # 237x512 / 750
+        self.assertEqual(estimate_file_tokens(str(self.image_path), "openai", "low"), 85)
+        self.assertEqual(estimate_file_tokens(str(self.image_path), "openai", "high"), 85 + 170 * 8)
+
+        prepared = prepare_image(str(self.image_path), provider="openai", cache_dir=self.cache_dir, detail="low")
+        output = self.temp_dir / "low.jpg"
+        output.write_bytes(prepared.data)
+        with Image.open(output) as image:
+            self.assertEqual(image.size, (237, 512))
+
+    def test_prepare_image_downscales_and_strips_metadata(self):
+        prepared = prepare_image(str(self.image_path), provider="openai", cache_dir=self.cache_dir)
+        self.assertEqual(prepared.mime_type, "image/jpeg")
+        self.assertGreater(prepared.bytes_saved, 0)
+
+        output = self.temp_dir / "prepared.jpg"
+        output.write_bytes(prepared.data)
+        with Image.open(output) as image:
+            self.assertEqual(image.size, (768, 1662))
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_prepare_image_uses_disk_cache(self):
+        first = prepare_image(str(self.image_path), provider="openai", cache_dir=self.cache_dir)
+        cached_files = list(self.cache_dir.glob("*.jpg"))
+        self.assertEqual(len(cached_files), 1)
+
+        second = prepare_image(str(self.image_path), provider="openai", cache_dir=self.cache_dir)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(list(self.cache_dir.glob("*.tmp")), [])
+
+    def test_tokens_saved_compares_original_and_resized_sizes(self):
+        prepared = prepare_image(str(self.image_path), provider="openai", cache_dir=None)
+        # 1170x2532 -> 3x5 tiles, 768x1662 -> 2x4 tiles
+        self.assertEqual(prepared.original_tokens, 85 + 170 * 15)
+        self.assertEqual(prepared.prepared_tokens, 85 + 170 * 8)
+        self.assertEqual(prepared.tokens_saved, 170 * 7)
+
+    def test_lower_max_dimension_saves_tokens(self):
+        prepared = prepare_image(str(self.image_path), provider="openai", max_dimension=1024,
+                                 cache_dir=None)
+        self.assertGreater(prepared.tokens_saved, 0)
+
+    def test_small_image_keeps_original_bytes(self):
+        """Re-encoding never makes an image bigger"""
+        small_path = self.temp_dir / "small.png"
+        Image.new("RGB", (10, 10), "white").save(small_path, "PNG")
+        prepared = prepare_image(str(small_path), provider="openai", cache_dir=None)
+        self.assertEqual(prepared.data, small_path.read_bytes())
+        self.assertEqual(prepared.mime_type, "image/png")
+        self.assertEqual(prepared.bytes_saved, 0)
+
+if __name__ == '__main__':
+    unittest.main()
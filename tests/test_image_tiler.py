@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import tempfile
+import shutil
+from pathlib import Path
+from PIL import Image
+from tools.image_tiler import needs_tiling, tile_bounds, split_image
+
+class TestTileBounds(unittest.TestCase):
+    def test_needs_tiling(self):
+        self.assertFalse(needs_tiling(1170, 2532))  # one phone screen
+        self.assertTrue(needs_tiling(1170, 8000))
+
+    def test_tiles_cover_image_with_overlap(self):
+        bounds = tile_bounds(1000, 7000, tile_aspect=2.0, overlap=0.15)
+        self.assertEqual(bounds[0][0], 0)
+        self.assertEqual(bounds[-1][1], 7000)
+        for top, bottom in bounds:
+            self.assertEqual(bottom - top, 2000)
+        for (_, previous_bottom), (next_top, _) in zip(bounds, bounds[1:]):
+            self.assertGreaterEqual(previous_bottom - next_top, 300)
+
+    def test_short_image_is_one_tile(self):
+        self.assertEqual(tile_bounds(1000, 1500), [(0, 1500)])
+
+class TestSplitImage(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.tile_dir = self.temp_dir / "tiles"
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_tall_image_is_split(self):
+        image_path = self.temp_dir / "list.png"
+        Image.new("RGB", (400, 2000), "white").save(image_path)
+        tiles = split_image(str(image_path), self.tile_dir)
+        self.assertEqual([tile.label for tile in tiles], [f"{i}/{len(tiles)}" for i in range(1, len(tiles) + 1)])
+        self.assertGreater(len(tiles), 2)
+        for tile in tiles:
+            with Image.open(tile.path) as image:
+                self.assertEqual(image.size, (400, tile.bottom - tile.top))
+
+        # Tiles are reused on the next run
+        mtimes = [os.path.getmtime(tile.path) for tile in tiles]
+        again = split_image(str(image_path), self.tile_dir)
+        self.assertEqual([tile.path for tile in again], [tile.path for tile in tiles])
+        self.assertEqual([os.path.getmtime(tile.path) for tile in again], mtimes)
+
+    def test_normal_image_is_not_split(self):
+        image_path = self.temp_dir / "flyer.png"
+        Image.new("RGB", (400, 800), "white").save(image_path)
+        self.assertEqual(split_image(str(image_path), self.tile_dir), [])
+        self.assertFalse(self.tile_dir.exists())
+
+if __name__ == '__main__':
+    unittest.main()
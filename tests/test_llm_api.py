@@ -1,11 +1,45 @@
 import unittest
 from unittest.mock import patch, MagicMock, mock_open
-from tools.llm_api import create_llm_client, query_llm, load_environment
+from tools.llm_api import (
+    create_llm_client, query_llm, load_environment, get_llm_client, get_client_stats, reset_llm_clients,
+    LLMClientRegistry, aquery_llm, gather_limited, get_async_llm_client
+)
 from tools.token_tracker import TokenUsage, APIResponse, get_token_tracker
+from tools.response_cache import ResponseCache, make_cache_key
+from tools.hedging import RequestHedger
+from tools.rate_limiter import RateLimiter
 import os
 import google.generativeai as genai
 import io
 import sys
+import threading
+import time
+import http.server
+import subprocess
+import shutil
+import tempfile
+import asyncio
+from unittest.mock import AsyncMock
+
+def serve_raw_responses(api, headers=None):
+    """Answer a mock SDK resource's with_raw_response.create from its create mock"""
+    def raw_response(response):
+        raw = MagicMock()
+        raw.headers = headers or {}
+        raw.parse.return_value = response
+        return raw
+
+    async def araw_response(**kwargs):
+        raw = raw_response(None)
+        raw.parse = AsyncMock(return_value=await api.create(**kwargs))
+        return raw
+
+    def create(**kwargs):
+        if isinstance(api.create, AsyncMock):
+            return araw_response(**kwargs)
+        return raw_response(api.create(**kwargs))
+    api.with_raw_response.create.side_effect = create
+    return api
 
 class TestEnvironmentLoading(unittest.TestCase):
     def setUp(self):
@@ -46,7 +80,7 @@ class TestEnvironmentLoading(unittest.TestCase):
         mock_load_dotenv.side_effect = load_dotenv_side_effect
         
         # Load environment
-        load_environment()
+        load_environment(force=True)
         
         # Verify precedence (.env.local should win)
         self.assertEqual(os.environ.get('TEST_VAR'), 'local')
@@ -65,13 +99,94 @@ class TestEnvironmentLoading(unittest.TestCase):
         mock_exists.return_value = False
         
         # Load environment
-        load_environment()
+        load_environment(force=True)
         
         # Verify load_dotenv was not called
         mock_load_dotenv.assert_not_called()
 
+    @patch('pathlib.Path.exists')
+    @patch('tools.llm_api.load_dotenv')
+    def test_environment_loaded_once(self, mock_load_dotenv, mock_exists):
+        mock_exists.return_value = True
+        load_environment(force=True)
+        self.assertEqual(mock_load_dotenv.call_count, 3)
+        
+        # Later calls are no-ops
+        load_environment()
+        load_environment()
+        self.assertEqual(mock_load_dotenv.call_count, 3)
+
+    @patch('pathlib.Path.exists')
+    @patch('tools.llm_api.load_dotenv')
+    def test_concurrent_first_callers_wait_for_loading(self, mock_load_dotenv, mock_exists):
+        """No caller returns before the .env files have been loaded"""
+        mock_exists.return_value = True
+        def slow_load(dotenv_path):
+            time.sleep(0.05)
+            os.environ['TEST_VAR'] = 'loaded'
+        mock_load_dotenv.side_effect = slow_load
+        
+        seen = []
+        def first_call():
+            load_environment()
+            seen.append(os.environ.get('TEST_VAR'))
+        with patch('tools.llm_api._environment_loaded', False):
+            threads = [threading.Thread(target=first_call) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(seen, ['loaded'] * 8)
+        self.assertEqual(mock_load_dotenv.call_count, 3)
+
+    @patch('pathlib.Path.exists')
+    @patch('tools.llm_api.load_dotenv')
+    def test_environment_loading_is_quiet(self, mock_load_dotenv, mock_exists):
+        mock_exists.return_value = False
+        with patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            load_environment(force=True)
+        self.assertEqual(stderr.getvalue(), "")
+
+class TestLazyImports(unittest.TestCase):
+    # Maintenance commands (--sanitize-only, --archive-past, ...) should start quickly
+    IMPORT_BUDGET = 1.0  # seconds
+
+    def run_import(self, module):
+        code = (
+            "import sys, time\n"
+            "start = time.perf_counter()\n"
+            f"import {module}\n"
+            "elapsed = time.perf_counter() - start\n"
+            "heavy = ['google.generativeai', 'openai', 'anthropic', 'do512_scraper', 'bs4']\n"
+            "print(elapsed, ','.join(name for name in heavy if name in sys.modules))\n"
+        )
+        repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, "-c", code], cwd=repo_root,
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        elapsed, _, loaded = result.stdout.strip().splitlines()[-1].partition(" ")
+        return float(elapsed), [name for name in loaded.split(",") if name], result.stderr
+
+    def test_sdks_not_imported_eagerly(self):
+        _, loaded, stderr = self.run_import("activity_extractor")
+        self.assertEqual(loaded, [])
+        # Importing no longer prints the environment
+        self.assertEqual(stderr, "")
+
+    def test_import_time_budget(self):
+        elapsed, _, _ = self.run_import("activity_extractor")
+        self.assertLess(elapsed, self.IMPORT_BUDGET)
+
+    def test_sdk_imported_on_first_use(self):
+        import tools.llm_api as llm_api
+        self.assertIs(llm_api.OpenAI, __import__("openai").OpenAI)
+        self.assertIs(llm_api.genai, genai)
+
 class TestLLMAPI(unittest.TestCase):
     def setUp(self):
+        # Clients are cached per provider; start every test without any
+        reset_llm_clients()
+        
         # Create mock clients for different providers
         self.mock_openai_client = MagicMock()
         self.mock_anthropic_client = MagicMock()
@@ -112,6 +227,9 @@ class TestLLMAPI(unittest.TestCase):
         self.mock_openai_client.chat.completions.create.return_value = self.mock_openai_response
         self.mock_anthropic_client.messages.create.return_value = self.mock_anthropic_response
         self.mock_azure_client.chat.completions.create.return_value = self.mock_azure_response
+        for api in (self.mock_openai_client.chat.completions, self.mock_anthropic_client.messages,
+                    self.mock_azure_client.chat.completions):
+            serve_raw_responses(api)
         
         # Set up Gemini-style response
         self.mock_gemini_model = MagicMock()
@@ -133,6 +251,7 @@ class TestLLMAPI(unittest.TestCase):
 
     def tearDown(self):
         self.env_patcher.stop()
+        reset_llm_clients()
 
     @patch('tools.llm_api.OpenAI')
     def test_create_openai_client(self, mock_openai):
@@ -169,6 +288,14 @@ class TestLLMAPI(unittest.TestCase):
         mock_anthropic.assert_called_once_with(api_key='test-anthropic-key')
         self.assertEqual(client, self.mock_anthropic_client)
 
+    @patch('tools.llm_api._sdk')
+    def test_create_client_imports_only_its_sdk(self, mock_sdk):
+        create_llm_client("anthropic")
+        mock_sdk.assert_called_once_with("Anthropic")
+        mock_sdk.reset_mock()
+        create_llm_client("openai", async_client=True)
+        mock_sdk.assert_called_once_with("AsyncOpenAI")
+
     @patch('tools.llm_api.genai')
     def test_create_gemini_client(self, mock_genai):
         client = create_llm_client("gemini")
@@ -313,6 +440,143 @@ class TestLLMAPI(unittest.TestCase):
             temperature=0.7
         )
 
+    @patch('tools.llm_api.encode_image_file')
+    @patch('tools.llm_api.create_llm_client')
+    def test_query_with_multiple_images(self, mock_create_client, mock_encode):
+        """Several images are attached to one request, each preceded by a position label"""
+        mock_create_client.return_value = self.mock_openai_client
+        mock_encode.side_effect = lambda path, provider=None, detail=None: (f"data-{path}", "image/jpeg")
+        response = query_llm("Test prompt", provider="openai", model="gpt-4o", image_paths=["a.jpg", "b.jpg"])
+        self.assertEqual(response, "Test OpenAI response")
+        content = self.mock_openai_client.chat.completions.create.call_args[1]["messages"][0]["content"]
+        self.assertEqual(content, [
+            {"type": "text", "text": "Test prompt"},
+            {"type": "text", "text": "Image 1:"},
+            {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,data-a.jpg"}},
+            {"type": "text", "text": "Image 2:"},
+            {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,data-b.jpg"}}
+        ])
+
+    @patch('tools.llm_api.encode_image_file')
+    @patch('tools.llm_api.create_llm_client')
+    def test_query_with_low_image_detail(self, mock_create_client, mock_encode):
+        """The image detail is sent to OpenAI and used when preparing the image"""
+        mock_create_client.return_value = self.mock_openai_client
+        mock_encode.return_value = ("data", "image/jpeg")
+        query_llm("Test prompt", provider="openai", model="gpt-4o", image_path="a.jpg", image_detail="low")
+        content = self.mock_openai_client.chat.completions.create.call_args[1]["messages"][0]["content"]
+        self.assertEqual(content[1], {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,data", "detail": "low"}})
+        mock_encode.assert_called_once_with("a.jpg", provider="openai", detail="low")
+
+    @patch('tools.llm_api.create_llm_client')
+    def test_query_with_max_tokens(self, mock_create_client):
+        """max_tokens replaces Anthropic's default cap and is passed to OpenAI only when set"""
+        mock_create_client.side_effect = lambda provider, **kwargs: (
+            self.mock_anthropic_client if provider == "anthropic" else self.mock_openai_client
+        )
+        query_llm("Test prompt", provider="anthropic", model="claude-3-5-sonnet-20241022")
+        self.assertEqual(self.mock_anthropic_client.messages.create.call_args[1]["max_tokens"], 1000)
+        query_llm("Test prompt", provider="anthropic", model="claude-3-5-sonnet-20241022", max_tokens=4000)
+        self.assertEqual(self.mock_anthropic_client.messages.create.call_args[1]["max_tokens"], 4000)
+        query_llm("Test prompt", provider="openai", model="gpt-4o", max_tokens=4000)
+        self.assertEqual(self.mock_openai_client.chat.completions.create.call_args[1]["max_tokens"], 4000)
+        query_llm("Test prompt", provider="openai", model="o1", max_tokens=4000)
+        kwargs = self.mock_openai_client.chat.completions.create.call_args[1]
+        self.assertEqual(kwargs["max_completion_tokens"], 4000)
+        self.assertNotIn("max_tokens", kwargs)
+
+    @patch('tools.llm_api.get_request_hedger')
+    @patch('tools.llm_api.get_llm_client')
+    def test_query_fails_over_to_hedge_provider(self, mock_get_client, mock_get_hedger):
+        """A failed request is answered by the backup provider's default model"""
+        hedger = RequestHedger()
+        mock_get_hedger.return_value = hedger
+        mock_get_client.return_value = self.mock_anthropic_client
+        self.mock_openai_client.chat.completions.create.side_effect = Exception("Test error")
+        response = query_llm("Test prompt", self.mock_openai_client, model="gpt-4o", hedge_provider="anthropic")
+        self.assertEqual(response, "Test Anthropic response")
+        mock_get_client.assert_called_once_with("anthropic")
+        self.assertEqual(self.mock_anthropic_client.messages.create.call_args[1]["model"], "claude-3-5-sonnet-20241022")
+        self.assertEqual(hedger.get_stats()["openai/gpt-4o"]["failovers"], 1)
+
+    @patch('tools.llm_api.encode_image_file', return_value=("data", "image/jpeg"))
+    @patch('tools.llm_api.get_request_hedger')
+    @patch('tools.llm_api.get_llm_client')
+    def test_image_request_fails_over_with_its_image(self, mock_get_client, mock_get_hedger, mock_encode):
+        """The backup request carries the image, and an unpriced backup model costs nothing instead of failing"""
+        mock_get_hedger.return_value = RequestHedger()
+        mock_get_client.return_value = self.mock_azure_client
+        self.mock_openai_client.chat.completions.create.side_effect = Exception("Test error")
+        response = query_llm("Test prompt", self.mock_openai_client, model="gpt-4o", image_path="a.jpg",
+                             hedge_provider="azure")
+        self.assertEqual(response, "Test Azure OpenAI response")
+        content = self.mock_azure_client.chat.completions.create.call_args[1]["messages"][0]["content"]
+        self.assertEqual(content[1], {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,data"}})
+
+    @patch('tools.llm_api.encode_image_file', return_value=("data", "image/jpeg"))
+    @patch('tools.llm_api.get_request_hedger')
+    @patch('tools.llm_api.get_llm_client')
+    def test_image_request_is_not_hedged_to_text_only_provider(self, mock_get_client, mock_get_hedger, mock_encode):
+        """Image requests are not sent to a backup that would drop the image"""
+        response = query_llm("Test prompt", self.mock_openai_client, model="gpt-4o", image_path="a.jpg",
+                             hedge_provider="deepseek")
+        self.assertEqual(response, "Test OpenAI response")
+        mock_get_hedger.assert_not_called()
+        mock_get_client.assert_not_called()
+
+    @patch('tools.llm_api.get_rate_limiter')
+    @patch('tools.llm_api.get_request_hedger')
+    @patch('tools.llm_api.get_llm_client')
+    def test_rate_limit_wait_does_not_trigger_hedge(self, mock_get_client, mock_get_hedger, mock_get_limiter):
+        """Time spent waiting for rate-limit capacity is not counted toward the hedge deadline"""
+        hedger = RequestHedger(default_delay=0.05)
+        mock_get_hedger.return_value = hedger
+        limiter = mock_get_limiter.return_value
+        limiter.acquire.side_effect = lambda *args: time.sleep(0.2)
+        limiter.call.side_effect = lambda provider, model, tokens, request, reserved=False: request()
+        response = query_llm("Test prompt", self.mock_openai_client, model="gpt-4o", hedge_provider="anthropic")
+        self.assertEqual(response, "Test OpenAI response")
+        mock_get_client.assert_not_called()
+        limiter.acquire.assert_called_once()
+        self.assertTrue(limiter.call.call_args[0][4])
+        self.assertEqual(hedger.get_stats()["openai/gpt-4o"]["hedged"], 0)
+
+    @patch('tools.llm_api.create_llm_client')
+    def test_query_openai_with_response_schema(self, mock_create_client):
+        """A response schema is sent as a strict json_schema response format named after its title"""
+        mock_create_client.return_value = self.mock_openai_client
+        schema = {"title": "answer", "type": "object", "properties": {"x": {"type": "integer"}}}
+        query_llm("Test prompt", provider="openai", model="gpt-4o", response_schema=schema)
+        response_format = self.mock_openai_client.chat.completions.create.call_args[1]["response_format"]
+        self.assertEqual(response_format, {
+            "type": "json_schema",
+            "json_schema": {"name": "answer", "schema": {"type": "object", "properties": {"x": {"type": "integer"}}}, "strict": True}
+        })
+
+    @patch('tools.llm_api.create_llm_client')
+    def test_query_anthropic_with_response_schema(self, mock_create_client):
+        """Anthropic is forced to call a tool with the schema, and the tool input is returned as JSON"""
+        mock_create_client.return_value = self.mock_anthropic_client
+        tool_use = MagicMock()
+        tool_use.type = "tool_use"
+        tool_use.input = {"x": 1}
+        self.mock_anthropic_response.content = [tool_use]
+        schema = {"title": "answer", "type": "object", "properties": {"x": {"type": "integer"}}}
+        response = query_llm("Test prompt", provider="anthropic", model="claude-3-5-sonnet-20241022", response_schema=schema)
+        self.assertEqual(response, '{"x": 1}')
+        kwargs = self.mock_anthropic_client.messages.create.call_args[1]
+        self.assertEqual(kwargs["tools"][0]["input_schema"], {"type": "object", "properties": {"x": {"type": "integer"}}})
+        self.assertEqual(kwargs["tool_choice"], {"type": "tool", "name": "answer"})
+
+    def test_successful_response_headers_adapt_rate_limits(self):
+        limiter = RateLimiter()
+        serve_raw_responses(self.mock_openai_client.chat.completions,
+                            headers={"x-ratelimit-limit-requests": "5000", "x-ratelimit-limit-tokens": "800000"})
+        with patch('tools.llm_api.get_rate_limiter', return_value=limiter):
+            self.assertEqual(query_llm("Test prompt", self.mock_openai_client, model="gpt-4o"), "Test OpenAI response")
+        stats = limiter.get_stats()["openai/gpt-4o"]
+        self.assertEqual((stats["rpm"], stats["tpm"]), (5000, 800000))
+
     @patch('tools.llm_api.create_llm_client')
     def test_query_error(self, mock_create_client):
         self.mock_openai_client.chat.completions.create.side_effect = Exception("Test error")
@@ -320,5 +584,202 @@ class TestLLMAPI(unittest.TestCase):
         response = query_llm("Test prompt")
         self.assertIsNone(response)
 
+class TestResponseCaching(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = ResponseCache(os.path.join(self.temp_dir, "responses.sqlite3"))
+        self.cache_patcher = patch('tools.llm_api.get_response_cache', return_value=self.cache)
+        self.cache_patcher.start()
+        
+        self.client = MagicMock()
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = "Cached answer"
+        response.usage = TokenUsage(prompt_tokens=100, completion_tokens=50, total_tokens=150)
+        self.client.chat.completions.create.return_value = response
+        serve_raw_responses(self.client.chat.completions)
+
+    def tearDown(self):
+        self.cache_patcher.stop()
+        self.cache.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_identical_requests_are_served_from_cache(self):
+        tracker = MagicMock()
+        tracker.calculate_openai_cost.return_value = 0.01
+        with patch('tools.llm_api.get_token_tracker', return_value=tracker):
+            first = query_llm("Plan the weekend", self.client, model="gpt-4o", cache=True)
+            second = query_llm("Plan the weekend  ", self.client, model="gpt-4o", cache=True)
+        
+        self.assertEqual(first, "Cached answer")
+        self.assertEqual(second, "Cached answer")
+        self.client.chat.completions.create.assert_called_once()
+        tracker.record_savings.assert_any_call("response_cache", misses=1)
+        tracker.record_savings.assert_any_call("response_cache", hits=1, tokens_saved=150, cost_saved=0.01)
+
+    def test_cache_is_opt_in(self):
+        with patch.dict(os.environ, {"LLM_CACHE": ""}):
+            query_llm("Plan the weekend", self.client, model="gpt-4o")
+            query_llm("Plan the weekend", self.client, model="gpt-4o")
+        self.assertEqual(self.client.chat.completions.create.call_count, 2)
+        self.assertEqual(self.cache.get_stats()["entries"], 0)
+
+    def test_failed_requests_are_not_cached(self):
+        self.client.chat.completions.create.side_effect = ValueError("boom")
+        self.assertIsNone(query_llm("Plan the weekend", self.client, model="gpt-4o", cache=True))
+        self.assertEqual(self.cache.get_stats()["entries"], 0)
+
+    @patch('tools.llm_api.get_request_hedger', return_value=RequestHedger())
+    @patch('tools.llm_api.get_llm_client')
+    def test_backup_answer_is_cached_under_backup_model(self, mock_get_client, mock_get_hedger):
+        backup = MagicMock()
+        response = MagicMock()
+        response.content = [MagicMock(text="Backup answer")]
+        response.usage.input_tokens, response.usage.output_tokens = 10, 5
+        backup.messages.create.return_value = response
+        serve_raw_responses(backup.messages)
+        mock_get_client.return_value = backup
+        self.client.chat.completions.create.side_effect = Exception("Test error")
+        
+        with patch.dict(os.environ, {"LLM_HEDGE_MODEL": ""}):
+            result = query_llm("Plan the weekend", self.client, model="gpt-4o", cache=True, hedge_provider="anthropic")
+        self.assertEqual(result, "Backup answer")
+        self.assertIsNone(self.cache.get(make_cache_key("openai", "gpt-4o", "Plan the weekend", [], 0.7)))
+        cached = self.cache.get(make_cache_key("anthropic", "claude-3-5-sonnet-20241022", "Plan the weekend", [], None))
+        self.assertEqual(cached["content"], "Backup answer")
+
+    def test_async_query_uses_cache(self):
+        self.cache.put(make_cache_key("openai", "gpt-4o", "Plan the weekend", [], 0.7), "From disk")
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock()
+        result = asyncio.run(aquery_llm("Plan the weekend", client, model="gpt-4o", cache=True))
+        self.assertEqual(result, "From disk")
+        client.chat.completions.create.assert_not_called()
+
+class TestClientRegistry(unittest.TestCase):
+    def setUp(self):
+        reset_llm_clients()
+
+    def tearDown(self):
+        reset_llm_clients()
+
+    @patch('tools.llm_api.create_llm_client')
+    def test_client_is_shared_across_threads(self, mock_create_client):
+        mock_create_client.side_effect = lambda provider, http_client=None, max_retries=None: MagicMock(name=provider)
+        clients = []
+        threads = [threading.Thread(target=lambda: clients.append(get_llm_client("openai"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(mock_create_client.call_count, 1)
+        self.assertTrue(all(client is clients[0] for client in clients))
+        self.assertIsNot(get_llm_client("anthropic"), clients[0])
+        stats = get_client_stats()
+        self.assertEqual(stats["clients_created"], 2)
+        self.assertEqual(stats["client_reuses"], 7)
+
+    @patch.dict('os.environ', {'OPENAI_API_KEY': 'test-openai-key'})
+    @patch('tools.llm_api.OpenAI')
+    def test_client_gets_pooled_http_client(self, mock_openai):
+        get_llm_client("openai")
+        http_client = mock_openai.call_args[1]["http_client"]
+        self.assertIsNotNone(http_client)
+        # Retries are left to the rate limiter
+        self.assertEqual(mock_openai.call_args[1]["max_retries"], 0)
+        http_client.close()
+
+    def test_connection_reuse_is_counted(self):
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+            def log_message(self, *args):
+                pass
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        registry = LLMClientRegistry()
+        http_client = registry._create_http_client("openai")
+        try:
+            for _ in range(3):
+                http_client.get(f"http://127.0.0.1:{server.server_address[1]}/")
+        finally:
+            http_client.close()
+            server.shutdown()
+            server.server_close()
+        stats = registry.get_stats()
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["connections_opened"], 1)
+        self.assertEqual(stats["connection_reuses"], 2)
+
+class TestAsyncQuery(unittest.TestCase):
+    def setUp(self):
+        reset_llm_clients()
+
+    def tearDown(self):
+        reset_llm_clients()
+
+    def make_openai_response(self, content):
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = content
+        response.usage = TokenUsage(prompt_tokens=10, completion_tokens=5, total_tokens=15)
+        return response
+
+    @patch('tools.llm_api.get_token_tracker')
+    def test_aquery_openai_tracks_tokens(self, mock_get_tracker):
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(return_value=self.make_openai_response("Async response"))
+        serve_raw_responses(client.chat.completions)
+        mock_get_tracker.return_value.calculate_openai_cost.return_value = 0.001
+        response = asyncio.run(aquery_llm("Test prompt", client=client, provider="openai", model="gpt-4o"))
+        self.assertEqual(response, "Async response")
+        client.chat.completions.create.assert_awaited_once_with(
+            model="gpt-4o",
+            messages=[{"role": "user", "content": [{"type": "text", "text": "Test prompt"}]}],
+            temperature=0.7
+        )
+        api_response = mock_get_tracker.return_value.track_request.call_args[0][0]
+        self.assertEqual(api_response.token_usage.total_tokens, 15)
+        self.assertEqual(api_response.cost, 0.001)
+
+    def test_aquery_error_returns_none(self):
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(side_effect=Exception("Test error"))
+        serve_raw_responses(client.chat.completions)
+        self.assertIsNone(asyncio.run(aquery_llm("Test prompt", client=client)))
+
+    @patch('tools.llm_api.create_llm_client')
+    def test_async_clients_are_per_event_loop(self, mock_create_client):
+        mock_create_client.side_effect = lambda provider, http_client=None, async_client=False, max_retries=None: MagicMock()
+
+        async def get_twice():
+            return get_async_llm_client("openai"), get_async_llm_client("openai")
+
+        first, second = asyncio.run(get_twice())
+        self.assertIs(first, second)
+        other_loop, _ = asyncio.run(get_twice())
+        self.assertIsNot(first, other_loop)
+        self.assertTrue(mock_create_client.call_args[1]["async_client"])
+
+    def test_gather_limited(self):
+        running = 0
+        peak = 0
+
+        async def work(i):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return i
+
+        results = asyncio.run(gather_limited([work(i) for i in range(10)], limit=3))
+        self.assertEqual(results, list(range(10)))
+        self.assertEqual(peak, 3)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import unittest
+from tools.model_router import ModelRouter, ModelTier
+
+CHEAP = ModelTier("openai", "gpt-4o-mini")
+STRONG = ModelTier("openai", "gpt-4o")
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestModelRouter(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.router = ModelRouter([CHEAP, STRONG], min_confidence=0.75, clock=self.clock)
+
+    def attempt_with(self, confidences, latency=1.0):
+        calls = []
+        def attempt(tier):
+            calls.append(tier)
+            self.clock.now += latency
+            confidence = confidences[tier]
+            if isinstance(confidence, Exception):
+                raise confidence
+            return f"result from {tier.model}", confidence
+        return attempt, calls
+
+    def test_confident_cheap_result_is_accepted(self):
+        attempt, calls = self.attempt_with({CHEAP: 1.0, STRONG: 1.0})
+        result, tier = self.router.run(attempt)
+        self.assertEqual((result, tier), ("result from gpt-4o-mini", CHEAP))
+        self.assertEqual(calls, [CHEAP])
+
+    def test_low_confidence_escalates(self):
+        attempt, calls = self.attempt_with({CHEAP: 0.5, STRONG: 0.9})
+        result, tier = self.router.run(attempt)
+        self.assertEqual((result, tier), ("result from gpt-4o", STRONG))
+        self.assertEqual(calls, [CHEAP, STRONG])
+
+    def test_errors_escalate_until_the_last_tier(self):
+        attempt, _ = self.attempt_with({CHEAP: RuntimeError("timeout"), STRONG: 0.9})
+        self.assertEqual(self.router.run(attempt)[1], STRONG)
+
+        attempt, _ = self.attempt_with({CHEAP: RuntimeError("timeout"), STRONG: RuntimeError("down")})
+        with self.assertRaises(RuntimeError):
+            self.router.run(attempt)
+
+    def test_last_tier_result_is_returned_even_when_unconfident(self):
+        attempt, _ = self.attempt_with({CHEAP: 0.0, STRONG: 0.2})
+        self.assertEqual(self.router.run(attempt)[1], STRONG)
+        self.assertEqual(self.router.get_stats()[STRONG.name]["low_confidence"], 1)
+
+    def test_stats_per_tier(self):
+        for confidence in (1.0, 1.0, 0.0, 0.5):
+            attempt, _ = self.attempt_with({CHEAP: confidence, STRONG: 1.0}, latency=2.0)
+            self.router.run(attempt)
+        stats = self.router.get_stats()
+        self.assertEqual(stats["openai/gpt-4o-mini"]["attempts"], 4)
+        self.assertEqual(stats["openai/gpt-4o-mini"]["escalated"], 2)
+        self.assertEqual(stats["openai/gpt-4o-mini"]["success_rate"], 0.5)
+        self.assertEqual(stats["openai/gpt-4o-mini"]["mean_latency"], 2.0)
+        self.assertEqual(stats["openai/gpt-4o"]["attempts"], 2)
+        self.assertEqual(stats["openai/gpt-4o"]["success_rate"], 1.0)
+
+    def test_name_identifies_the_tier_chain(self):
+        self.assertEqual(self.router.name, "gpt-4o-mini>gpt-4o")
+        with self.assertRaises(ValueError):
+            ModelRouter([])
+
+if __name__ == '__main__':
+    unittest.main()
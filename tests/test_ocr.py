@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.ocr import OCRPool, OCRResult, resolve_engine, run_ocr
+
+FAKE_ENGINE = "tests.test_ocr:fake_engine"
+
+def fake_engine(image_path: str) -> OCRResult:
+    """Test engine: the "image" is a text file whose first line is the confidence"""
+    confidence, _, text = Path(image_path).read_text().partition("\n")
+    if confidence == "fail":
+        raise RuntimeError("unreadable image")
+    return OCRResult(text, float(confidence), len(text.split()))
+
+class TestEngines(unittest.TestCase):
+    def test_resolve_engine(self):
+        self.assertIs(resolve_engine(FAKE_ENGINE), fake_engine)
+        with self.assertRaisesRegex(ValueError, "Unknown OCR engine"):
+            resolve_engine("paddle")
+        with self.assertRaisesRegex(ValueError, "Cannot load"):
+            resolve_engine("tests.test_ocr:missing_engine")
+
+    def test_run_ocr_reports_engine_errors(self):
+        temp_dir = Path(tempfile.mkdtemp())
+        try:
+            image = temp_dir / "broken.png"
+            image.write_text("fail\n")
+            result, error = run_ocr(str(image), FAKE_ENGINE)
+            self.assertIsNone(result)
+            self.assertEqual(error, "unreadable image")
+        finally:
+            shutil.rmtree(temp_dir)
+
+class TestOCRPool(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.pool = OCRPool(FAKE_ENGINE, workers=2, min_confidence=0.8)
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.temp_dir)
+
+    def image(self, name: str, content: str) -> str:
+        path = self.temp_dir / name
+        path.write_text(content)
+        return str(path)
+
+    def test_confidence_and_stats(self):
+        words = " ".join(f"word{i}" for i in range(12))
+        clear = self.image("clear.png", f"0.93\n{words}")
+        blurry = self.image("blurry.png", f"0.41\n{words}")
+        sparse = self.image("sparse.png", "0.99\nStorytime")
+        broken = self.image("broken.png", "fail\n")
+        self.pool.submit([clear, blurry, sparse, broken])
+
+        result = self.pool.get(clear)
+        self.assertEqual(result.text, words)
+        self.assertTrue(self.pool.confident(result))
+        self.assertFalse(self.pool.confident(self.pool.get(blurry)))
+        self.assertFalse(self.pool.confident(self.pool.get(sparse)))
+        self.assertIsNone(self.pool.get(broken))
+
+        stats = self.pool.get_stats()
+        self.assertEqual((stats["images"], stats["confident"], stats["errors"]), (4, 1, 1))
+
+    def test_get_submits_unsubmitted_images(self):
+        image = self.image("late.png", "0.9\nSaturday storytime")
+        self.assertEqual(self.pool.get(image).words, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import unittest
+from unittest.mock import MagicMock
+from tools.rate_limiter import RateLimiter, TokenBucket, parse_reset, parse_retry_after, backoff_delay
+
+class FakeAPIError(Exception):
+    """Mimics the status_code/response.headers shape of OpenAI and Anthropic SDK errors"""
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = MagicMock(status_code=status_code, headers=headers or {})
+
+class TestParseReset(unittest.TestCase):
+    def test_formats(self):
+        self.assertEqual(parse_reset("20"), 20.0)
+        self.assertEqual(parse_reset("6m0s"), 360.0)
+        self.assertAlmostEqual(parse_reset("1.5s"), 1.5)
+        self.assertAlmostEqual(parse_reset("20ms"), 0.02)
+        self.assertAlmostEqual(parse_reset("1970-01-01T00:00:30Z", now=10.0), 20.0)
+        self.assertIsNone(parse_reset("soon"))
+        self.assertIsNone(parse_reset(None))
+
+    def test_retry_after(self):
+        self.assertAlmostEqual(parse_retry_after({"retry-after-ms": "1500", "retry-after": "2"}), 1.5)
+        self.assertEqual(parse_retry_after({"retry-after": "2"}), 2.0)
+        self.assertAlmostEqual(parse_retry_after({"retry-after": "Thu, 01 Jan 1970 00:00:30 GMT"}, now=10.0), 20.0)
+        # Malformed values are ignored rather than raised
+        self.assertEqual(parse_retry_after({"retry-after-ms": "soon", "retry-after": "2"}), 2.0)
+        self.assertIsNone(parse_retry_after({"retry-after-ms": "inf", "retry-after": "later"}))
+        self.assertIsNone(parse_retry_after({}))
+
+    def test_backoff_is_jittered_and_capped(self):
+        for attempt in range(10):
+            delay = backoff_delay(attempt, base=1.0, cap=8.0)
+            self.assertGreaterEqual(delay, 0.0)
+            self.assertLessEqual(delay, min(8.0, 2 ** attempt))
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reservations_queue_up(self):
+        bucket = TokenBucket(60)  # one per second
+        waits = [bucket.reserve(1, now=bucket.updated) for _ in range(62)]
+        self.assertEqual(waits[:60], [0.0] * 60)
+        self.assertAlmostEqual(waits[60], 1.0)
+        self.assertAlmostEqual(waits[61], 2.0)
+
+    def test_refund(self):
+        bucket = TokenBucket(600)
+        now = bucket.updated
+        bucket.reserve(600, now)
+        bucket.refund(300, now)
+        self.assertEqual(bucket.reserve(300, now), 0.0)
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.sleeps = []
+        self.limiter = RateLimiter(max_retries=3, sleep=self.sleeps.append)
+
+    def test_requests_spread_over_the_minute(self):
+        self.limiter.configure("openai", "gpt-4o", rpm=2, tpm=1000000)
+        for _ in range(3):
+            self.limiter.acquire("openai", "gpt-4o", 10)
+        self.assertEqual(len(self.sleeps), 1)
+        self.assertAlmostEqual(self.sleeps[0], 30.0, places=1)
+        stats = self.limiter.get_stats()["openai/gpt-4o"]
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["max_queued"], 1)
+        self.assertAlmostEqual(stats["wait_time"], 30.0, places=1)
+        self.assertEqual(self.limiter.queue_depth, 0)
+
+    def test_token_bucket_limits_large_requests(self):
+        self.limiter.configure("anthropic", "claude", rpm=1000, tpm=6000)
+        self.limiter.acquire("anthropic", "claude", 6000)
+        self.limiter.acquire("anthropic", "claude", 3000)
+        self.assertAlmostEqual(self.sleeps[0], 30.0, places=1)
+
+    def test_actual_usage_corrects_estimate(self):
+        self.limiter.configure("openai", "gpt-4o", rpm=1000, tpm=6000)
+        self.limiter.acquire("openai", "gpt-4o", 6000)
+        self.limiter.record_usage("openai", "gpt-4o", 6000, 1000)
+        self.limiter.acquire("openai", "gpt-4o", 5000)
+        self.assertEqual(self.sleeps, [])
+
+    def test_retry_after_429(self):
+        request = MagicMock(side_effect=[FakeAPIError(429, {"retry-after": "2"}), "ok"])
+        self.assertEqual(self.limiter.call("openai", "gpt-4o", 100, request), "ok")
+        self.assertIn(2.0, self.sleeps)
+        stats = self.limiter.get_stats()["openai/gpt-4o"]
+        self.assertEqual(stats["throttled"], 1)
+        self.assertEqual(stats["retries"], 1)
+
+    def test_malformed_retry_after_falls_back_to_backoff(self):
+        request = MagicMock(side_effect=[FakeAPIError(429, {"retry-after-ms": "n/a", "retry-after": "soon"}), "ok"])
+        self.assertEqual(self.limiter.call("openai", "gpt-4o", 100, request), "ok")
+        self.assertEqual(request.call_count, 2)
+
+    def test_throttling_holds_back_other_callers(self):
+        delay = self.limiter.retry_delay("openai", "gpt-4o", FakeAPIError(429, {"retry-after": "5"}), attempt=0)
+        self.assertEqual(delay, 5.0)
+        self.limiter.acquire("openai", "gpt-4o", 100)
+        self.assertAlmostEqual(self.sleeps[0], 5.0, places=1)
+
+    def test_rate_limit_headers_adapt_buckets(self):
+        self.limiter.update_from_headers("openai", "gpt-4o", {
+            "x-ratelimit-limit-requests": "120",
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "3s"
+        })
+        self.assertEqual(self.limiter.get_stats()["openai/gpt-4o"]["rpm"], 120)
+        self.limiter.acquire("openai", "gpt-4o", 10)
+        self.assertAlmostEqual(self.sleeps[0], 3.0, places=1)
+
+    def test_non_retryable_error_is_raised(self):
+        request = MagicMock(side_effect=FakeAPIError(400))
+        with self.assertRaises(FakeAPIError):
+            self.limiter.call("openai", "gpt-4o", 100, request)
+        self.assertEqual(request.call_count, 1)
+
+    def test_retries_are_bounded(self):
+        request = MagicMock(side_effect=FakeAPIError(503))
+        with self.assertRaises(FakeAPIError):
+            self.limiter.call("openai", "gpt-4o", 100, request)
+        self.assertEqual(request.call_count, 4)  # first attempt plus 3 retries
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from unittest.mock import patch
+from tools.raw_store import RawResponseStore, parse_raw_file
+
+class TestRawResponseStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = RawResponseStore(self.temp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def save_response(self, image_name, activities):
+        return self.store.save(image_name, json.dumps({"activities": activities}), prompt_fingerprint="abc")
+
+    def test_replay_tags_activities_with_source_image(self):
+        self.save_response("input/a.PNG", [{"activity_name": "Storytime"}])
+        self.save_response("input/b.jpg", [{"activity_name": "Splash"}, {"activity_name": "Music"}])
+        activities = self.store.replay(workers=1)
+        self.assertEqual([(a["activity_name"], a["source_file"]) for a in activities],
+                         [("Storytime", "a.PNG"), ("Splash", "b.jpg"), ("Music", "b.jpg")])
+
+        # The manifest records file, hash, status and prompt fingerprint
+        with open(os.path.join(self.temp_dir, "manifest.json")) as f:
+            entry = json.load(f)["entries"]["a_response.json"]
+        self.assertEqual(entry["status"], "ok")
+        self.assertEqual(entry["prompt_fingerprint"], "abc")
+        self.assertTrue(entry["hash"])
+
+    def test_unchanged_responses_are_not_reparsed(self):
+        self.save_response("a.jpg", [{"activity_name": "Storytime"}])
+        self.save_response("b.jpg", [{"activity_name": "Splash"}])
+        self.store.replay(workers=1)
+        self.assertEqual(self.store.get_stats()["reparsed"], 2)
+
+        store = RawResponseStore(self.temp_dir)
+        with patch('tools.raw_store.parse_raw_file') as mock_parse:
+            activities = store.replay(workers=1)
+        mock_parse.assert_not_called()
+        self.assertEqual(len(activities), 2)
+        self.assertEqual(store.get_stats()["reused"], 2)
+
+    def test_changed_response_is_reparsed(self):
+        self.save_response("a.jpg", [{"activity_name": "Storytime"}])
+        self.store.replay(workers=1)
+
+        raw_file = os.path.join(self.temp_dir, "a_response.json")
+        with open(raw_file, "w") as f:
+            f.write(json.dumps([{"activity_name": "Story Time (updated)"}]))
+        os.utime(raw_file, ns=(0, 0))
+
+        activities = RawResponseStore(self.temp_dir).replay(workers=1)
+        self.assertEqual(activities[0]["activity_name"], "Story Time (updated)")
+
+    def test_parser_version_change_reparses_everything(self):
+        self.save_response("a.jpg", [{"activity_name": "Storytime"}])
+        self.store.replay(workers=1)
+
+        with patch('tools.raw_store.PARSER_VERSION', 999):
+            store = RawResponseStore(self.temp_dir)
+            store.replay(workers=1)
+        self.assertEqual(store.get_stats()["reparsed"], 1)
+
+    def test_unparseable_response_is_recorded(self):
+        self.store.save("bad.jpg", "Sorry, I can't read this image.")
+        self.assertEqual(self.store.replay(workers=1), [])
+        stats = self.store.get_stats()
+        self.assertEqual(stats["errors"], 1)
+        self.assertEqual(stats["ok"], 0)
+
+    def test_legacy_responses_without_manifest(self):
+        with open(os.path.join(self.temp_dir, "old_response.json"), "w") as f:
+            f.write('Here you go: [{"activity_name": "Old"}]')
+        activities = self.store.replay(workers=1)
+        self.assertEqual(activities, [{"activity_name": "Old", "source_file": "old.jpg"}])
+
+    def test_deleted_responses_are_dropped(self):
+        raw_file = self.save_response("a.jpg", [{"activity_name": "Storytime"}])
+        self.store.replay(workers=1)
+        os.remove(raw_file)
+        self.assertEqual(self.store.replay(workers=1), [])
+        self.assertEqual(self.store.get_stats()["responses"], 0)
+
+    def test_parallel_replay_matches_serial(self):
+        for i in range(8):
+            self.save_response(f"img{i}.jpg", [{"activity_name": f"Activity {i}"}])
+        with patch('tools.raw_store.PARALLEL_THRESHOLD', 4):
+            parallel = self.store.replay(workers=2)
+        serial = [activity for i in range(8)
+                  for activity in parse_raw_file(os.path.join(self.temp_dir, f"img{i}_response.json"))[0]]
+        self.assertEqual([a["activity_name"] for a in parallel], [a["activity_name"] for a in serial])
+
+if __name__ == '__main__':
+    unittest.main()
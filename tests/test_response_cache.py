@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import unittest
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+from tools.response_cache import ResponseCache, make_cache_key, cache_enabled_by_default
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.clock = FakeClock()
+        self.cache = ResponseCache(os.path.join(self.temp_dir, "responses.sqlite3"), ttl=60,
+                                   max_bytes=10_000, clock=self.clock)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_hit_and_miss(self):
+        self.assertIsNone(self.cache.get("k"))
+        self.cache.put("k", "response", provider="openai", model="gpt-4o", total_tokens=15, cost=0.002)
+        self.assertEqual(self.cache.get("k"), {"content": "response", "total_tokens": 15, "cost": 0.002})
+        stats = self.cache.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+
+    def test_entries_expire_after_ttl(self):
+        self.cache.put("k", "response")
+        self.clock.now += 59
+        self.assertIsNotNone(self.cache.get("k"))
+        self.clock.now += 2
+        self.assertIsNone(self.cache.get("k"))
+        self.assertEqual(self.cache.get_stats()["entries"], 0)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for i in range(3):
+            self.cache.put(f"k{i}", "x" * 3000)
+            self.clock.now += 1
+        # Touch k0 so k1 becomes the least recently used entry
+        self.cache.get("k0")
+        self.clock.now += 1
+        # A fourth 3KB response pushes the total over 10KB
+        self.cache.put("k3", "x" * 3000)
+        self.assertIsNone(self.cache.get("k1"))
+        self.assertIsNotNone(self.cache.get("k0"))
+        self.assertIsNotNone(self.cache.get("k3"))
+        self.assertEqual(self.cache.get_stats()["evictions"], 1)
+        self.assertLessEqual(self.cache.get_stats()["bytes"], 10_000)
+
+    def test_cache_persists_across_instances(self):
+        self.cache.put("k", "response")
+        reopened = ResponseCache(self.cache.db_file, ttl=60, clock=self.clock)
+        try:
+            self.assertEqual(reopened.get("k")["content"], "response")
+        finally:
+            reopened.close()
+
+class TestCacheKey(unittest.TestCase):
+    def test_prompt_whitespace_is_normalized(self):
+        self.assertEqual(make_cache_key("openai", "gpt-4o", "  Hello\r\nworld  \n", temperature=0.7),
+                         make_cache_key("openai", "gpt-4o", "Hello\nworld", temperature=0.7))
+
+    def test_key_covers_request_parameters(self):
+        base = make_cache_key("openai", "gpt-4o", "Hello", temperature=0.7)
+        self.assertNotEqual(base, make_cache_key("anthropic", "gpt-4o", "Hello", temperature=0.7))
+        self.assertNotEqual(base, make_cache_key("openai", "gpt-4o-mini", "Hello", temperature=0.7))
+        self.assertNotEqual(base, make_cache_key("openai", "gpt-4o", "Hello", temperature=None))
+        self.assertNotEqual(base, make_cache_key("openai", "gpt-4o", "Hello", temperature=0.7,
+                                                 response_schema={"type": "object"}))
+        self.assertNotEqual(base, make_cache_key("openai", "gpt-4o", "Hello", temperature=0.7, max_tokens=4000))
+
+    def test_key_uses_image_contents(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            a, b = os.path.join(temp_dir, "a.png"), os.path.join(temp_dir, "b.png")
+            with open(a, "wb") as f:
+                f.write(b"same")
+            with open(b, "wb") as f:
+                f.write(b"same")
+            self.assertEqual(make_cache_key("openai", "gpt-4o", "Hi", [a]), make_cache_key("openai", "gpt-4o", "Hi", [b]))
+            with open(b, "wb") as f:
+                f.write(b"different")
+            self.assertNotEqual(make_cache_key("openai", "gpt-4o", "Hi", [a]), make_cache_key("openai", "gpt-4o", "Hi", [b]))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_enabled_by_environment(self):
+        with patch.dict(os.environ, {"LLM_CACHE": "1"}):
+            self.assertTrue(cache_enabled_by_default())
+        with patch.dict(os.environ, {"LLM_CACHE": ""}):
+            self.assertFalse(cache_enabled_by_default())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+import unittest
+from tools.response_parser import load_json_response, parse_activities_response
+
+class TestResponseParser(unittest.TestCase):
+    def test_plain_json(self):
+        self.assertEqual(load_json_response('{"a": 1}'), {"a": 1})
+
+    def test_json_surrounded_by_text(self):
+        response = 'Sure! Here is the JSON:\n```json\n[{"activity_name": "Storytime"}]\n```\nLet me know {if} you need more.'
+        self.assertEqual(load_json_response(response), [{"activity_name": "Storytime"}])
+
+    def test_skips_braces_that_are_not_json(self):
+        response = 'Activities {see below}: {"activities": [{"activity_name": "Splash"}]}'
+        self.assertEqual(parse_activities_response(response), [{"activity_name": "Splash"}])
+
+    def test_truncated_json_is_an_error(self):
+        """A response cut short is not read as the nested values that did decode"""
+        response = '{"activities": [{"activity_name": "Storytime"}, {"activity_name": "Splash"}, {"activity_na'
+        with self.assertRaises(ValueError):
+            load_json_response(response)
+        with self.assertRaises(ValueError):
+            parse_activities_response('```json\n' + response)
+
+    def test_no_json(self):
+        with self.assertRaises(ValueError):
+            load_json_response("I could not find any activities in this image.")
+
+    def test_single_object_is_wrapped(self):
+        self.assertEqual(parse_activities_response('{"activity_name": "Storytime"}'), [{"activity_name": "Storytime"}])
+
+    def test_unexpected_structure(self):
+        with self.assertRaises(ValueError):
+            parse_activities_response('"just a string"')
+
+if __name__ == '__main__':
+    unittest.main()
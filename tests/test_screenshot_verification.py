@@ -4,10 +4,17 @@ import os
 import pytest
 from unittest.mock import patch, MagicMock, mock_open, AsyncMock
 from tools.screenshot_utils import take_screenshot_sync, take_screenshot
-from tools.llm_api import query_llm
+from tools.llm_api import query_llm, reset_llm_clients
 from tools.token_tracker import TokenUsage
 
 class TestScreenshotVerification:
+    @pytest.fixture(autouse=True)
+    def fresh_llm_clients(self):
+        """Shared LLM clients are cached per provider; make sure the mocked ones are used."""
+        reset_llm_clients()
+        yield
+        reset_llm_clients()
+    
     @pytest.fixture
     def mock_page(self):
         """Mock Playwright page object."""
@@ -98,7 +105,7 @@ class TestScreenshotVerification:
         mock_usage.completion_tokens_details.reasoning_tokens = None
         mock_response.usage = mock_usage
         
-        mock_openai.chat.completions.create.return_value = mock_response
+        mock_openai.chat.completions.with_raw_response.create.return_value.parse.return_value = mock_response
         
         with patch('tools.llm_api.create_llm_client', return_value=mock_openai):
             response = query_llm(
@@ -109,7 +116,7 @@ class TestScreenshotVerification:
             
             assert 'blue' in response.lower()
             assert 'agentic.ai test page' in response.lower()
-            mock_openai.chat.completions.create.assert_called_once()
+            mock_openai.chat.completions.with_raw_response.create.assert_called_once()
     
     def test_llm_verification_anthropic(self, tmp_path):
         """Test screenshot verification with Anthropic using mocks."""
@@ -133,7 +140,7 @@ class TestScreenshotVerification:
         mock_usage.output_tokens = 5
         mock_response.usage = mock_usage
         
-        mock_anthropic.messages.create.return_value = mock_response
+        mock_anthropic.messages.with_raw_response.create.return_value.parse.return_value = mock_response
         
         with patch('tools.llm_api.create_llm_client', return_value=mock_anthropic):
             response = query_llm(
@@ -144,6 +151,6 @@ class TestScreenshotVerification:
             
             assert 'blue' in response.lower()
             assert 'agentic.ai test page' in response.lower()
-            mock_anthropic.messages.create.assert_called_once()
+            mock_anthropic.messages.with_raw_response.create.assert_called_once()
 
 # Note: End-to-end tests have been moved to tools/test_e2e.py 
\ No newline at end of file
@@ -91,6 +91,10 @@ class TestTokenTracker(unittest.TestCase):
         cost = TokenTracker.calculate_openai_cost(1000000, 500000, "gpt-4o")
         self.assertEqual(cost, 10.0 + 15.0)  # $10/M input + $30/M output
         
+        # Test gpt-4o-mini model pricing
+        cost = TokenTracker.calculate_openai_cost(1000000, 500000, "gpt-4o-mini")
+        self.assertAlmostEqual(cost, 0.15 + 0.3)  # $0.15/M input + $0.60/M output
+        
         # Test unsupported model
         with self.assertRaises(ValueError):
             TokenTracker.calculate_openai_cost(1000000, 500000, "gpt-4")
@@ -191,6 +195,19 @@ class TestTokenTracker(unittest.TestCase):
         self.assertEqual(summary["provider_stats"]["openai"]["requests"], 1)
         self.assertEqual(summary["provider_stats"]["anthropic"]["requests"], 1)
 
+    def test_record_savings(self):
+        """Test that savings accumulate per category and are persisted"""
+        self.tracker.record_savings("image_preprocessing", images=1, bytes_saved=1000, tokens_saved=0)
+        self.tracker.record_savings("image_preprocessing", images=1, bytes_saved=500, tokens_saved=85)
+        
+        expected = {"images": 2, "bytes_saved": 1500, "tokens_saved": 85}
+        self.assertEqual(self.tracker.savings["image_preprocessing"], expected)
+        self.assertEqual(self.tracker.get_session_summary()["savings"]["image_preprocessing"], expected)
+        
+        # A new tracker for the same session loads the savings back
+        reloaded = TokenTracker(self.test_session_id, logs_dir=self.test_logs_dir)
+        self.assertEqual(reloaded.savings["image_preprocessing"], expected)
+
     def test_global_token_tracker(self):
         """Test global token tracker instance management"""
         # Get initial tracker with specific session ID
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import sys
+import gzip
+import json
+from pathlib import Path
+from typing import Optional, Dict, List, Set, Iterable, Iterator
+
+from tools.activity_store import ActivityStore, activity_signature
+
+DEFAULT_ARCHIVE_DIR = Path("output") / "archive"
+# Partition of archived activities whose date is not a YYYY-MM-DD date
+UNDATED_PARTITION = "undated"
+PARTITION_SUFFIX = ".jsonl.gz"
+
+_MONTH_PATTERN = re.compile(r'^(\d{4}-\d{2})-\d{2}$')
+
+def partition_of(activity: Dict) -> str:
+    """Month partition ("YYYY-MM") an archived activity belongs in"""
+    date = activity.get("date")
+    match = _MONTH_PATTERN.match(date) if isinstance(date, str) else None
+    return match.group(1) if match else UNDATED_PARTITION
+
+class ActivityArchive:
+    """Cold storage for past activities, partitioned by month.
+
+    Archived activities are moved out of the activity store into gzipped JSONL files
+    (output/archive/2025-04.jsonl.gz), so the store and every pipeline stage only see
+    current and future events. Appending adds a new gzip member to the partition
+    file, which readers see as one stream. `iter_load` reads only the partitions a
+    date range touches, and `iter_history` reads across the archive and the store.
+    """
+    def __init__(self, archive_dir: Optional[Path] = None):
+        self.archive_dir = Path(archive_dir or DEFAULT_ARCHIVE_DIR)
+
+    def partition_file(self, partition: str) -> Path:
+        return self.archive_dir / f"{partition}{PARTITION_SUFFIX}"
+
+    def partitions(self) -> List[str]:
+        """Partitions that have archived activities, oldest first (undated last)"""
+        if not self.archive_dir.exists():
+            return []
+        partitions = sorted(path.name[:-len(PARTITION_SUFFIX)] for path in self.archive_dir.iterdir()
+                            if path.name.endswith(PARTITION_SUFFIX))
+        if UNDATED_PARTITION in partitions:
+            partitions.remove(UNDATED_PARTITION)
+            partitions.append(UNDATED_PARTITION)
+        return partitions
+
+    def _read_partition(self, partition: str) -> Iterator[Dict]:
+        if not self.partition_file(partition).exists():
+            return
+        try:
+            with gzip.open(self.partition_file(partition), "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile, json.JSONDecodeError) as e:
+            # A member cut short by a crash mid-append; the activities before it are intact
+            print(f"Stopped reading damaged archive partition {self.partition_file(partition)}: {e}", file=sys.stderr)
+
+    def append(self, activities: Iterable[Dict]) -> Dict[str, int]:
+        """
+        Add activities to their month partitions, skipping ones that are already archived.
+
+        Args:
+            activities (Iterable[Dict]): Archived activities
+
+        Returns:
+            Dict[str, int]: Number of activities added to each partition
+        """
+        by_partition: Dict[str, List[Dict]] = {}
+        for activity in activities:
+            by_partition.setdefault(partition_of(activity), []).append(activity)
+
+        added = {}
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        for partition, records in sorted(by_partition.items()):
+            signatures = {activity_signature(activity) for activity in self._read_partition(partition)}
+            lines = []
+            for activity in records:
+                signature = activity_signature(activity)
+                if signature not in signatures:
+                    signatures.add(signature)
+                    lines.append(json.dumps(activity, ensure_ascii=False) + "\n")
+            if not lines:
+                continue
+            with open(self.partition_file(partition), "ab") as raw:
+                with gzip.open(raw, "wt", encoding="utf-8") as f:
+                    f.write("".join(lines))
+                raw.flush()
+                os.fsync(raw.fileno())
+            added[partition] = len(lines)
+        return added
+
+    def archived_signatures(self, activities: Iterable[Dict]) -> Set[str]:
+        """
+        Signatures of the given activities that are already archived, so scraped or
+        extracted activities that were archived are not added to the store again.
+
+        Only the partitions the activities' dates fall in are read.
+
+        Args:
+            activities (Iterable[Dict]): Candidate activities
+
+        Returns:
+            Set[str]: The activity_signature of each candidate found in the archive
+        """
+        by_partition: Dict[str, Set[str]] = {}
+        for activity in activities:
+            by_partition.setdefault(partition_of(activity), set()).add(activity_signature(activity))
+
+        archived = set()
+        for partition, signatures in sorted(by_partition.items()):
+            archived.update(signatures.intersection(activity_signature(activity)
+                                                    for activity in self._read_partition(partition)))
+        return archived
+
+    def iter_load(self, date_from: Optional[str] = None, date_to: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Stream archived activities, reading only the partitions in the date range.
+
+        Args:
+            date_from (str, optional): Only activities on or after this YYYY-MM-DD date
+            date_to (str, optional): Only activities on or before this YYYY-MM-DD date
+
+        Yields:
+            Dict: Archived activities, by month and in the order they were archived
+        """
+        for partition in self.partitions():
+            if partition == UNDATED_PARTITION:
+                if date_from is not None or date_to is not None:
+                    continue
+            elif (date_from is not None and partition < date_from[:7]) or \
+                    (date_to is not None and partition > date_to[:7]):
+                continue
+            for activity in self._read_partition(partition):
+                date = activity.get("date")
+                if date_from is not None and (not isinstance(date, str) or date < date_from):
+                    continue
+                if date_to is not None and (not isinstance(date, str) or date > date_to):
+                    continue
+                yield activity
+
+    def archive_store(self, store: ActivityStore) -> int:
+        """
+        Move the archived activities out of an activity store into their partitions.
+
+        Args:
+            store (ActivityStore): The activity store
+
+        Returns:
+            int: Number of activities moved
+        """
+        return store.move_archived(self.append)
+
+    def iter_history(self, store: ActivityStore, date_from: Optional[str] = None,
+                     date_to: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Stream past and current activities: the archived ones, then the ones in the store.
+
+        Args:
+            store (ActivityStore): The activity store holding the current activities
+            date_from (str, optional): Only activities on or after this YYYY-MM-DD date
+            date_to (str, optional): Only activities on or before this YYYY-MM-DD date
+
+        Yields:
+            Dict: The activities
+        """
+        yield from self.iter_load(date_from, date_to)
+        yield from store.iter_load(date_from=date_from, date_to=date_to)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+import os
+import json
+from typing import Optional, Dict, Iterable, Iterator
+
+CHUNK_SIZE = 64 * 1024
+_WHITESPACE = " \t\n\r"
+
+def iter_activities(json_file: str, archived: Optional[bool] = None, date_from: Optional[str] = None,
+                    date_to: Optional[str] = None, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict]:
+    """
+    Stream the activities in an activities.json file one record at a time.
+
+    The file is read in chunks and each record is decoded on its own, so memory use is
+    bounded by the largest record rather than the file size. Records that do not pass
+    the filters are dropped as soon as they are decoded.
+
+    Args:
+        json_file (str): Path to a JSON file holding an array of activities
+        archived (bool, optional): Only archived (True) or only current (False) activities
+        date_from (str, optional): Only activities on or after this YYYY-MM-DD date
+        date_to (str, optional): Only activities on or before this YYYY-MM-DD date
+        chunk_size (int): Characters read at a time
+
+    Yields:
+        Dict: The activities, in file order
+
+    Raises:
+        json.JSONDecodeError: If the file is not a JSON array of records
+    """
+    decoder = json.JSONDecoder()
+    with open(json_file, "r", encoding="utf-8") as f:
+        buffer, position, eof = "", 0, False
+
+        def skip_whitespace():
+            nonlocal buffer, position, eof
+            while True:
+                while position < len(buffer) and buffer[position] in _WHITESPACE:
+                    position += 1
+                if position < len(buffer) or eof:
+                    return
+                buffer, position = f.read(chunk_size), 0
+                eof = not buffer
+
+        skip_whitespace()
+        if buffer[position:position + 1] != "[":
+            raise json.JSONDecodeError("Expecting '['", buffer, position)
+        position += 1
+        while True:
+            skip_whitespace()
+            if position == len(buffer):
+                raise json.JSONDecodeError("Unterminated array", buffer, position)
+            if buffer[position] == "]":
+                return
+            if buffer[position] == ",":
+                position += 1
+                continue
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # The record continues in the next chunk
+                chunk = f.read(max(chunk_size, len(buffer) - position))
+                buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+                continue
+            if position > chunk_size:
+                buffer, position = buffer[position:], 0
+            if _matches(record, archived, date_from, date_to):
+                yield record
+
+def _matches(record, archived: Optional[bool], date_from: Optional[str], date_to: Optional[str]) -> bool:
+    if not isinstance(record, dict):
+        return archived is None and date_from is None and date_to is None
+    if archived is not None and bool(record.get("is_archived")) != archived:
+        return False
+    date = record.get("date")
+    if date_from is not None and (not isinstance(date, str) or date < date_from):
+        return False
+    if date_to is not None and (not isinstance(date, str) or date > date_to):
+        return False
+    return True
+
+def write_activities(json_file: str, activities: Iterable[Dict]) -> int:
+    """
+    Write activities to a JSON file one record at a time (atomically).
+
+    The output is identical to json.dump(list(activities), f, indent=2) without ever
+    holding the whole list.
+
+    Args:
+        json_file (str): Path of the JSON file to write
+        activities (Iterable[Dict]): The activities, e.g. a generator
+
+    Returns:
+        int: Number of activities written
+    """
+    count = 0
+    tmp_file = f"{json_file}.{os.getpid()}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        for activity in activities:
+            f.write(",\n  " if count else "[\n  ")
+            f.write(json.dumps(activity, indent=2).replace("\n", "\n  "))
+            count += 1
+        f.write("\n]" if count else "[]")
+    os.replace(tmp_file, json_file)
+    return count
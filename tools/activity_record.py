@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+import re
+import sys
+from datetime import date as Date
+from typing import Optional, Dict, List, Tuple, Iterable
+
+# Fields kept in slots; any other keys of an activity dict are kept in `extra`
+FIELDS = ("activity_name", "location", "date", "time", "description", "additional_details", "raw_datetime",
+          "source_file", "source_url", "source_type", "source_name", "source_tile", "is_archived",
+          "location_uncertain")
+
+# Short strings that repeat across many activities and are stored once
+_INTERNED = frozenset(("source_file", "source_type", "source_name", "source_tile"))
+
+_TIME_RANGE = re.compile(r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\s*(?:-|–|—|to)\s*(\d{1,2})(?::(\d{2}))?\s*(am|pm)?',
+                         re.IGNORECASE)
+_SINGLE_TIME = re.compile(r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)|(\d{1,2}):(\d{2})', re.IGNORECASE)
+
+# Location strings by id, and ids by location string. Ids are only stable within one process.
+_locations: List[str] = []
+_location_ids: Dict[str, int] = {}
+
+# Key orders of the activity dicts seen so far, shared by every activity with the same keys
+_shapes: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+def location_id(location: Optional[str]) -> Optional[int]:
+    """Id of a location string, registering it the first time it is seen"""
+    if not isinstance(location, str):
+        return None
+    location_id = _location_ids.get(location)
+    if location_id is None:
+        location_id = _location_ids[location] = len(_locations)
+        _locations.append(sys.intern(location))
+    return location_id
+
+def location_name(location_id: int) -> str:
+    """Location string registered under an id"""
+    return _locations[location_id]
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _minutes(hour: int, minute: int, meridiem: Optional[str]) -> int:
+    meridiem = meridiem.lower() if meridiem else None
+    if meridiem == "pm" and hour < 12:
+        hour += 12
+    elif meridiem == "am" and hour == 12:
+        hour = 0
+    return hour * 60 + minute
+
+def parse_minutes(time_str: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Parse a time or time range into minutes after midnight.
+
+    A start time without AM/PM takes the end time's ("3 - 5 PM" starts at 3 PM).
+
+    Args:
+        time_str (str): Time string, e.g. "10:00 AM - 11:30 AM" or "3 PM"
+
+    Returns:
+        Tuple[Optional[int], Optional[int]]: Start and end minutes (end is None for a single
+            time, both are None if no time was found)
+    """
+    if not isinstance(time_str, str):
+        return None, None
+    match = _TIME_RANGE.search(time_str)
+    if match and (match.group(2) or match.group(3) or match.group(5) or match.group(6)):
+        start_hour, start_minute, start_meridiem, end_hour, end_minute, end_meridiem = match.groups()
+        if int(start_hour) <= 23 and int(end_hour) <= 23:
+            end = _minutes(int(end_hour), int(end_minute or 0), end_meridiem)
+            start = _minutes(int(start_hour), int(start_minute or 0), start_meridiem or end_meridiem)
+            if start > end and not start_meridiem and end_meridiem:
+                start -= 12 * 60
+            return start, end
+    match = _SINGLE_TIME.search(time_str)
+    if match:
+        hour, minute, meridiem, hour_24, minute_24 = match.groups()
+        if hour is not None and int(hour) <= 12:
+            return _minutes(int(hour), int(minute or 0), meridiem), None
+        if hour_24 is not None and int(hour_24) <= 23 and int(minute_24) < 60:
+            return _minutes(int(hour_24), int(minute_24), None), None
+    return None, None
+
+def parse_ordinal(date_str: Optional[str]) -> Optional[int]:
+    """Proleptic Gregorian ordinal of a YYYY-MM-DD date, or None if it is not one"""
+    if not isinstance(date_str, str):
+        return None
+    try:
+        return Date.fromisoformat(date_str).toordinal()
+    except ValueError:
+        return None
+
+class Activity:
+    """One activity with typed, pre-parsed fields.
+
+    Activities are converted from and to dicts only where they are read or written
+    (the activity store, extraction results, web scraping and JSON files). Slots replace
+    the per-record dict, repeated strings (locations, dates, times, sources) are
+    interned, and the date, time and location are parsed once when they are set:
+    `date_ordinal`, `start_minutes`/`end_minutes` and `location_id` follow `date`,
+    `time` and `location`. `to_dict` writes the keys back in their original order, so
+    an unchanged activity round-trips to an identical dict.
+    """
+    __slots__ = ("activity_name", "_location", "_date", "_time", "description", "additional_details",
+                 "raw_datetime", "source_file", "source_url", "source_type", "source_name", "source_tile",
+                 "is_archived", "location_uncertain", "location_id", "date_ordinal", "start_minutes",
+                 "end_minutes", "extra", "_keys")
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, None)
+        for name, value in fields.items():
+            if name in FIELDS:
+                setattr(self, name, _intern(value) if name in _INTERNED else value)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[name] = value
+        keys = tuple(fields)
+        self._keys = _shapes.setdefault(keys, keys)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Activity":
+        return cls(**data)
+
+    @property
+    def location(self) -> Optional[str]:
+        return self._location
+
+    @location.setter
+    def location(self, value: Optional[str]):
+        self.location_id = location_id(value)
+        self._location = value if self.location_id is None else _locations[self.location_id]
+
+    @property
+    def date(self) -> Optional[str]:
+        return self._date
+
+    @date.setter
+    def date(self, value: Optional[str]):
+        self._date = _intern(value)
+        self.date_ordinal = parse_ordinal(value)
+
+    @property
+    def time(self) -> Optional[str]:
+        return self._time
+
+    @time.setter
+    def time(self, value: Optional[str]):
+        self._time = _intern(value)
+        self.start_minutes, self.end_minutes = parse_minutes(value)
+
+    @property
+    def day(self) -> Optional[Date]:
+        """The date as a date object (None if it is not a YYYY-MM-DD date)"""
+        return Date.fromordinal(self.date_ordinal) if self.date_ordinal is not None else None
+
+    @property
+    def signature(self) -> str:
+        """Name, date and location key used to skip activities that are already stored"""
+        return f"{self.activity_name}_{self.date}_{self.location}"
+
+    def to_dict(self) -> Dict:
+        """The activity as a dict in the activities.json format"""
+        data = {}
+        for name in self._keys:
+            if name in FIELDS:
+                data[name] = getattr(self, name)
+            elif self.extra is not None and name in self.extra:
+                data[name] = self.extra[name]
+        # Fields set since the activity was read are added after the original keys
+        for name in FIELDS:
+            if name not in data and getattr(self, name) is not None:
+                data[name] = getattr(self, name)
+        if self.extra is not None:
+            for name, value in self.extra.items():
+                data.setdefault(name, value)
+        return data
+
+    def __repr__(self) -> str:
+        return f"Activity({self.activity_name!r}, date={self.date!r}, location={self.location!r})"
+
+def activities_from_dicts(records: Iterable[Dict]) -> List[Activity]:
+    """Convert activity dicts to Activity records, skipping anything that is not a dict"""
+    activities = []
+    for record in records:
+        if not isinstance(record, dict):
+            print(f"Warning: Skipping invalid activity (not a dictionary): {record}")
+            continue
+        activities.append(Activity.from_dict(record))
+    return activities
+
+def activities_to_dicts(activities: Iterable[Activity]) -> List[Dict]:
+    """Convert Activity records to dicts for writing"""
+    return [activity.to_dict() for activity in activities]
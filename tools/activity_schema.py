@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+from typing import Callable, Dict, List
+
+_NULLABLE_STRING = {"type": ["string", "null"]}
+
+# One extracted activity. Every field is listed as required (with null allowed) because
+# OpenAI's strict structured outputs demand it.
+ACTIVITY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "activity_name": _NULLABLE_STRING,
+        "location": _NULLABLE_STRING,
+        "date": _NULLABLE_STRING,
+        "time": _NULLABLE_STRING,
+        "description": _NULLABLE_STRING,
+        "additional_details": _NULLABLE_STRING,
+        "raw_datetime": _NULLABLE_STRING,
+    },
+    "required": ["activity_name", "location", "date", "time", "description", "additional_details", "raw_datetime"],
+    "additionalProperties": False,
+}
+
+# Response for a single image
+ACTIVITY_RESPONSE_SCHEMA = {
+    "title": "activities",
+    "type": "object",
+    "properties": {
+        "activities": {"type": "array", "items": ACTIVITY_SCHEMA},
+    },
+    "required": ["activities"],
+    "additionalProperties": False,
+}
+
+# Response for several images packed into one request
+BATCH_RESPONSE_SCHEMA = {
+    "title": "activity_batch",
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "image_index": {"type": "integer"},
+                    "activities": {"type": "array", "items": ACTIVITY_SCHEMA},
+                },
+                "required": ["image_index", "activities"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["results"],
+    "additionalProperties": False,
+}
+
+_TYPE_CHECKS = {
+    "object": lambda value: isinstance(value, dict),
+    "array": lambda value: isinstance(value, list),
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "null": lambda value: value is None,
+}
+
+def compile_validator(schema: Dict, check_required: bool = True) -> Callable[[object], List[str]]:
+    """
+    Compile a JSON schema (the subset used in this module) into a validation function.
+
+    The schema is walked once up front, so validating a response is a chain of plain
+    isinstance checks with no per-call schema interpretation.
+
+    Args:
+        schema (Dict): Schema using type, properties, required and items
+        check_required (bool): Report missing required properties. Responses from
+            providers without structured output may leave out fields, which is tolerated
+            when this is False.
+
+    Returns:
+        Callable[[object], List[str]]: Function returning a list of errors (empty if valid)
+    """
+    types = schema.get("type")
+    types = [types] if isinstance(types, str) else list(types or [])
+    type_checks = [_TYPE_CHECKS[name] for name in types]
+
+    property_validators = {
+        name: compile_validator(subschema, check_required)
+        for name, subschema in schema.get("properties", {}).items()
+    }
+    required = schema.get("required", []) if check_required else []
+    item_validator = compile_validator(schema["items"], check_required) if "items" in schema else None
+
+    def validate(value, path: str = "$") -> List[str]:
+        if type_checks and not any(check(value) for check in type_checks):
+            return [f"{path}: expected {' or '.join(types)}, got {type(value).__name__}"]
+
+        errors = []
+        if isinstance(value, dict):
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}: missing required property '{name}'")
+            for name, validator in property_validators.items():
+                if name in value:
+                    errors.extend(validator(value[name], f"{path}.{name}"))
+        elif isinstance(value, list) and item_validator is not None:
+            for i, item in enumerate(value):
+                errors.extend(item_validator(item, f"{path}[{i}]"))
+        return errors
+
+    return validate
+
+# Extracted activities are checked field by field, but fields may be missing
+validate_activities = compile_validator({"type": "array", "items": ACTIVITY_SCHEMA}, check_required=False)
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Dict, List, Iterable, Iterator, Tuple, Callable
+
+from tools.activity_json import iter_activities, write_activities
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within one process
+    fcntl = None
+
+DEFAULT_DB_FILE = Path("output") / "activities.db"
+# The change log is folded into the database once it grows past this size
+DEFAULT_COMPACT_BYTES = 1024 * 1024
+# Activities inserted per statement when importing activities.json
+IMPORT_BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS activities (
+    id INTEGER PRIMARY KEY,
+    signature TEXT NOT NULL,
+    date TEXT,
+    is_archived INTEGER NOT NULL DEFAULT 0,
+    source TEXT,
+    location TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_activities_date ON activities (date);
+CREATE INDEX IF NOT EXISTS idx_activities_archived ON activities (is_archived, date);
+CREATE INDEX IF NOT EXISTS idx_activities_source ON activities (source);
+CREATE INDEX IF NOT EXISTS idx_activities_location ON activities (location);
+CREATE INDEX IF NOT EXISTS idx_activities_signature ON activities (signature);
+"""
+
+UPSERT = """
+INSERT INTO activities (id, signature, date, is_archived, source, location, data)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    signature = excluded.signature, date = excluded.date, is_archived = excluded.is_archived,
+    source = excluded.source, location = excluded.location, data = excluded.data
+"""
+
+def activity_signature(activity: Dict) -> str:
+    """Name, date and location key used to skip activities that are already stored"""
+    return f"{activity.get('activity_name')}_{activity.get('date')}_{activity.get('location')}"
+
+def activity_source(activity: Dict) -> Optional[str]:
+    """Screenshot file or web source an activity came from"""
+    return activity.get("source_file") or activity.get("source_name") or activity.get("source")
+
+def _text(value) -> Optional[str]:
+    return value if value is None or isinstance(value, str) else str(value)
+
+def _encode(activity: Dict) -> str:
+    return json.dumps(activity, ensure_ascii=False)
+
+def _matches(activity: Dict, archived: Optional[bool], source: Optional[str], date_from: Optional[str],
+             date_to: Optional[str], location: Optional[str]) -> bool:
+    """Apply the `load` filters to an activity from the change log (mirrors the SQL query)"""
+    date = _text(activity.get("date"))
+    if archived is not None and bool(activity.get("is_archived")) != archived:
+        return False
+    if source is not None and _text(activity_source(activity)) != source:
+        return False
+    if date_from is not None and (date is None or date < date_from):
+        return False
+    if date_to is not None and (date is None or date > date_to):
+        return False
+    if location is not None and _text(activity.get("location")) != location:
+        return False
+    return True
+
+class ActivityStore:
+    """SQLite database of all activities with an append-only change log in front of it.
+
+    Writers never rewrite stored records: `sync` and `add` append add, update, archive
+    and delete events for the records that changed to a JSONL log (activities.log.jsonl
+    next to the database) while holding an exclusive file lock, so concurrent runs of
+    the extractor and the do512 scraper cannot clobber each other. Readers take a shared
+    lock and materialize the database plus the log tail. Once the log passes
+    `compact_bytes` a background thread folds it into the database and truncates it.
+
+    Each activity has a stable id, and `load` returns activities in id order, so the
+    list it returns can be modified in place, appended to and handed back to `sync`.
+    The date, archive flag, source and location are kept in indexed columns for
+    queries; the full record is stored as JSON. activities.json is still produced for
+    the map and other readers by `export_json`.
+    """
+    def __init__(self, db_file: Optional[Path] = None, log_file: Optional[Path] = None,
+                 compact_bytes: int = DEFAULT_COMPACT_BYTES):
+        self.db_file = Path(db_file or DEFAULT_DB_FILE)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self.log_file = Path(log_file or self.db_file.with_suffix(".log.jsonl"))
+        self.lock_file = self.log_file.with_name(self.log_file.name + ".lock")
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        # Ids and encoded records as last loaded or synced, to tell which records changed
+        self._loaded_ids: List[int] = []
+        self._loaded: Dict[int, str] = {}
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _locked(self, shared: bool = False):
+        """Hold the in-process lock and a shared (readers) or exclusive (writers) file lock"""
+        with self._lock, open(self.lock_file, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def __len__(self) -> int:
+        with self._locked(shared=True):
+            count = self._conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0]
+            for activity_id, activity in self._tail().items():
+                stored = self._conn.execute("SELECT 1 FROM activities WHERE id = ?", (activity_id,)).fetchone()
+                count += (activity is not None) - (stored is not None)
+        return count
+
+    def _row(self, position: int, activity: Dict) -> tuple:
+        return (position, activity_signature(activity), _text(activity.get("date")),
+                int(bool(activity.get("is_archived"))), _text(activity_source(activity)),
+                _text(activity.get("location")), _encode(activity))
+
+    def _read_log(self) -> List[Dict]:
+        """Read the change log events in order, ignoring a torn final line"""
+        if not self.log_file.exists():
+            return []
+        events = []
+        with open(self.log_file, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"Skipping incomplete change log entry at {self.log_file}:{line_number}", file=sys.stderr)
+        return events
+
+    def _stored(self, activity_id: int, conn: Optional[sqlite3.Connection] = None) -> Optional[Dict]:
+        row = (conn or self._conn).execute("SELECT data FROM activities WHERE id = ?", (activity_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _tail(self, events: Optional[List[Dict]] = None,
+              conn: Optional[sqlite3.Connection] = None) -> Dict[int, Optional[Dict]]:
+        """Fold the change log into the current state of the records it touches (None when deleted)"""
+        tail: Dict[int, Optional[Dict]] = {}
+        for event in self._read_log() if events is None else events:
+            activity_id = event["id"]
+            if event["op"] in ("add", "update"):
+                tail[activity_id] = event["activity"]
+            elif event["op"] == "archive":
+                activity = tail[activity_id] if activity_id in tail else self._stored(activity_id, conn)
+                if activity is not None:
+                    tail[activity_id] = {**activity, "is_archived": True}
+            elif event["op"] == "delete":
+                tail[activity_id] = None
+        return tail
+
+    def _append(self, events: List[Dict]):
+        """Durably append events to the change log (the caller holds the exclusive lock)"""
+        if not events:
+            return
+        lines = "".join(json.dumps(event, ensure_ascii=False) + "\n" for event in events)
+        with open(self.log_file, "ab+") as f:
+            # Start after a line torn by a crashed writer instead of continuing it
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    lines = "\n" + lines
+            f.write(lines.encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _iter_records(self, archived: Optional[bool] = None, source: Optional[str] = None,
+                      date_from: Optional[str] = None, date_to: Optional[str] = None,
+                      location: Optional[str] = None) -> Iterator[Tuple[int, Dict]]:
+        """Stream (id, activity) pairs in id order from the database merged with the log tail"""
+        conditions, params = [], []
+        if archived is not None:
+            conditions.append("is_archived = ?")
+            params.append(int(archived))
+        if source is not None:
+            conditions.append("source = ?")
+            params.append(source)
+        if date_from is not None:
+            conditions.append("date >= ?")
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append("date <= ?")
+            params.append(date_to)
+        if location is not None:
+            conditions.append("location = ?")
+            params.append(location)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        # A connection of its own and only the shared file lock, so rows are streamed
+        # without holding up readers; writers wait until the iteration finishes
+        conn = sqlite3.connect(str(self.db_file))
+        try:
+            with open(self.lock_file, "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_SH)
+                tail = self._tail(conn=conn)
+                logged = sorted((activity_id, activity) for activity_id, activity in tail.items()
+                                if activity is not None
+                                and _matches(activity, archived, source, date_from, date_to, location))
+                next_logged = 0
+                for activity_id, data in conn.execute(f"SELECT id, data FROM activities{where} ORDER BY id", params):
+                    while next_logged < len(logged) and logged[next_logged][0] < activity_id:
+                        yield logged[next_logged]
+                        next_logged += 1
+                    if activity_id not in tail:
+                        yield activity_id, json.loads(data)
+                yield from logged[next_logged:]
+        finally:
+            conn.close()
+
+    def import_json(self, json_file: str) -> int:
+        """
+        Fill an empty store from an existing activities.json (a one-time migration).
+
+        The file is streamed straight into the database in batches, without going
+        through the change log or holding the whole file in memory.
+
+        Args:
+            json_file (str): Path to the JSON file
+
+        Returns:
+            int: Number of activities imported (0 if the store already has activities)
+        """
+        if len(self) or not os.path.exists(json_file):
+            return 0
+        count = 0
+        try:
+            with self._locked(), self._conn:
+                if self._conn.execute("SELECT COUNT(*) FROM activities").fetchone()[0] or self._read_log():
+                    return 0
+                batch = []
+                for activity in iter_activities(json_file):
+                    batch.append(self._row(count, activity))
+                    count += 1
+                    if len(batch) == IMPORT_BATCH_SIZE:
+                        self._conn.executemany(UPSERT, batch)
+                        batch = []
+                self._conn.executemany(UPSERT, batch)
+        except json.JSONDecodeError as e:
+            print(f"Error loading activities from {json_file}: {e}", file=sys.stderr)
+            return 0
+        print(f"Imported {count} activities from {json_file} into {self.db_file}")
+        return count
+
+    def iter_load(self, archived: Optional[bool] = None, source: Optional[str] = None,
+                  date_from: Optional[str] = None, date_to: Optional[str] = None,
+                  location: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Stream activities in list order, optionally filtered on the indexed columns.
+
+        Filtered-out activities are skipped by the database query and never decoded.
+        Writers to the store wait until the iteration finishes, so don't write to the
+        store while iterating.
+
+        Args:
+            archived (bool, optional): Only archived (True) or only current (False) activities
+            source (str, optional): Only activities from this screenshot file or web source
+            date_from (str, optional): Only activities on or after this YYYY-MM-DD date
+            date_to (str, optional): Only activities on or before this YYYY-MM-DD date
+            location (str, optional): Only activities at exactly this location
+
+        Yields:
+            Dict: The activities
+        """
+        for _, activity in self._iter_records(archived, source, date_from, date_to, location):
+            yield activity
+
+    def load(self, archived: Optional[bool] = None, source: Optional[str] = None,
+             date_from: Optional[str] = None, date_to: Optional[str] = None,
+             location: Optional[str] = None) -> List[Dict]:
+        """
+        Load activities in list order, optionally filtered on the indexed columns.
+
+        An unfiltered load is remembered as the list a later `sync` is compared against.
+
+        Args:
+            archived (bool, optional): Only archived (True) or only current (False) activities
+            source (str, optional): Only activities from this screenshot file or web source
+            date_from (str, optional): Only activities on or after this YYYY-MM-DD date
+            date_to (str, optional): Only activities on or before this YYYY-MM-DD date
+            location (str, optional): Only activities at exactly this location
+
+        Returns:
+            List[Dict]: The activities
+        """
+        records = dict(self._iter_records(archived, source, date_from, date_to, location))
+        if archived is None and source is None and date_from is None and date_to is None and location is None:
+            self._loaded_ids = list(records)
+            self._loaded = {activity_id: _encode(activity) for activity_id, activity in records.items()}
+        return list(records.values())
+
+    def sync(self, activities: List[Dict]) -> Dict[str, int]:
+        """
+        Record the changes made to the list returned by `load`, logging only what changed.
+
+        Activities at the positions `load` returned are compared with what was loaded;
+        activities appended after them are added with new ids. Records added by other
+        writers since the load are left alone.
+
+        Args:
+            activities (List[Dict]): All activities, in the order `load` returned them
+                with any new activities appended
+
+        Returns:
+            Dict[str, int]: Numbers of activities inserted, updated and deleted
+        """
+        encoded = [_encode(activity) for activity in activities]
+        events = []
+        for activity_id, activity, data in zip(self._loaded_ids, activities, encoded):
+            if self._loaded[activity_id] == data:
+                continue
+            loaded = json.loads(self._loaded[activity_id])
+            if activity.get("is_archived") is True and not loaded.get("is_archived") \
+                    and {**loaded, "is_archived": True} == activity:
+                events.append({"op": "archive", "id": activity_id})
+            else:
+                events.append({"op": "update", "id": activity_id, "activity": activity})
+        updated = len(events)
+        deleted = self._loaded_ids[len(activities):]
+        events.extend({"op": "delete", "id": activity_id} for activity_id in deleted)
+        new = activities[len(self._loaded_ids):]
+
+        with self._locked():
+            stored_max = self._conn.execute("SELECT COALESCE(MAX(id), -1) FROM activities").fetchone()[0]
+            next_id = max([stored_max, *self._tail()]) + 1
+            new_ids = list(range(next_id, next_id + len(new)))
+            events.extend({"op": "add", "id": activity_id, "activity": activity}
+                          for activity_id, activity in zip(new_ids, new))
+            self._append(events)
+
+        self._loaded_ids = self._loaded_ids[:len(activities)] + new_ids
+        self._loaded = {activity_id: data for activity_id, data in zip(self._loaded_ids, encoded)}
+        self._maybe_compact()
+        return {"inserted": len(new), "updated": updated, "deleted": len(deleted)}
+
+    def add(self, activities: Iterable[Dict], skip: Iterable[str] = ()) -> List[Dict]:
+        """
+        Append activities whose name, date and location are not stored yet.
+
+        Args:
+            activities (Iterable[Dict]): Candidate activities
+            skip (Iterable[str]): Signatures to treat as stored too, such as those of
+                activities moved to the cold archive (ActivityArchive.archived_signatures)
+
+        Returns:
+            List[Dict]: The activities that were added
+        """
+        added = []
+        with self._locked():
+            tail = self._tail()
+            signatures = {activity_signature(activity) for activity in tail.values() if activity is not None}
+            signatures.update(skip)
+            stored_max = self._conn.execute("SELECT COALESCE(MAX(id), -1) FROM activities").fetchone()[0]
+            next_id = max([stored_max, *tail]) + 1
+            events = []
+            for activity in activities:
+                signature = activity_signature(activity)
+                stored = self._conn.execute("SELECT id FROM activities WHERE signature = ?", (signature,)).fetchall()
+                if signature in signatures or any(activity_id not in tail for activity_id, in stored):
+                    continue
+                events.append({"op": "add", "id": next_id, "activity": activity})
+                signatures.add(signature)
+                next_id += 1
+                added.append(activity)
+            self._append(events)
+        self._maybe_compact()
+        return added
+
+    def move_archived(self, destination: Callable[[List[Dict]], object]) -> int:
+        """
+        Hand the archived activities to `destination` and delete them from the store.
+
+        Both happen under the writer lock, and the activities are only deleted once
+        `destination` (e.g. ActivityArchive.append) has returned.
+
+        Args:
+            destination (Callable): Called with the archived activities, in id order
+
+        Returns:
+            int: Number of activities moved
+        """
+        with self._locked():
+            tail = self._tail()
+            archived = {activity_id: json.loads(data) for activity_id, data in self._conn.execute(
+                "SELECT id, data FROM activities WHERE is_archived = 1 ORDER BY id") if activity_id not in tail}
+            archived.update((activity_id, activity) for activity_id, activity in tail.items()
+                            if activity is not None and activity.get("is_archived"))
+            if not archived:
+                return 0
+            ids = sorted(archived)
+            destination([archived[activity_id] for activity_id in ids])
+            self._append([{"op": "delete", "id": activity_id} for activity_id in ids])
+        self._maybe_compact()
+        return len(ids)
+
+    def compact(self) -> int:
+        """
+        Fold the change log into the database and truncate it.
+
+        Returns:
+            int: Number of events folded
+        """
+        with self._locked():
+            events = self._read_log()
+            if not events:
+                return 0
+            tail = self._tail(events)
+            with self._conn:
+                self._conn.executemany(UPSERT, [self._row(activity_id, activity)
+                                                for activity_id, activity in tail.items() if activity is not None])
+                self._conn.executemany("DELETE FROM activities WHERE id = ?",
+                                       [(activity_id,) for activity_id, activity in tail.items() if activity is None])
+            # Folding is idempotent, so a crash before the truncate only means the log is folded again
+            with open(self.log_file, "w"):
+                pass
+        return len(events)
+
+    def _maybe_compact(self):
+        """Start a background compaction once the change log passes the size threshold"""
+        try:
+            size = self.log_file.stat().st_size
+        except FileNotFoundError:
+            return
+        if size < self.compact_bytes or (self._compactor is not None and self._compactor.is_alive()):
+            return
+        self._compactor = threading.Thread(target=self.compact, name="activity-log-compactor")
+        self._compactor.start()
+
+    def export_json(self, json_file: str) -> int:
+        """Stream every activity to a JSON file in the activities.json format (atomically)"""
+        return write_activities(json_file, self.iter_load())
+
+    def close(self):
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+from pathlib import Path
+from typing import Optional, Dict, List, Iterable, Tuple
+
+from .token_tracker import TokenUsage, APIResponse, get_token_tracker
+
+DEFAULT_JOBS_FILE = Path("output") / "batch_jobs.json"
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+# OpenAI accepts up to 50,000 requests and 200MB per batch input file
+MAX_BATCH_REQUESTS = 50_000
+MAX_BATCH_FILE_BYTES = 190 * 1024 * 1024
+BATCH_DISCOUNT = 0.5  # Batch requests cost half the synchronous price
+# Batch states after which the provider does no more work on a job
+TERMINAL_STATES = ("completed", "failed", "expired", "cancelled")
+
+class BatchJobStore:
+    """Local record of submitted batch jobs.
+
+    Each job records the provider batch id, its input file, the custom ids of the
+    requests it holds, the fingerprint of the prompt they were built with, its last known
+    state and whether its results have been collected. The file is rewritten atomically
+    so an interrupted submit or collect never leaves it half written.
+    """
+    def __init__(self, jobs_file: Optional[Path] = None):
+        self.jobs_file = Path(jobs_file or DEFAULT_JOBS_FILE)
+        self.jobs: List[Dict] = []
+        if self.jobs_file.exists():
+            try:
+                with open(self.jobs_file, "r") as f:
+                    self.jobs = json.load(f).get("jobs", [])
+            except Exception as e:
+                print(f"Error loading batch jobs from {self.jobs_file}: {e}", file=sys.stderr)
+
+    def add(self, job: Dict):
+        self.jobs.append(job)
+        self.save()
+
+    def pending(self) -> List[Dict]:
+        """Jobs whose results have not been collected yet"""
+        return [job for job in self.jobs if not job.get("collected")]
+
+    def save(self):
+        self.jobs_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.jobs_file.with_suffix(".tmp")
+        with open(tmp_file, "w") as f:
+            json.dump({"jobs": self.jobs}, f, indent=2)
+        os.replace(tmp_file, self.jobs_file)
+
+def write_batch_files(requests: Iterable[Tuple[str, Dict]], batch_dir: Path, prefix: str,
+                      endpoint: str = BATCH_ENDPOINT, max_requests: int = MAX_BATCH_REQUESTS,
+                      max_bytes: int = MAX_BATCH_FILE_BYTES) -> List[Tuple[Path, List[str]]]:
+    """
+    Write requests to JSONL batch input files, starting a new file when one would exceed
+    the provider's request or size limit.
+
+    Args:
+        requests (Iterable[Tuple[str, Dict]]): (custom_id, request body) pairs; consumed lazily
+            so the bodies (with their encoded images) are not all held in memory
+        batch_dir (Path): Directory the files are written to
+        prefix (str): File name prefix
+        endpoint (str): API endpoint every request is sent to
+        max_requests (int): Maximum requests per file
+        max_bytes (int): Maximum bytes per file
+
+    Returns:
+        List[Tuple[Path, List[str]]]: Each file and the custom ids it holds
+    """
+    batch_dir = Path(batch_dir)
+    batch_dir.mkdir(parents=True, exist_ok=True)
+    files: List[Tuple[Path, List[str]]] = []
+    f = None
+    size = 0
+    try:
+        for custom_id, body in requests:
+            line = (json.dumps({"custom_id": custom_id, "method": "POST", "url": endpoint, "body": body}) + "\n").encode("utf-8")
+            if f is None or len(files[-1][1]) >= max_requests or (size and size + len(line) > max_bytes):
+                if f is not None:
+                    f.close()
+                path = batch_dir / f"{prefix}_{len(files) + 1}.jsonl"
+                f = open(path, "wb")
+                files.append((path, []))
+                size = 0
+            f.write(line)
+            size += len(line)
+            files[-1][1].append(custom_id)
+    finally:
+        if f is not None:
+            f.close()
+    return files
+
+def submit_batch(client, requests: Iterable[Tuple[str, Dict]], store: BatchJobStore, provider: str, model: str,
+                 batch_dir: Optional[Path] = None, metadata: Optional[Dict] = None,
+                 endpoint: str = BATCH_ENDPOINT) -> List[Dict]:
+    """
+    Upload requests to the provider's batch API and record the jobs locally.
+
+    Args:
+        client: OpenAI-style client (files and batches APIs)
+        requests (Iterable[Tuple[str, Dict]]): (custom_id, request body) pairs
+        store (BatchJobStore): Where the submitted jobs are recorded
+        provider (str): The API provider
+        model (str): The model the requests use
+        batch_dir (Path, optional): Directory the batch input files are written to
+            (defaults to batches/ next to the job store)
+        metadata (Dict, optional): Extra fields kept with each job (e.g. a prompt fingerprint)
+        endpoint (str): API endpoint every request is sent to
+
+    Returns:
+        List[Dict]: The submitted jobs (one per batch input file)
+    """
+    batch_dir = Path(batch_dir) if batch_dir else store.jobs_file.parent / "batches"
+    prefix = time.strftime("batch_%Y%m%d_%H%M%S")
+    jobs = []
+    for path, custom_ids in write_batch_files(requests, batch_dir, prefix, endpoint):
+        with open(path, "rb") as f:
+            input_file = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(input_file_id=input_file.id, endpoint=endpoint,
+                                      completion_window=COMPLETION_WINDOW)
+        # The provider keeps the uploaded copy; the local one holds every encoded image
+        path.unlink()
+        job = {
+            "batch_id": batch.id,
+            "input_file_id": input_file.id,
+            "provider": provider,
+            "model": model,
+            "custom_ids": custom_ids,
+            "status": batch.status,
+            "submitted_at": time.time(),
+            "collected": False,
+            **(metadata or {})
+        }
+        store.add(job)
+        print(f"Submitted batch {batch.id} with {len(custom_ids)} requests")
+        jobs.append(job)
+    return jobs
+
+def refresh_job(client, job: Dict) -> Dict:
+    """Update a job with the provider's current state of its batch"""
+    batch = client.batches.retrieve(job["batch_id"])
+    job["status"] = batch.status
+    job["output_file_id"] = getattr(batch, "output_file_id", None)
+    job["error_file_id"] = getattr(batch, "error_file_id", None)
+    counts = getattr(batch, "request_counts", None)
+    if counts is not None:
+        job["request_counts"] = {"total": counts.total, "completed": counts.completed, "failed": counts.failed}
+    return job
+
+def read_batch_results(client, file_id: Optional[str]) -> Dict[str, Dict]:
+    """Download a batch output or error file and index its lines by custom id"""
+    if not file_id:
+        return {}
+    results = {}
+    for line in client.files.content(file_id).text.splitlines():
+        if line.strip():
+            result = json.loads(line)
+            results[result["custom_id"]] = result
+    return results
+
+def result_content(result: Dict) -> Tuple[Optional[str], Optional[TokenUsage], Optional[str]]:
+    """
+    Extract the response text and token usage from one batch result line.
+
+    Returns:
+        Tuple: (content, usage, None) for a successful request, (None, None, error) otherwise
+    """
+    if result.get("error"):
+        error = result["error"]
+        return None, None, error.get("message", str(error)) if isinstance(error, dict) else str(error)
+    response = result.get("response") or {}
+    if response.get("status_code") != 200:
+        return None, None, f"HTTP {response.get('status_code')}: {response.get('body')}"
+    body = response.get("body") or {}
+    try:
+        content = body["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return None, None, "Response has no message content"
+    usage = body.get("usage") or {}
+    token_usage = TokenUsage(
+        prompt_tokens=usage.get("prompt_tokens", 0),
+        completion_tokens=usage.get("completion_tokens", 0),
+        total_tokens=usage.get("total_tokens", 0)
+    )
+    return content, token_usage, None
+
+def track_batch_usage(token_usage: TokenUsage, provider: str, model: str):
+    """Track a batch request at the discounted price and record the discount as a saving"""
+    tracker = get_token_tracker()
+    try:
+        full_cost = tracker.calculate_openai_cost(token_usage.prompt_tokens, token_usage.completion_tokens, model)
+    except ValueError:
+        full_cost = 0.0
+    tracker.track_request(APIResponse(
+        content="",
+        token_usage=token_usage,
+        cost=full_cost * BATCH_DISCOUNT,
+        provider=provider,
+        model=model
+    ))
+    tracker.record_savings("batch_api", requests=1, cost_saved=full_cost * (1 - BATCH_DISCOUNT))
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+from typing import Optional, List, Set, Dict, Tuple
+
+# inotify event masks (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+class _InotifyBackend:
+    """Minimal inotify wrapper (Linux) reporting files written or moved into a directory"""
+    name = "inotify"
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def read(self, timeout: Optional[float]) -> Tuple[Set[str], bool]:
+        """Wait up to timeout seconds for events; returns (file names, overflowed)"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set(), False
+
+        names, overflowed = set(), False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return names, overflowed
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                overflowed = True
+            elif name:
+                names.add(os.fsdecode(name))
+        return names, overflowed
+
+    def close(self):
+        os.close(self.fd)
+
+class DirectoryWatcher:
+    """Watch a directory for new files and report them in debounced batches.
+
+    Uses inotify on Linux and falls back to polling elsewhere (or when inotify is
+    unavailable). A batch is returned once no new files have arrived for `debounce`
+    seconds, so a burst of screenshots copied at once is processed together.
+    """
+    def __init__(self, directory: str, extensions: Optional[List[str]] = None, debounce: float = 2.0,
+                 poll_interval: float = 1.0, use_inotify: bool = True):
+        self.directory = directory
+        self.extensions = {ext.lower().lstrip(".") for ext in extensions} if extensions else None
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._backend = None
+
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._backend = _InotifyBackend(directory)
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable ({e}); falling back to polling", file=sys.stderr)
+
+        # Files already present are not reported; the caller handles them at startup
+        self._known: Dict[str, Tuple[int, float]] = self._scan()
+
+    @property
+    def backend(self) -> str:
+        return self._backend.name if self._backend else "polling"
+
+    def _matches(self, name: str) -> bool:
+        if self.extensions is None:
+            return True
+        return os.path.splitext(name)[1].lower().lstrip(".") in self.extensions
+
+    def _scan(self) -> Dict[str, Tuple[int, float]]:
+        """Snapshot matching files as {name: (size, mtime)}"""
+        snapshot = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and self._matches(entry.name):
+                        stat = entry.stat()
+                        snapshot[entry.name] = (stat.st_size, stat.st_mtime)
+        except FileNotFoundError:
+            pass
+        return snapshot
+
+    def _new_files(self) -> Set[str]:
+        """Names of files that are new or changed since they were last reported"""
+        current = self._scan()
+        # Forget files that were moved away so the same name can be reported again later
+        self._known = {name: info for name, info in self._known.items() if name in current}
+        return {name for name, info in current.items() if self._known.get(name) != info}
+
+    def wait_for_batch(self, timeout: Optional[float] = None) -> List[str]:
+        """
+        Block until new files arrive and the burst has settled.
+
+        Args:
+            timeout (float, optional): Give up and return an empty list after this many
+                seconds without any new file
+
+        Returns:
+            List[str]: Sorted paths of the new files that still exist
+        """
+        names: Set[str] = set()
+        deadline = time.time() + timeout if timeout is not None else None
+
+        if self._backend:
+            # Wait for the first event, then keep collecting until the directory is quiet
+            while not names:
+                remaining = None if deadline is None else max(0.0, deadline - time.time())
+                events, overflowed = self._backend.read(remaining)
+                names |= self._new_files() if overflowed else {n for n in events if self._matches(n)}
+                if not names and deadline is not None and time.time() >= deadline:
+                    return []
+            while True:
+                events, overflowed = self._backend.read(self.debounce)
+                if not events and not overflowed:
+                    break
+                names |= self._new_files() if overflowed else {n for n in events if self._matches(n)}
+        else:
+            while not names:
+                names = self._new_files()
+                if not names:
+                    if deadline is not None and time.time() >= deadline:
+                        return []
+                    time.sleep(self.poll_interval)
+            # Keep scanning until the new files (and their sizes) stop changing for the debounce period
+            pending = {n: info for n, info in self._scan().items() if n in names}
+            quiet_since = time.time()
+            while time.time() - quiet_since < self.debounce:
+                time.sleep(min(self.poll_interval, self.debounce))
+                snapshot = {n: info for n, info in self._scan().items()
+                            if n in names or self._known.get(n) != info}
+                if snapshot != pending:
+                    names |= set(snapshot)
+                    pending = snapshot
+                    quiet_since = time.time()
+
+        snapshot = self._scan()
+        existing = sorted(name for name in names if name in snapshot)
+        self._known.update({name: snapshot[name] for name in existing})
+        return [os.path.join(self.directory, name) for name in existing]
+
+    def close(self):
+        """Release the inotify file descriptor, if any"""
+        if self._backend:
+            self._backend.close()
+            self._backend = None
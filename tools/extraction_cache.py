@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import copy
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional, Dict, List
+
+DEFAULT_CACHE_FILE = Path("output") / "cache" / "extraction_cache.json"
+
+def hash_file(file_path: str) -> str:
+    """Return the MD5 hex digest of a file's contents"""
+    md5 = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+def fingerprint_text(text: str) -> str:
+    """Return a short, stable fingerprint of a prompt or other text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+class ExtractionCache:
+    """Persistent cache of parsed vision extractions.
+
+    Entries are keyed on (image content hash, prompt fingerprint, provider, model), so an
+    unchanged image is never sent to the LLM twice, and editing the prompt or switching
+    models automatically misses the old entries.
+    """
+    def __init__(self, cache_file: Optional[Path] = None):
+        self.cache_file = Path(cache_file or DEFAULT_CACHE_FILE)
+        self.entries: Dict[str, Dict] = {}
+        self.phashes: Dict[str, str] = {}  # image content hash -> perceptual hash (hex)
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+
+        if self.cache_file.exists():
+            try:
+                with open(self.cache_file, "r") as f:
+                    data = json.load(f)
+                self.entries = data.get("entries", {})
+                self.phashes = data.get("phashes", {})
+            except Exception as e:
+                print(f"Error loading extraction cache {self.cache_file}: {e}", file=sys.stderr)
+
+    @staticmethod
+    def make_key(image_hash: str, prompt_fingerprint: str, provider: str, model: str) -> str:
+        """Build the cache key for an image/prompt/model combination"""
+        return f"{image_hash}:{prompt_fingerprint}:{provider}:{model}"
+
+    def get(self, image_hash: str, prompt_fingerprint: str, provider: str, model: str) -> Optional[List[Dict]]:
+        """Return a copy of the cached activities, or None on a miss"""
+        key = self.make_key(image_hash, prompt_fingerprint, provider, model)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return copy.deepcopy(entry["activities"])
+
+    def contains(self, image_hash: str, prompt_fingerprint: str, provider: str, model: str) -> bool:
+        """Check for an entry without counting a hit or miss"""
+        key = self.make_key(image_hash, prompt_fingerprint, provider, model)
+        with self._lock:
+            return key in self.entries
+
+    def get_phash(self, image_hash: str) -> Optional[int]:
+        """Return the stored perceptual hash of an image, if known"""
+        with self._lock:
+            phash = self.phashes.get(image_hash)
+        return int(phash, 16) if phash is not None else None
+
+    def set_phash(self, image_hash: str, phash: int):
+        """Remember the perceptual hash of an image so it is computed only once"""
+        with self._lock:
+            self.phashes[image_hash] = format(phash, "016x")
+            self._dirty = True
+
+    def put(self, image_hash: str, prompt_fingerprint: str, provider: str, model: str,
+            activities: List[Dict], source_file: Optional[str] = None):
+        """Store the parsed activities for an image"""
+        key = self.make_key(image_hash, prompt_fingerprint, provider, model)
+        with self._lock:
+            self.entries[key] = {
+                "image_hash": image_hash,
+                "prompt_fingerprint": prompt_fingerprint,
+                "provider": provider,
+                "model": model,
+                "source_file": source_file,
+                "activities": copy.deepcopy(activities)
+            }
+            self._dirty = True
+
+    def save(self):
+        """Write the cache to disk if anything changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix(".tmp")
+            with open(tmp_file, "w") as f:
+                json.dump({"entries": self.entries, "phashes": self.phashes}, f)
+            os.replace(tmp_file, self.cache_file)
+            self._dirty = False
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss statistics for this run"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries)
+        }
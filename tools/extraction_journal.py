@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import threading
+from pathlib import Path
+from typing import Optional, Dict, List
+
+DEFAULT_JOURNAL_FILE = Path("output") / "extraction_journal.jsonl"
+
+class ExtractionJournal:
+    """Append-only, fsync'd journal of per-image extraction results.
+
+    Each line records the activities extracted from one image. The journal is written
+    as results arrive so a crash or Ctrl-C loses at most the image in flight; a resumed
+    run replays it and skips the images it already covers. Once the results have been
+    saved to the main store the journal is removed.
+    """
+    def __init__(self, journal_file: Optional[Path] = None):
+        self.journal_file = Path(journal_file or DEFAULT_JOURNAL_FILE)
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        """Check whether an unfinished journal is present"""
+        return self.journal_file.exists() and self.journal_file.stat().st_size > 0
+
+    def append(self, image_path: str, activities: List[Dict]):
+        """Durably record the activities extracted from an image"""
+        entry = {
+            "image": image_path,
+            "source_file": os.path.basename(image_path),
+            "activities": activities
+        }
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            self.journal_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.journal_file, "a") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def replay(self) -> List[Dict]:
+        """
+        Read the journal entries in the order they were written.
+
+        A torn final line (from a crash mid-write) is ignored. If an image was journaled
+        more than once, the latest entry wins.
+
+        Returns:
+            List[Dict]: Entries with 'image', 'source_file' and 'activities' keys
+        """
+        if not self.journal_file.exists():
+            return []
+
+        entries: Dict[str, Dict] = {}
+        with open(self.journal_file, "r") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Skipping incomplete journal entry at {self.journal_file}:{line_number}", file=sys.stderr)
+                    continue
+                entries.pop(entry["source_file"], None)
+                entries[entry["source_file"]] = entry
+        return list(entries.values())
+
+    def clear(self):
+        """Remove the journal once its results are saved in the main store"""
+        with self._lock:
+            if self.journal_file.exists():
+                self.journal_file.unlink()
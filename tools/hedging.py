@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import math
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Optional, Tuple, Awaitable, Any
+
+# Setting this environment variable to a provider name (e.g. anthropic) turns on hedging
+# and failover to that provider for every query_llm call; LLM_HEDGE_MODEL picks its model
+HEDGE_PROVIDER_ENV_VAR = "LLM_HEDGE_PROVIDER"
+HEDGE_MODEL_ENV_VAR = "LLM_HEDGE_MODEL"
+
+HEDGE_QUANTILE = 0.95  # A request still running at this latency quantile gets a backup
+LATENCY_WINDOW = 200  # Recent successful latencies kept per provider/model
+MIN_LATENCY_SAMPLES = 20  # Below this, DEFAULT_HEDGE_DELAY is used instead of the quantile
+DEFAULT_HEDGE_DELAY = 30.0  # seconds
+MIN_HEDGE_DELAY = 1.0  # seconds
+FAILURE_THRESHOLD = 5  # Consecutive failures that open a provider's circuit
+CIRCUIT_COOLDOWN = 30.0  # seconds an open circuit rejects requests before a trial request
+MAX_HEDGE_WORKERS = 32
+
+def hedge_provider_from_env() -> Optional[str]:
+    """Backup provider configured through the LLM_HEDGE_PROVIDER environment variable"""
+    return os.getenv(HEDGE_PROVIDER_ENV_VAR, "").strip().lower() or None
+
+class LatencyTracker:
+    """Rolling window of successful request latencies per provider/model"""
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[Tuple[str, str], deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, model: str, latency: float):
+        with self._lock:
+            samples = self._samples.setdefault((provider, model), deque(maxlen=self.window))
+            samples.append(latency)
+
+    def quantile(self, provider: str, model: str, q: float, min_samples: int = MIN_LATENCY_SAMPLES) -> Optional[float]:
+        """Latency at quantile q (nearest rank), or None with fewer than min_samples samples"""
+        with self._lock:
+            samples = sorted(self._samples.get((provider, model), ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, max(0, math.ceil(q * len(samples)) - 1))]
+
+class CircuitBreaker:
+    """Stop sending requests to a provider that keeps failing.
+
+    After `failure_threshold` consecutive failures the provider's circuit opens and
+    requests are routed elsewhere for `cooldown` seconds. The next request is then let
+    through as a trial: success closes the circuit, failure opens it again.
+    """
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, cooldown: float = CIRCUIT_COOLDOWN,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._clock = clock
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._trial: Dict[str, bool] = {}
+        self.opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self, provider: str) -> bool:
+        """Whether a request may be sent to the provider now"""
+        with self._lock:
+            opened_at = self._opened_at.get(provider)
+            if opened_at is None:
+                return True
+            if self._clock() - opened_at < self.cooldown or self._trial.get(provider):
+                return False
+            self._trial[provider] = True
+            return True
+
+    def state(self, provider: str) -> str:
+        """"closed", "open" or "half-open" (cooled down and waiting for a trial request)"""
+        with self._lock:
+            opened_at = self._opened_at.get(provider)
+            if opened_at is None:
+                return "closed"
+            return "open" if self._clock() - opened_at < self.cooldown else "half-open"
+
+    def record_success(self, provider: str):
+        with self._lock:
+            self._failures[provider] = 0
+            self._opened_at.pop(provider, None)
+            self._trial.pop(provider, None)
+
+    def release(self, provider: str):
+        """Forget a trial request that was cancelled before it could succeed or fail"""
+        with self._lock:
+            self._trial.pop(provider, None)
+
+    def record_failure(self, provider: str):
+        with self._lock:
+            self._failures[provider] = self._failures.get(provider, 0) + 1
+            if self._trial.pop(provider, False) or (
+                    provider not in self._opened_at and self._failures[provider] >= self.failure_threshold):
+                if provider not in self._opened_at:
+                    self.opened += 1
+                    print(f"Circuit for {provider} opened after {self._failures[provider]} consecutive failures",
+                          file=sys.stderr)
+                self._opened_at[provider] = self._clock()
+
+class RequestHedger:
+    """Cut tail latency and ride out outages by racing a backup provider.
+
+    A request goes to its primary provider. If it is still running after the primary's
+    p95 latency (see LatencyTracker), the same request is sent to the backup provider and
+    whichever succeeds first is used; the other is cancelled. A primary that fails before
+    the deadline fails over to the backup at once, and when the primary's circuit is open
+    (see CircuitBreaker) requests go straight to the backup. Callers are told which
+    provider and model answered, so results are not attributed to the wrong model.
+
+    Sync requests run on a shared thread pool. A sync request cannot be interrupted once
+    sent, so the losing request finishes in the background and its result is discarded;
+    async requests are cancelled.
+    """
+    def __init__(self, quantile: float = HEDGE_QUANTILE, min_samples: int = MIN_LATENCY_SAMPLES,
+                 default_delay: float = DEFAULT_HEDGE_DELAY, min_delay: float = MIN_HEDGE_DELAY,
+                 breaker: Optional[CircuitBreaker] = None, clock=time.monotonic):
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.latencies = LatencyTracker()
+        self.breaker = breaker or CircuitBreaker()
+        self._clock = clock
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def deadline(self, provider: str, model: str) -> float:
+        """Seconds to wait for the primary before sending the backup request"""
+        latency = self.latencies.quantile(provider, model, self.quantile, self.min_samples)
+        return self.default_delay if latency is None else max(self.min_delay, latency)
+
+    def _count(self, provider: str, model: str, *outcomes: str):
+        with self._lock:
+            stats = self._stats.setdefault(f"{provider}/{model}", {
+                "requests": 0, "hedged": 0, "backup_wins": 0, "failovers": 0, "errors": 0
+            })
+            for outcome in outcomes:
+                stats[outcome] += 1
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=MAX_HEDGE_WORKERS, thread_name_prefix="hedge")
+            return self._executor
+
+    def _timed(self, provider: str, model: str, request: Callable[[], Any]) -> Any:
+        """Run a request, feeding its latency and outcome to the tracker and breaker"""
+        start = self._clock()
+        try:
+            result = request()
+        except Exception:
+            self.breaker.record_failure(provider)
+            raise
+        self.latencies.record(provider, model, self._clock() - start)
+        self.breaker.record_success(provider)
+        return result
+
+    def call(self, provider: str, model: str, request: Callable[[], Any],
+             backup_provider: str, backup_model: str, backup_request: Callable[[], Any],
+             reserve: Optional[Callable[[], Any]] = None) -> Tuple[Any, str, str]:
+        """
+        Run a request with a hedged backup.
+
+        Args:
+            provider (str): Primary provider
+            model (str): Primary model
+            request (Callable): Sends the request to the primary and returns its result
+            backup_provider (str): Provider raced against a slow primary
+            backup_model (str): Model used on the backup provider
+            backup_request (Callable): Sends the request to the backup
+            reserve (Callable, optional): Waits for the primary's rate-limit capacity. It is
+                called only once the primary's circuit lets the request through, and before
+                the hedge deadline starts, so queueing is not mistaken for latency
+
+        Returns:
+            Tuple[Any, str, str]: The first successful result, and the provider and model
+                that returned it
+
+        Raises:
+            Exception: The primary's error if every request that was sent failed
+        """
+        self._count(provider, model, "requests")
+        if not self.breaker.allow(provider):
+            self._count(provider, model, "failovers")
+            try:
+                return self._timed(backup_provider, backup_model, backup_request), backup_provider, backup_model
+            except Exception:
+                self._count(provider, model, "errors")
+                raise
+
+        if reserve is not None:
+            reserve()
+        executor = self._get_executor()
+        primary = executor.submit(self._timed, provider, model, request)
+        pending = {primary}
+        done, _ = wait(pending, timeout=self.deadline(provider, model))
+        hedged = not done
+        # Hedge when the primary is slow, or fail over at once when it failed fast
+        if (hedged or primary.exception() is not None) and self.breaker.allow(backup_provider):
+            self._count(provider, model, "hedged" if hedged else "failovers")
+            pending.add(executor.submit(self._timed, backup_provider, backup_model, backup_request))
+
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        if other.cancel():
+                            self.breaker.release(provider if other is primary else backup_provider)
+                    if future is primary:
+                        return future.result(), provider, model
+                    if hedged:
+                        self._count(provider, model, "backup_wins")
+                    return future.result(), backup_provider, backup_model
+                if future is primary or error is None:
+                    error = future.exception()
+        self._count(provider, model, "errors")
+        raise error
+
+    async def acall(self, provider: str, model: str, request: Callable[[], Awaitable],
+                    backup_provider: str, backup_model: str, backup_request: Callable[[], Awaitable],
+                    reserve: Optional[Callable[[], Awaitable]] = None) -> Tuple[Any, str, str]:
+        """Async version of call; the requests (and reserve) return awaitables and the loser is cancelled"""
+        async def timed(name: str, model_name: str, make_request: Callable[[], Awaitable]):
+            start = self._clock()
+            try:
+                result = await make_request()
+            except asyncio.CancelledError:
+                self.breaker.release(name)
+                raise
+            except Exception:
+                self.breaker.record_failure(name)
+                raise
+            self.latencies.record(name, model_name, self._clock() - start)
+            self.breaker.record_success(name)
+            return result
+
+        self._count(provider, model, "requests")
+        if not self.breaker.allow(provider):
+            self._count(provider, model, "failovers")
+            try:
+                return await timed(backup_provider, backup_model, backup_request), backup_provider, backup_model
+            except Exception:
+                self._count(provider, model, "errors")
+                raise
+
+        if reserve is not None:
+            await reserve()
+        primary = asyncio.ensure_future(timed(provider, model, request))
+        pending = {primary}
+        done, _ = await asyncio.wait(pending, timeout=self.deadline(provider, model))
+        hedged = not done
+        if (hedged or primary.exception() is not None) and self.breaker.allow(backup_provider):
+            self._count(provider, model, "hedged" if hedged else "failovers")
+            pending.add(asyncio.ensure_future(timed(backup_provider, backup_model, backup_request)))
+
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is primary:
+                            return task.result(), provider, model
+                        if hedged:
+                            self._count(provider, model, "backup_wins")
+                        return task.result(), backup_provider, backup_model
+                    if task is primary or error is None:
+                        error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        self._count(provider, model, "errors")
+        raise error
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per primary provider/model: request, hedge, backup win, failover and error counts,
+        the hedge rate (hedged / requests) and the win rate (backup wins / hedged)"""
+        with self._lock:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+        for values in stats.values():
+            values["hedge_rate"] = values["hedged"] / values["requests"] if values["requests"] else 0.0
+            values["win_rate"] = values["backup_wins"] / values["hedged"] if values["hedged"] else 0.0
+        return stats
+
+_request_hedger = None
+_request_hedger_lock = threading.Lock()
+
+def get_request_hedger() -> RequestHedger:
+    """Get or create the global request hedger shared by all LLM calls"""
+    global _request_hedger
+    with _request_hedger_lock:
+        if _request_hedger is None:
+            _request_hedger = RequestHedger()
+        return _request_hedger
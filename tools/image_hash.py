@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+import threading
+from typing import Optional, List, Tuple, Dict
+
+# Screenshots of the same flyer (recompressed, slightly cropped, different status bar)
+# typically land within a few bits of each other; unrelated images are ~32 bits apart.
+DEFAULT_MAX_DISTANCE = 6
+
+def dhash(image_path: str, hash_size: int = 8) -> int:
+    """
+    Compute the difference hash (dHash) of an image.
+
+    The image is converted to grayscale and shrunk to (hash_size + 1) x hash_size pixels;
+    each bit records whether a pixel is brighter than its right-hand neighbour.
+
+    Args:
+        image_path (str): Path to the image file
+        hash_size (int): Width/height of the hash grid (8 gives a 64-bit hash)
+
+    Returns:
+        int: The perceptual hash as an integer
+    """
+    from PIL import Image
+
+    with Image.open(image_path) as image:
+        small = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+        pixels = small.tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count("1")
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes using Hamming distance.
+
+    Range queries only descend into children whose edge distance lies within
+    [d - max_distance, d + max_distance], so lookups touch a small fraction of the tree.
+    """
+    def __init__(self):
+        self._root: Optional[list] = None  # [hash, values, {distance: child}]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, hash_value: int, value):
+        """Insert a hash with an associated value"""
+        self._size += 1
+        if self._root is None:
+            self._root = [hash_value, [value], {}]
+            return
+
+        node = self._root
+        while True:
+            distance = hamming_distance(hash_value, node[0])
+            if distance == 0:
+                node[1].append(value)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [hash_value, [value], {}]
+                return
+            node = child
+
+    def search(self, hash_value: int, max_distance: int) -> List[Tuple[int, object]]:
+        """Return (distance, value) pairs within max_distance, closest first"""
+        if self._root is None:
+            return []
+
+        results = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(hash_value, node[0])
+            if distance <= max_distance:
+                results.extend((distance, value) for value in node[1])
+            for edge, child in node[2].items():
+                if distance - max_distance <= edge <= distance + max_distance:
+                    stack.append(child)
+
+        results.sort(key=lambda item: item[0])
+        return results
+
+class NearDuplicateIndex:
+    """Thread-safe index of perceptual hashes for finding near-duplicate images"""
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.matches = 0
+        self._tree = BKTree()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tree)
+
+    def add(self, phash: int, key: str):
+        """Add an image's perceptual hash under the given key (e.g. its content hash)"""
+        with self._lock:
+            self._tree.add(phash, key)
+
+    def find_nearest(self, phash: int, exclude: Optional[str] = None) -> Optional[Tuple[int, str]]:
+        """
+        Find the closest indexed image within max_distance.
+
+        Args:
+            phash (int): Perceptual hash to look up
+            exclude (str, optional): Key to ignore, such as the image itself
+
+        Returns:
+            Optional[Tuple[int, str]]: (distance, key) of the nearest match, or None
+        """
+        with self._lock:
+            for distance, key in self._tree.search(phash, self.max_distance):
+                if key != exclude:
+                    return distance, key
+        return None
+
+    def record_match(self):
+        """Count a near-duplicate match whose cached extraction was reused"""
+        with self._lock:
+            self.matches += 1
+
+    def get_stats(self) -> Dict:
+        """Get index size and number of near-duplicate matches reused"""
+        return {"indexed": len(self), "matches": self.matches}
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import math
+import threading
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+DEFAULT_CACHE_DIR = Path("output") / "cache" / "images"
+JPEG_QUALITY = 85
+
+# Largest size each provider actually looks at. Anything above this is downscaled on the
+# provider side anyway, so sending more pixels only costs upload time.
+PROVIDER_MAX_DIMENSION = {
+    "openai": 2048,
+    "azure": 2048,
+    "local": 2048,
+    "anthropic": 1568,
+    "gemini": 3072,
+}
+OPENAI_SHORT_SIDE = 768  # OpenAI scales the shortest side down to 768px in high detail mode
+# In low detail mode OpenAI looks at a 512x512 version of the image for a flat 85 tokens.
+# Other providers have no such mode, so low detail there just means sending this size.
+LOW_DETAIL_DIMENSION = 512
+LOW_DETAIL_TOKENS = 85
+OPENAI_STYLE_PROVIDERS = ["openai", "azure", "local"]
+
+@dataclass
+class PreparedImage:
+    """A preprocessed image ready to be base64-encoded.
+
+    Attributes:
+        data: Encoded image bytes to send
+        mime_type: MIME type of data
+        original_bytes: Size of the source file
+        original_tokens: Estimated image tokens for the source image at its own size
+        prepared_tokens: Estimated image tokens for the prepared image at the size sent
+    """
+    data: bytes
+    mime_type: str
+    original_bytes: int
+    original_tokens: int
+    prepared_tokens: int
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - len(self.data)
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.prepared_tokens
+
+def target_size(width: int, height: int, provider: str = "openai",
+                max_dimension: Optional[int] = None, detail: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Compute the size an image should be sent at for a provider.
+
+    Args:
+        width (int): Source width in pixels
+        height (int): Source height in pixels
+        provider (str): The API provider the image is sent to
+        max_dimension (int, optional): Override for the provider's longest-side limit
+        detail (str, optional): "low" to fit the image in LOW_DETAIL_DIMENSION
+
+    Returns:
+        Tuple[int, int]: Target (width, height); never larger than the source
+    """
+    limit = max_dimension or PROVIDER_MAX_DIMENSION.get(provider, 2048)
+    if detail == "low":
+        limit = min(limit, LOW_DETAIL_DIMENSION)
+    scale = min(1.0, limit / max(width, height))
+    if provider in OPENAI_STYLE_PROVIDERS:
+        scale = min(scale, OPENAI_SHORT_SIDE / min(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def estimate_image_tokens(width: int, height: int, provider: str = "openai", detail: Optional[str] = None) -> int:
+    """
+    Estimate the input tokens a provider charges for an image.
+
+    Args:
+        width (int): Image width in pixels
+        height (int): Image height in pixels
+        provider (str): The API provider
+        detail (str, optional): Image detail the image is sent at ("low" or "high")
+
+    Returns:
+        int: Estimated token count
+    """
+    if detail == "low" and provider in OPENAI_STYLE_PROVIDERS:
+        return LOW_DETAIL_TOKENS
+    return _tokens_at_size(*target_size(width, height, provider, detail=detail), provider, detail)
+
+def _tokens_at_size(width: int, height: int, provider: str, detail: Optional[str] = None) -> int:
+    # Tokens for an image sent at exactly this size
+    if detail == "low" and provider in OPENAI_STYLE_PROVIDERS:
+        return LOW_DETAIL_TOKENS
+    if provider == "anthropic":
+        return math.ceil(width * height / 750)
+    # OpenAI high detail: 85 base tokens plus 170 per 512px tile
+    tiles = math.ceil(width / 512) * math.ceil(height / 512)
+    return 85 + 170 * tiles
+
+def estimate_file_tokens(image_path: str, provider: str = "openai", detail: Optional[str] = None) -> int:
+    """Estimate the input tokens for an image file (only the image header is read)"""
+    from PIL import Image
+
+    with Image.open(image_path) as image:
+        return estimate_image_tokens(image.width, image.height, provider, detail)
+
+def prepare_image(image_path: str, provider: str = "openai", max_dimension: Optional[int] = None,
+                  quality: int = JPEG_QUALITY, cache_dir: Optional[Path] = DEFAULT_CACHE_DIR,
+                  detail: Optional[str] = None) -> PreparedImage:
+    """
+    Downscale, strip metadata from and re-encode an image before it is sent to a provider.
+
+    Results are cached on disk by content hash and settings, so each image is only
+    re-encoded once. If re-encoding would not make the image smaller, the original
+    bytes are used.
+
+    Args:
+        image_path (str): Path to the image file
+        provider (str): The API provider the image is sent to
+        max_dimension (int, optional): Override for the provider's longest-side limit
+        quality (int): JPEG quality used for re-encoding
+        cache_dir (Path, optional): Directory for cached results; None disables the cache
+        detail (str, optional): "low" to prepare the image for a low-detail request
+
+    Returns:
+        PreparedImage: The prepared image and its size/token statistics
+    """
+    from PIL import Image
+
+    with open(image_path, "rb") as f:
+        original = f.read()
+
+    with Image.open(io.BytesIO(original)) as image:
+        original_size = image.size
+        original_mime = Image.MIME.get(image.format, "image/png")
+        new_size = target_size(image.width, image.height, provider, max_dimension, detail)
+
+        cache_file = None
+        if cache_dir is not None:
+            content_hash = hashlib.md5(original).hexdigest()
+            cache_file = Path(cache_dir) / f"{content_hash}_{new_size[0]}x{new_size[1]}_q{quality}.jpg"
+
+        if cache_file is not None and cache_file.exists():
+            data = cache_file.read_bytes()
+        else:
+            # Re-encoding from pixel data drops EXIF and other metadata
+            converted = image.convert("RGB")
+            if new_size != original_size:
+                converted = converted.resize(new_size, Image.LANCZOS)
+            buffer = io.BytesIO()
+            converted.save(buffer, format="JPEG", quality=quality, optimize=True)
+            data = buffer.getvalue()
+            if cache_file is not None:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                # Write atomically so a crash or a concurrent reader never sees a partial file
+                tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp_file.write_bytes(data)
+                os.replace(tmp_file, cache_file)
+
+    # Savings are measured against sending the source image at its own size
+    original_tokens = _tokens_at_size(*original_size, provider, detail)
+    if len(data) >= len(original):
+        return PreparedImage(
+            data=original,
+            mime_type=original_mime,
+            original_bytes=len(original),
+            original_tokens=original_tokens,
+            prepared_tokens=original_tokens
+        )
+
+    return PreparedImage(
+        data=data,
+        mime_type="image/jpeg",
+        original_bytes=len(original),
+        original_tokens=original_tokens,
+        prepared_tokens=_tokens_at_size(*new_size, provider, detail)
+    )
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+import os
+import math
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Tuple
+
+DEFAULT_TILE_DIR = Path("output") / "cache" / "tiles"
+TALL_ASPECT_RATIO = 3.0  # Images more than this many widths tall are tiled
+TILE_ASPECT_RATIO = 2.0  # Each tile is this many widths tall (about one phone screen)
+TILE_OVERLAP = 0.15  # Fraction of a tile's height shared with the next tile
+
+@dataclass
+class Tile:
+    """A horizontal slice of a tall image.
+
+    Attributes:
+        path: Path of the tile image
+        index: Position of the tile, starting at 1 from the top
+        count: Number of tiles the image was split into
+        top: First pixel row of the tile in the source image
+        bottom: Pixel row just below the tile in the source image
+    """
+    path: str
+    index: int
+    count: int
+    top: int
+    bottom: int
+
+    @property
+    def label(self) -> str:
+        return f"{self.index}/{self.count}"
+
+def needs_tiling(width: int, height: int, max_aspect: float = TALL_ASPECT_RATIO) -> bool:
+    """Whether an image is tall enough to be split into tiles"""
+    return height > width * max_aspect
+
+def tile_bounds(width: int, height: int, tile_aspect: float = TILE_ASPECT_RATIO,
+                overlap: float = TILE_OVERLAP) -> List[Tuple[int, int]]:
+    """
+    Compute overlapping horizontal tiles covering an image.
+
+    Tiles are spaced evenly, so the overlap between neighbours is at least `overlap` of
+    a tile and the last tile ends exactly at the bottom of the image.
+
+    Args:
+        width (int): Image width in pixels
+        height (int): Image height in pixels
+        tile_aspect (float): Tile height as a multiple of the image width
+        overlap (float): Minimum fraction of a tile shared with the next one
+
+    Returns:
+        List[Tuple[int, int]]: (top, bottom) pixel rows of each tile, top to bottom
+    """
+    tile_height = min(height, max(1, round(width * tile_aspect)))
+    if tile_height >= height:
+        return [(0, height)]
+    max_step = max(1, tile_height - round(tile_height * overlap))
+    count = 1 + math.ceil((height - tile_height) / max_step)
+    step = (height - tile_height) / (count - 1)
+    return [(round(i * step), round(i * step) + tile_height) for i in range(count)]
+
+def split_image(image_path: str, tile_dir: Path = DEFAULT_TILE_DIR, max_aspect: float = TALL_ASPECT_RATIO,
+                tile_aspect: float = TILE_ASPECT_RATIO, overlap: float = TILE_OVERLAP) -> List[Tile]:
+    """
+    Split a tall image into overlapping horizontal tiles.
+
+    Tiles are written to tile_dir under the source image's content hash, so an image is
+    only cut once.
+
+    Args:
+        image_path (str): Path to the image file
+        tile_dir (Path): Directory the tiles are written to
+        max_aspect (float): Images at most this many widths tall are not tiled
+        tile_aspect (float): Tile height as a multiple of the image width
+        overlap (float): Minimum fraction of a tile shared with the next one
+
+    Returns:
+        List[Tile]: The tiles, top to bottom; empty if the image does not need tiling
+    """
+    from PIL import Image
+
+    with Image.open(image_path) as image:
+        if not needs_tiling(image.width, image.height, max_aspect):
+            return []
+        bounds = tile_bounds(image.width, image.height, tile_aspect, overlap)
+
+        with open(image_path, "rb") as f:
+            content_hash = hashlib.md5(f.read()).hexdigest()
+        tile_dir = Path(tile_dir)
+        tile_dir.mkdir(parents=True, exist_ok=True)
+
+        tiles = []
+        for index, (top, bottom) in enumerate(bounds, start=1):
+            tile_path = tile_dir / f"{content_hash}_{index}of{len(bounds)}_{top}-{bottom}.png"
+            if not tile_path.exists():
+                tile = image.crop((0, top, image.width, bottom))
+                if tile.mode not in ("RGB", "L"):
+                    tile = tile.convert("RGB")
+                tmp_path = tile_path.with_suffix(".tmp")
+                tile.save(tmp_path, "PNG", compress_level=1)
+                os.replace(tmp_path, tile_path)
+            tiles.append(Tile(str(tile_path), index, len(bounds), top, bottom))
+    return tiles
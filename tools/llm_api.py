@@ -1,64 +1,134 @@
 #!/usr/bin/env /workspace/tmp_windsurf/venv/bin/python3
 
-import google.generativeai as genai
-from openai import OpenAI, AzureOpenAI
-from anthropic import Anthropic
 import argparse
 import os
 from dotenv import load_dotenv
 from pathlib import Path
 import sys
 import base64
-from typing import Optional, Union, List
+import json
+import importlib
+from typing import Optional, Union, List, Dict, Iterable, Awaitable
 import mimetypes
 import time
+import threading
+import weakref
+import asyncio
 from . import token_tracker
 from .token_tracker import TokenUsage, APIResponse, get_token_tracker
+from .image_preprocess import prepare_image, OPENAI_STYLE_PROVIDERS
+from .rate_limiter import get_rate_limiter
+from .response_cache import get_response_cache, make_cache_key, cache_enabled_by_default
+from .hedging import get_request_hedger, hedge_provider_from_env, HEDGE_MODEL_ENV_VAR
 
-def load_environment():
-    """Load environment variables from .env files in order of precedence"""
+# Provider SDKs take seconds to import, so they are only imported on first use.
+# Maps module attribute -> (module to import, attribute of that module or None).
+_LAZY_IMPORTS = {
+    "genai": ("google.generativeai", None),
+    "openai": ("openai", None),
+    "anthropic": ("anthropic", None),
+    "OpenAI": ("openai", "OpenAI"),
+    "AzureOpenAI": ("openai", "AzureOpenAI"),
+    "AsyncOpenAI": ("openai", "AsyncOpenAI"),
+    "AsyncAzureOpenAI": ("openai", "AsyncAzureOpenAI"),
+    "Anthropic": ("anthropic", "Anthropic"),
+    "AsyncAnthropic": ("anthropic", "AsyncAnthropic"),
+}
+
+def __getattr__(name):
+    """Import a provider SDK (or one of its classes) when it is first accessed"""
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attribute = _LAZY_IMPORTS[name]
+    value = importlib.import_module(module_name)
+    if attribute is not None:
+        value = getattr(value, attribute)
+    globals()[name] = value
+    return value
+
+def _sdk(name: str):
+    """Look up a lazily imported SDK name from inside this module (honours patched names)"""
+    return globals()[name] if name in globals() else __getattr__(name)
+
+_environment_loaded = False
+_environment_lock = threading.Lock()
+
+def load_environment(verbose: bool = False, force: bool = False):
+    """
+    Load environment variables from .env files in order of precedence.
+    
+    Loading happens once per process; later calls return immediately unless force is set.
+    
+    Args:
+        verbose (bool): Print which files were checked and which keys they defined
+        force (bool): Load the files again even if they were already loaded
+    """
     # Order of precedence:
     # 1. System environment variables (already loaded)
     # 2. .env.local (user-specific overrides)
     # 3. .env (project defaults)
     # 4. .env.example (example configuration)
-    
-    env_files = ['.env.local', '.env', '.env.example']
-    env_loaded = False
-    
-    print("Current working directory:", Path('.').absolute(), file=sys.stderr)
-    print("Looking for environment files:", env_files, file=sys.stderr)
-    
-    for env_file in env_files:
-        env_path = Path('.') / env_file
-        print(f"Checking {env_path.absolute()}", file=sys.stderr)
-        if env_path.exists():
-            print(f"Found {env_file}, loading variables...", file=sys.stderr)
-            load_dotenv(dotenv_path=env_path)
-            env_loaded = True
-            print(f"Loaded environment variables from {env_file}", file=sys.stderr)
-            # Print loaded keys (but not values for security)
-            with open(env_path) as f:
-                keys = [line.split('=')[0].strip() for line in f if '=' in line and not line.startswith('#')]
-                print(f"Keys loaded from {env_file}: {keys}", file=sys.stderr)
-    
-    if not env_loaded:
-        print("Warning: No .env files found. Using system environment variables only.", file=sys.stderr)
-        print("Available system environment variables:", list(os.environ.keys()), file=sys.stderr)
-
-# Load environment variables at module import
-load_environment()
-
-def encode_image_file(image_path: str) -> tuple[str, str]:
+    global _environment_loaded
+    # Concurrent first callers wait here until the files are loaded, so none of them
+    # creates a client before the API keys are in the environment
+    with _environment_lock:
+        if _environment_loaded and not force:
+            return
+        
+        env_files = ['.env.local', '.env', '.env.example']
+        env_loaded = False
+        
+        if verbose:
+            print("Current working directory:", Path('.').absolute(), file=sys.stderr)
+            print("Looking for environment files:", env_files, file=sys.stderr)
+        
+        for env_file in env_files:
+            env_path = Path('.') / env_file
+            if verbose:
+                print(f"Checking {env_path.absolute()}", file=sys.stderr)
+            if env_path.exists():
+                load_dotenv(dotenv_path=env_path)
+                env_loaded = True
+                if verbose:
+                    print(f"Loaded environment variables from {env_file}", file=sys.stderr)
+                    # Print loaded keys (but not values for security)
+                    with open(env_path) as f:
+                        keys = [line.split('=')[0].strip() for line in f if '=' in line and not line.startswith('#')]
+                        print(f"Keys loaded from {env_file}: {keys}", file=sys.stderr)
+        
+        if not env_loaded and verbose:
+            print("Warning: No .env files found. Using system environment variables only.", file=sys.stderr)
+        _environment_loaded = True
+
+def encode_image_file(image_path: str, provider: Optional[str] = None, detail: Optional[str] = None) -> tuple[str, str]:
     """
     Encode an image file to base64 and determine its MIME type.
     
+    When a provider is given, the image is first downscaled to the largest size that
+    provider uses, stripped of metadata and re-encoded (see tools.image_preprocess).
+    The bytes and tokens saved are recorded on the token tracker.
+    
     Args:
         image_path (str): Path to the image file
+        provider (str, optional): The API provider the image will be sent to
+        detail (str, optional): "low" to downscale the image for a low-detail request
         
     Returns:
         tuple: (base64_encoded_string, mime_type)
     """
+    if provider is not None:
+        try:
+            prepared = prepare_image(image_path, provider=provider, detail=detail)
+            get_token_tracker().record_savings(
+                "image_preprocessing",
+                images=1,
+                bytes_saved=prepared.bytes_saved,
+                tokens_saved=prepared.tokens_saved
+            )
+            return base64.b64encode(prepared.data).decode('utf-8'), prepared.mime_type
+        except Exception as e:
+            print(f"Error preprocessing image {image_path}, sending original: {e}", file=sys.stderr)
+    
     mime_type, _ = mimetypes.guess_type(image_path)
     if not mime_type:
         mime_type = 'image/png'  # Default to PNG if type cannot be determined
@@ -68,65 +138,622 @@ def encode_image_file(image_path: str) -> tuple[str, str]:
         
     return encoded_string, mime_type
 
-def create_llm_client(provider="openai"):
+def create_llm_client(provider="openai", http_client=None, async_client=False, max_retries=None):
+    """
+    Create a new client for a provider.
+    
+    Args:
+        provider (str): The API provider
+        http_client (optional): HTTP client (connection pool) for the OpenAI/Anthropic SDKs;
+            the SDK creates its own when not given
+        async_client (bool): Create the SDK's asyncio client (AsyncOpenAI, AsyncAnthropic, ...)
+        max_retries (int, optional): Retries the OpenAI/Anthropic SDKs make on their own;
+            the SDK default when not given
+    """
+    # Only pass http_client and max_retries when given, so the SDK defaults stay untouched otherwise
+    pool = {"http_client": http_client} if http_client is not None else {}
+    if max_retries is not None:
+        pool["max_retries"] = max_retries
+    load_environment()
+    # Each branch looks up only its own SDK class, so creating a client imports one SDK
+    prefix = "Async" if async_client else ""
     if provider == "openai":
         api_key = os.getenv('OPENAI_API_KEY')
         if not api_key:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
-        return OpenAI(
-            api_key=api_key
+        return _sdk(f"{prefix}OpenAI")(
+            api_key=api_key,
+            **pool
         )
     elif provider == "azure":
         api_key = os.getenv('AZURE_OPENAI_API_KEY')
         if not api_key:
             raise ValueError("AZURE_OPENAI_API_KEY not found in environment variables")
-        return AzureOpenAI(
+        return _sdk(f"{prefix}AzureOpenAI")(
             api_key=api_key,
             api_version="2024-08-01-preview",
-            azure_endpoint="https://msopenai.openai.azure.com"
+            azure_endpoint="https://msopenai.openai.azure.com",
+            **pool
         )
     elif provider == "deepseek":
         api_key = os.getenv('DEEPSEEK_API_KEY')
         if not api_key:
             raise ValueError("DEEPSEEK_API_KEY not found in environment variables")
-        return OpenAI(
+        return _sdk(f"{prefix}OpenAI")(
             api_key=api_key,
             base_url="https://api.deepseek.com/v1",
+            **pool
         )
     elif provider == "anthropic":
         api_key = os.getenv('ANTHROPIC_API_KEY')
         if not api_key:
             raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
-        return Anthropic(
-            api_key=api_key
+        return _sdk(f"{prefix}Anthropic")(
+            api_key=api_key,
+            **pool
         )
     elif provider == "gemini":
         api_key = os.getenv('GOOGLE_API_KEY')
         if not api_key:
             raise ValueError("GOOGLE_API_KEY not found in environment variables")
+        genai = _sdk("genai")
         genai.configure(api_key=api_key)
         return genai
     elif provider == "local":
-        return OpenAI(
+        return _sdk(f"{prefix}OpenAI")(
             base_url="http://192.168.180.137:8006/v1",
-            api_key="not-needed"
+            api_key="not-needed",
+            **pool
         )
     else:
         raise ValueError(f"Unsupported provider: {provider}")
 
-def query_llm(prompt: str, client=None, model=None, provider="openai", image_path: Optional[str] = None) -> Optional[str]:
+
+# Connection pool settings for the shared clients. Connections are kept alive between
+# requests so concurrent extraction does not pay a TCP/TLS handshake per image.
+MAX_CONNECTIONS = 32
+MAX_KEEPALIVE_CONNECTIONS = 16
+KEEPALIVE_EXPIRY = 120.0  # seconds
+
+class LLMClientRegistry:
+    """Process-wide, thread-safe registry holding one client per provider.
+
+    Each OpenAI-style or Anthropic client gets a tuned keep-alive connection pool.
+    A response hook counts how many requests ran on a newly opened connection and how
+    many reused an existing one. The SDKs' own retries are turned off: requests are
+    retried by the rate limiter, whose backoff would otherwise stack on top of them.
+    """
+    def __init__(self):
+        self._clients = {}
+        self._async_clients = weakref.WeakKeyDictionary()  # event loop -> {provider: client}
+        self._lock = threading.Lock()
+        self._streams = weakref.WeakSet()  # network streams (connections) seen so far
+        self.stats = {"clients_created": 0, "client_reuses": 0, "requests": 0, "connections_opened": 0}
+
+    def get(self, provider: str = "openai"):
+        """Return the shared client for a provider, creating it on first use"""
+        with self._lock:
+            client = self._clients.get(provider)
+            if client is not None:
+                self.stats["client_reuses"] += 1
+                return client
+            client = create_llm_client(provider, http_client=self._create_http_client(provider), max_retries=0)
+            self._clients[provider] = client
+            self.stats["clients_created"] += 1
+            return client
+
+    def get_async(self, provider: str = "openai"):
+        """Return the shared async client for a provider in the running event loop.
+
+        Async connection pools are bound to the event loop they were opened in, so each
+        loop gets its own clients.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(provider)
+            if client is not None:
+                self.stats["client_reuses"] += 1
+                return client
+            client = create_llm_client(provider, http_client=self._create_http_client(provider, async_client=True),
+                                       async_client=True, max_retries=0)
+            clients[provider] = client
+            self.stats["clients_created"] += 1
+            return client
+
+    def _create_http_client(self, provider: str, async_client: bool = False):
+        """Build a keep-alive connection pool with the SDK's own httpx client class"""
+        if provider in ["openai", "azure", "deepseek", "local"]:
+            sdk = _sdk("openai")
+        elif provider == "anthropic":
+            sdk = _sdk("anthropic")
+        else:
+            return None  # Gemini manages its own transport
+        limits = type(sdk.DEFAULT_CONNECTION_LIMITS)(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY
+        )
+        if async_client:
+            return sdk.DefaultAsyncHttpxClient(limits=limits, event_hooks={"response": [self._on_async_response]})
+        return sdk.DefaultHttpxClient(limits=limits, event_hooks={"response": [self._on_response]})
+
+    def _on_response(self, response):
+        stream = response.extensions.get("network_stream")
+        with self._lock:
+            self.stats["requests"] += 1
+            if stream is None:
+                return
+            try:
+                if stream not in self._streams:
+                    self._streams.add(stream)
+                    self.stats["connections_opened"] += 1
+            except TypeError:
+                self.stats["connections_opened"] += 1  # stream cannot be tracked; assume it is new
+
+    async def _on_async_response(self, response):
+        self._on_response(response)
+
+    def get_stats(self) -> dict:
+        """Get client and connection reuse counters"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["connection_reuses"] = max(0, stats["requests"] - stats["connections_opened"])
+        return stats
+
+    def close(self):
+        """Close all clients and their connection pools"""
+        with self._lock:
+            for client in self._clients.values():
+                close = getattr(client, "close", None)
+                if callable(close):
+                    close()
+            self._clients.clear()
+            # Async clients can only be closed from their own event loop; drop them
+            self._async_clients.clear()
+
+_client_registry = LLMClientRegistry()
+
+def get_llm_client(provider: str = "openai"):
+    """Get the shared, pooled client for a provider"""
+    return _client_registry.get(provider)
+
+def get_async_llm_client(provider: str = "openai"):
+    """Get the shared, pooled async client for a provider in the running event loop"""
+    return _client_registry.get_async(provider)
+
+def get_client_stats() -> dict:
+    """Get client creation and connection reuse counters for this process"""
+    return _client_registry.get_stats()
+
+def reset_llm_clients():
+    """Close and forget all shared clients (e.g. after changing API keys, or in tests)"""
+    global _client_registry
+    _client_registry.close()
+    _client_registry = LLMClientRegistry()
+
+IMAGE_TOKEN_ESTIMATE = 1000  # rough input tokens per attached image, for rate limiting
+COMPLETION_TOKEN_ESTIMATE = 1000  # expected completion size when no max_tokens is set
+ANTHROPIC_MAX_TOKENS = 1000  # Anthropic requires max_tokens; used when the caller does not set one
+
+def estimate_request_tokens(prompt: str, image_count: int = 0, max_tokens: Optional[int] = None) -> int:
+    """Rough token count of a request (prompt, images and completion) for rate limiting"""
+    return len(prompt) // 4 + image_count * IMAGE_TOKEN_ESTIMATE + (max_tokens or COMPLETION_TOKEN_ESTIMATE)
+
+def split_schema_title(schema: Dict) -> tuple[str, Dict]:
+    """Split a JSON schema into its name (from "title") and the schema without the title"""
+    return schema.get("title", "response"), {key: value for key, value in schema.items() if key != "title"}
+
+def default_model(provider: str) -> Optional[str]:
+    """Default model for a provider"""
+    if provider == "openai":
+        return "gpt-4o"
+    elif provider == "azure":
+        return os.getenv('AZURE_OPENAI_MODEL_DEPLOYMENT', 'gpt-4o-ms')  # Get from env with fallback
+    elif provider == "deepseek":
+        return "deepseek-chat"
+    elif provider == "anthropic":
+        return "claude-3-5-sonnet-20241022"
+    elif provider == "gemini":
+        return "gemini-pro"
+    elif provider == "local":
+        return "Qwen/Qwen2.5-32B-Instruct-AWQ"
+    return None
+
+DEFAULT_TEMPERATURE = 0.7
+
+def request_temperature(provider: str, model: str) -> Optional[float]:
+    """Sampling temperature build_request sends (None when the provider default is used)"""
+    if provider in ["anthropic", "gemini"] or model == "o1":
+        return None
+    return DEFAULT_TEMPERATURE
+
+def build_request(prompt: str, provider: str, model: str, images: List[str],
+                  response_schema: Optional[Dict] = None, image_detail: Optional[str] = None,
+                  max_tokens: Optional[int] = None) -> Dict:
+    """
+    Build the keyword arguments for an OpenAI-style chat completion or an Anthropic message.
+    
+    Args:
+        prompt (str): The text prompt to send
+        provider (str): The API provider
+        model (str): The model to use
+        images (List[str]): Paths of the images to attach
+        response_schema (Dict, optional): JSON schema the response must follow
+        image_detail (str, optional): "low" or "high" image detail
+        max_tokens (int, optional): Limit on the completion tokens
+        
+    Returns:
+        Dict: Arguments for client.chat.completions.create or client.messages.create
+    """
+    messages = [{"role": "user", "content": []}]
+    
+    # Add text content
+    messages[0]["content"].append({
+        "type": "text",
+        "text": prompt
+    })
+    
+    if provider == "anthropic":
+        # Add image content if provided
+        for i, path in enumerate(images):
+            if len(images) > 1:
+                messages[0]["content"].append({"type": "text", "text": f"Image {i + 1}:"})
+            encoded_image, mime_type = encode_image_file(path, provider=provider, detail=image_detail)
+            messages[0]["content"].append({
+                "type": "image",
+                "source": {
+                    "type": "base64",
+                    "media_type": mime_type,
+                    "data": encoded_image
+                }
+            })
+        
+        kwargs = {
+            "model": model,
+            "max_tokens": max_tokens or ANTHROPIC_MAX_TOKENS,
+            "messages": messages
+        }
+        if response_schema is not None:
+            # Force a call to a tool whose input schema is the response schema
+            name, schema = split_schema_title(response_schema)
+            kwargs["tools"] = [{"name": name, "description": "Record the response", "input_schema": schema}]
+            kwargs["tool_choice"] = {"type": "tool", "name": name}
+        return kwargs
+    
+    # Add image content if provided (Azure and local servers take OpenAI-style images too)
+    if images:
+        if provider in OPENAI_STYLE_PROVIDERS:
+            for i, path in enumerate(images):
+                if len(images) > 1:
+                    messages[0]["content"].append({"type": "text", "text": f"Image {i + 1}:"})
+                encoded_image, mime_type = encode_image_file(path, provider=provider, detail=image_detail)
+                image_url = {"url": f"data:{mime_type};base64,{encoded_image}"}
+                if image_detail is not None:
+                    image_url["detail"] = image_detail
+                messages[0]["content"].append({"type": "image_url", "image_url": image_url})
+    
+    kwargs = {
+        "model": model,
+        "messages": messages,
+        "temperature": DEFAULT_TEMPERATURE,
+    }
+    
+    # Add o1-specific parameters
+    if model == "o1":
+        kwargs["response_format"] = {"type": "text"}
+        kwargs["reasoning_effort"] = "low"
+        del kwargs["temperature"]
+    
+    if max_tokens is not None:
+        # o1 counts reasoning tokens against max_completion_tokens and rejects max_tokens
+        kwargs["max_completion_tokens" if model == "o1" else "max_tokens"] = max_tokens
+    
+    if response_schema is not None:
+        if provider == "deepseek":
+            # DeepSeek only supports JSON mode, not schemas
+            kwargs["response_format"] = {"type": "json_object"}
+        else:
+            name, schema = split_schema_title(response_schema)
+            kwargs["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": name, "schema": schema, "strict": True}
+            }
+    return kwargs
+
+def handle_response(response, provider: str, model: str, thinking_time: float,
+                    response_schema: Optional[Dict] = None, estimated_tokens: Optional[int] = None) -> str:
+    """Track a completed request and return its text (see track_response)"""
+    return track_response(response, provider, model, thinking_time, response_schema, estimated_tokens).content
+
+def request_cost(calculate_cost, token_usage: TokenUsage, model: str) -> float:
+    """Cost of a request, or 0 for models without known pricing (Azure deployments, local models)"""
+    try:
+        return calculate_cost(token_usage.prompt_tokens, token_usage.completion_tokens, model)
+    except ValueError:
+        return 0.0
+
+def track_response(response, provider: str, model: str, thinking_time: float,
+                   response_schema: Optional[Dict] = None, estimated_tokens: Optional[int] = None) -> APIResponse:
+    """
+    Track token usage and cost of a completed request and extract its text.
+    
+    Args:
+        response: The SDK response object
+        provider (str): The API provider
+        model (str): The model used
+        thinking_time (float): Seconds the request took
+        response_schema (Dict, optional): Schema the request was made with
+        estimated_tokens (int, optional): Token estimate the rate limiter reserved
+        
+    Returns:
+        APIResponse: The tracked response; content is the response text (JSON text when a
+            schema was used)
+    """
+    if provider == "anthropic":
+        if response_schema is not None:
+            content = next(json.dumps(block.input) for block in response.content if block.type == "tool_use")
+        else:
+            content = response.content[0].text
+        
+        # Track token usage
+        token_usage = TokenUsage(
+            prompt_tokens=response.usage.input_tokens,
+            completion_tokens=response.usage.output_tokens,
+            total_tokens=response.usage.input_tokens + response.usage.output_tokens
+        )
+        
+        # Calculate cost
+        cost = request_cost(get_token_tracker().calculate_claude_cost, token_usage, model)
+    else:
+        content = response.choices[0].message.content
+        
+        # Track token usage
+        token_usage = TokenUsage(
+            prompt_tokens=response.usage.prompt_tokens,
+            completion_tokens=response.usage.completion_tokens,
+            total_tokens=response.usage.total_tokens,
+            reasoning_tokens=response.usage.reasoning_tokens if model.lower().startswith("o") else None  # Only checks if model starts with "o", e.g., o1, o1-preview, o1-mini, o3, etc. Can update this logic to specific models in the future.
+        )
+        
+        # Calculate cost
+        cost = request_cost(get_token_tracker().calculate_openai_cost, token_usage, model)
+    
+    if estimated_tokens is not None:
+        get_rate_limiter().record_usage(provider, model, estimated_tokens, token_usage.total_tokens)
+    
+    # Track the request
+    api_response = APIResponse(
+        content=content,
+        token_usage=token_usage,
+        cost=cost,
+        thinking_time=thinking_time,
+        provider=provider,
+        model=model
+    )
+    get_token_tracker().track_request(api_response)
+    
+    return api_response
+
+def gemini_generation_config(response_schema: Optional[Dict] = None, max_tokens: Optional[int] = None) -> Dict:
+    """Gemini generation_config for a request (empty when the defaults apply)"""
+    generation_config = {}
+    if response_schema is not None:
+        generation_config["response_mime_type"] = "application/json"
+    if max_tokens is not None:
+        generation_config["max_output_tokens"] = max_tokens
+    return generation_config
+
+def response_cache_key(prompt: str, provider: str, model: str, images: List[str],
+                       response_schema: Optional[Dict] = None, image_detail: Optional[str] = None,
+                       max_tokens: Optional[int] = None) -> str:
+    """Response cache key of a request to a provider/model"""
+    return make_cache_key(provider, model, prompt, images, request_temperature(provider, model), response_schema,
+                          image_detail, max_tokens)
+
+def lookup_cached_response(prompt: str, provider: str, model: str, images: List[str],
+                           response_schema: Optional[Dict] = None, image_detail: Optional[str] = None,
+                           max_tokens: Optional[int] = None):
+    """
+    Look a request up in the response cache and record the hit or miss on the token tracker.
+    
+    Returns:
+        tuple: (cache, key, content); cache is None if it could not be opened and content
+            is None on a miss
+    """
+    response_cache = get_response_cache()
+    if response_cache is None:
+        return None, None, None
+    key = response_cache_key(prompt, provider, model, images, response_schema, image_detail, max_tokens)
+    cached = response_cache.get(key)
+    if cached is None:
+        get_token_tracker().record_savings("response_cache", misses=1)
+        return response_cache, key, None
+    get_token_tracker().record_savings(
+        "response_cache",
+        hits=1,
+        tokens_saved=cached["total_tokens"],
+        cost_saved=cached["cost"]
+    )
+    return response_cache, key, cached["content"]
+
+def store_cached_response(response_cache, key: str, provider: str, model: str, content: Optional[str],
+                          total_tokens: int = 0, cost: float = 0.0):
+    """Store a successful response in the cache (errors are not cached)"""
+    if response_cache is None or content is None:
+        return
+    try:
+        response_cache.put(key, content, provider=provider, model=model, total_tokens=total_tokens, cost=cost)
+    except Exception as e:
+        print(f"Error writing LLM response cache: {e}", file=sys.stderr)
+
+def accepts_images(provider: str) -> bool:
+    """Whether build_request attaches images for a provider"""
+    return provider == "anthropic" or provider in OPENAI_STYLE_PROVIDERS
+
+def hedge_model_for(provider: str) -> Optional[str]:
+    """Model used on the backup provider (LLM_HEDGE_MODEL, or the provider's default model)"""
+    return os.getenv(HEDGE_MODEL_ENV_VAR) or default_model(provider)
+
+def reserves_capacity(provider: str) -> bool:
+    """Whether reserve_hedged_request reserves rate-limit capacity for a provider"""
+    return provider in ["openai", "local", "deepseek", "azure", "anthropic"]
+
+def reserve_hedged_request(provider: str, model: str, prompt: str, images: List[str],
+                           max_tokens: Optional[int] = None):
+    """
+    Wait for the primary's rate-limit capacity before a hedged request is timed.
+    
+    Time spent queued behind other requests is not provider latency: counted in, it
+    would trigger backup requests that are billed twice and push the hedge deadline up.
+    The hedger calls this only when it sends the request to the primary, which must
+    then be sent with reserved set (see reserves_capacity).
+    """
+    if reserves_capacity(provider):
+        get_rate_limiter().acquire(provider, model, estimate_request_tokens(prompt, len(images), max_tokens))
+
+async def areserve_hedged_request(provider: str, model: str, prompt: str, images: List[str],
+                                  max_tokens: Optional[int] = None):
+    """Async version of reserve_hedged_request"""
+    if reserves_capacity(provider):
+        await get_rate_limiter().aacquire(provider, model, estimate_request_tokens(prompt, len(images), max_tokens))
+
+def create_and_read_limits(api, provider: str, model: str, kwargs: Dict):
+    """
+    Send a chat completion or message and adapt the rate limiter to the response's headers.
+    
+    The rate-limit headers (x-ratelimit-*, anthropic-ratelimit-*) come with every response,
+    so the limiter learns the account's real limits from successful requests, not only
+    from throttled ones.
+    
+    Args:
+        api: client.chat.completions or client.messages
+        provider (str): The API provider
+        model (str): The model the request is sent to
+        kwargs (Dict): Arguments for api.create
+        
+    Returns:
+        The parsed SDK response
+    """
+    raw_response = api.with_raw_response.create(**kwargs)
+    get_rate_limiter().update_from_headers(provider, model, raw_response.headers)
+    return raw_response.parse()
+
+async def acreate_and_read_limits(api, provider: str, model: str, kwargs: Dict):
+    """Async version of create_and_read_limits for the providers' asyncio clients"""
+    raw_response = await api.with_raw_response.create(**kwargs)
+    get_rate_limiter().update_from_headers(provider, model, raw_response.headers)
+    return await raw_response.parse()
+
+def send_request(client, provider: str, model: str, prompt: str, images: List[str],
+                 response_schema: Optional[Dict] = None, image_detail: Optional[str] = None,
+                 max_tokens: Optional[int] = None, reserved: bool = False) -> tuple[str, int, float]:
+    """
+    Send one request to a provider within its rate limits and track its token usage.
+    
+    Capacity for the first attempt is acquired here unless the caller already reserved it.
+    
+    Returns:
+        tuple: (response text, total tokens, cost)
+        
+    Raises:
+        Exception: If the request fails or the provider is not supported
+    """
+    start_time = time.time()
+    
+    if provider in ["openai", "local", "deepseek", "azure", "anthropic"]:
+        kwargs = build_request(prompt, provider, model, images, response_schema, image_detail, max_tokens)
+        api = client.messages if provider == "anthropic" else client.chat.completions
+        
+        # Wait for rate-limit capacity; throttled and transient failures are retried with backoff
+        estimated_tokens = estimate_request_tokens(prompt, len(images), max_tokens)
+        response = get_rate_limiter().call(provider, model, estimated_tokens,
+                                           lambda: create_and_read_limits(api, provider, model, kwargs), reserved)
+        thinking_time = time.time() - start_time
+        
+        api_response = track_response(response, provider, model, thinking_time, response_schema, estimated_tokens)
+        return api_response.content, api_response.token_usage.total_tokens, api_response.cost
+        
+    elif provider == "gemini":
+        gemini_model = client.GenerativeModel(model)
+        generation_config = gemini_generation_config(response_schema, max_tokens)
+        if generation_config:
+            response = gemini_model.generate_content(prompt, generation_config=generation_config)
+        else:
+            response = gemini_model.generate_content(prompt)
+        return response.text, 0, 0.0
+    
+    raise ValueError(f"Unsupported provider: {provider}")
+
+async def asend_request(client, provider: str, model: str, prompt: str, images: List[str],
+                        response_schema: Optional[Dict] = None, image_detail: Optional[str] = None,
+                        max_tokens: Optional[int] = None, reserved: bool = False) -> tuple[str, int, float]:
+    """Async version of send_request built on the providers' asyncio clients"""
+    start_time = time.time()
+    
+    if provider in ["openai", "local", "deepseek", "azure", "anthropic"]:
+        # Reading and re-encoding images is blocking work; keep it off the event loop
+        if images:
+            kwargs = await asyncio.to_thread(build_request, prompt, provider, model, images, response_schema,
+                                             image_detail, max_tokens)
+        else:
+            kwargs = build_request(prompt, provider, model, images, response_schema, image_detail, max_tokens)
+        api = client.messages if provider == "anthropic" else client.chat.completions
+        
+        estimated_tokens = estimate_request_tokens(prompt, len(images), max_tokens)
+        response = await get_rate_limiter().acall(provider, model, estimated_tokens,
+                                                  lambda: acreate_and_read_limits(api, provider, model, kwargs), reserved)
+        thinking_time = time.time() - start_time
+        
+        api_response = track_response(response, provider, model, thinking_time, response_schema, estimated_tokens)
+        return api_response.content, api_response.token_usage.total_tokens, api_response.cost
+        
+    elif provider == "gemini":
+        gemini_model = client.GenerativeModel(model)
+        generation_config = gemini_generation_config(response_schema, max_tokens)
+        if generation_config:
+            response = await gemini_model.generate_content_async(prompt, generation_config=generation_config)
+        else:
+            response = await gemini_model.generate_content_async(prompt)
+        return response.text, 0, 0.0
+    
+    raise ValueError(f"Unsupported provider: {provider}")
+
+def query_llm(prompt: str, client=None, model=None, provider="openai", image_path: Optional[str] = None,
+              image_paths: Optional[List[str]] = None, response_schema: Optional[Dict] = None,
+              cache: Optional[bool] = None, image_detail: Optional[str] = None,
+              max_tokens: Optional[int] = None, hedge_provider: Optional[str] = None) -> Optional[str]:
     """
     Query an LLM with a prompt and optional image attachment.
     
     Args:
         prompt (str): The text prompt to send
-        client: The LLM client instance
+        client: The LLM client instance (defaults to the shared, pooled client for the provider)
         model (str, optional): The model to use. Special handling for OpenAI's o1 model:
             - Uses different response format
             - Has reasoning_effort parameter
             - Is the only model that provides reasoning_tokens in its response
         provider (str): The API provider to use
         image_path (str, optional): Path to an image file to attach
+        image_paths (List[str], optional): Paths to several image files to attach in one request.
+            When more than one image is attached, each is preceded by an "Image N:" label so
+            the prompt can refer to the images by position.
+        response_schema (Dict, optional): JSON schema the response must follow. Uses
+            structured outputs (json_schema response format) on OpenAI-style APIs, JSON mode
+            on DeepSeek, a forced tool call on Anthropic and JSON output on Gemini. The
+            schema's "title" is used as its name. The response is returned as JSON text.
+        cache (bool, optional): Serve identical requests from the on-disk response cache
+            (tools.response_cache). Defaults to the LLM_CACHE environment variable.
+        image_detail (str, optional): "low" or "high". Low detail is much cheaper: OpenAI
+            charges a flat 85 tokens per image, and other providers get a 512px image.
+        max_tokens (int, optional): Limit on the completion tokens. Anthropic requires one and
+            defaults to ANTHROPIC_MAX_TOKENS; other providers use the model's own limit.
+        hedge_provider (str, optional): Backup provider for slow or failing requests
+            (tools.hedging). A request still running at the provider's p95 latency is also
+            sent to the backup and the first response wins; while the provider's circuit
+            breaker is open, requests go straight to the backup. Image requests are not
+            hedged to a provider that cannot take images. Defaults to the
+            LLM_HEDGE_PROVIDER environment variable; pass "" to turn hedging off.
         
     Returns:
         Optional[str]: The LLM's response or None if there was an error
@@ -140,160 +767,157 @@ def query_llm(prompt: str, client=None, model=None, provider="openai", image_pat
         Reasoning tokens are only available when using OpenAI's o1 model.
         For all other models, reasoning_tokens will be None.
     """
+    # Rate limits and the Azure deployment can be configured in .env files
+    load_environment()
     if client is None:
-        client = create_llm_client(provider)
+        client = get_llm_client(provider)
     
     try:
         # Set default model
         if model is None:
-            if provider == "openai":
-                model = "gpt-4o"
-            elif provider == "azure":
-                model = os.getenv('AZURE_OPENAI_MODEL_DEPLOYMENT', 'gpt-4o-ms')  # Get from env with fallback
-            elif provider == "deepseek":
-                model = "deepseek-chat"
-            elif provider == "anthropic":
-                model = "claude-3-5-sonnet-20241022"
-            elif provider == "gemini":
-                model = "gemini-pro"
-            elif provider == "local":
-                model = "Qwen/Qwen2.5-32B-Instruct-AWQ"
-        
-        start_time = time.time()
-        
-        if provider in ["openai", "local", "deepseek", "azure"]:
-            messages = [{"role": "user", "content": []}]
-            
-            # Add text content
-            messages[0]["content"].append({
-                "type": "text",
-                "text": prompt
-            })
-            
-            # Add image content if provided
-            if image_path:
-                if provider == "openai":
-                    encoded_image, mime_type = encode_image_file(image_path)
-                    messages[0]["content"] = [
-                        {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:{mime_type};base64,{encoded_image}"}}
-                    ]
-            
-            kwargs = {
-                "model": model,
-                "messages": messages,
-                "temperature": 0.7,
-            }
-            
-            # Add o1-specific parameters
-            if model == "o1":
-                kwargs["response_format"] = {"type": "text"}
-                kwargs["reasoning_effort"] = "low"
-                del kwargs["temperature"]
-            
-            response = client.chat.completions.create(**kwargs)
-            thinking_time = time.time() - start_time
-            
-            # Track token usage
-            token_usage = TokenUsage(
-                prompt_tokens=response.usage.prompt_tokens,
-                completion_tokens=response.usage.completion_tokens,
-                total_tokens=response.usage.total_tokens,
-                reasoning_tokens=response.usage.reasoning_tokens if model.lower().startswith("o") else None  # Only checks if model starts with "o", e.g., o1, o1-preview, o1-mini, o3, etc. Can update this logic to specific models in the future.
-            )
-            
-            # Calculate cost
-            cost = get_token_tracker().calculate_openai_cost(
-                token_usage.prompt_tokens,
-                token_usage.completion_tokens,
-                model
-            )
-            
-            # Track the request
-            api_response = APIResponse(
-                content=response.choices[0].message.content,
-                token_usage=token_usage,
-                cost=cost,
-                thinking_time=thinking_time,
-                provider=provider,
-                model=model
-            )
-            get_token_tracker().track_request(api_response)
-            
-            return response.choices[0].message.content
-            
-        elif provider == "anthropic":
-            messages = [{"role": "user", "content": []}]
-            
-            # Add text content
-            messages[0]["content"].append({
-                "type": "text",
-                "text": prompt
-            })
-            
-            # Add image content if provided
-            if image_path:
-                encoded_image, mime_type = encode_image_file(image_path)
-                messages[0]["content"].append({
-                    "type": "image",
-                    "source": {
-                        "type": "base64",
-                        "media_type": mime_type,
-                        "data": encoded_image
-                    }
-                })
-            
-            response = client.messages.create(
-                model=model,
-                max_tokens=1000,
-                messages=messages
-            )
-            thinking_time = time.time() - start_time
-            
-            # Track token usage
-            token_usage = TokenUsage(
-                prompt_tokens=response.usage.input_tokens,
-                completion_tokens=response.usage.output_tokens,
-                total_tokens=response.usage.input_tokens + response.usage.output_tokens
+            model = default_model(provider)
+        
+        images = ([image_path] if image_path else []) + list(image_paths or [])
+        
+        response_cache = key = None
+        if cache_enabled_by_default() if cache is None else cache:
+            response_cache, key, content = lookup_cached_response(prompt, provider, model, images, response_schema,
+                                                                  image_detail, max_tokens)
+            if content is not None:
+                return content
+        
+        request_args = (prompt, images, response_schema, image_detail, max_tokens)
+        hedge_provider = hedge_provider_from_env() if hedge_provider is None else hedge_provider
+        if hedge_provider and hedge_provider != provider and (accepts_images(hedge_provider) or not images):
+            # Race a backup provider against slow requests and fail over when the primary is down
+            hedge_model = hedge_model_for(hedge_provider)
+            reserved = reserves_capacity(provider)
+            (content, total_tokens, cost), answered_by, answered_model = get_request_hedger().call(
+                provider, model, lambda: send_request(client, provider, model, *request_args, reserved=reserved),
+                hedge_provider, hedge_model,
+                lambda: send_request(get_llm_client(hedge_provider), hedge_provider, hedge_model, *request_args),
+                reserve=lambda: reserve_hedged_request(provider, model, prompt, images, max_tokens)
             )
+            if response_cache is not None and (answered_by, answered_model) != (provider, model):
+                # Cache the backup's answer under the backup model, never as the primary's
+                key = response_cache_key(prompt, answered_by, answered_model, images, response_schema,
+                                         image_detail, max_tokens)
+        else:
+            content, total_tokens, cost = send_request(client, provider, model, *request_args)
+            answered_by, answered_model = provider, model
+        store_cached_response(response_cache, key, answered_by, answered_model, content, total_tokens, cost)
+        return content
             
-            # Calculate cost
-            cost = get_token_tracker().calculate_claude_cost(
-                token_usage.prompt_tokens,
-                token_usage.completion_tokens,
-                model
+    except Exception as e:
+        print(f"Error querying LLM: {e}", file=sys.stderr)
+        return None
+
+async def aquery_llm(prompt: str, client=None, model=None, provider="openai", image_path: Optional[str] = None,
+                     image_paths: Optional[List[str]] = None, response_schema: Optional[Dict] = None,
+                     cache: Optional[bool] = None, image_detail: Optional[str] = None,
+                     max_tokens: Optional[int] = None, hedge_provider: Optional[str] = None) -> Optional[str]:
+    """
+    Async version of query_llm built on the providers' asyncio clients.
+    
+    Takes the same arguments and does the same rate limiting and token tracking, but
+    waits for the response (and for rate-limit capacity) without blocking the event loop.
+    
+    Args:
+        prompt (str): The text prompt to send
+        client: Async LLM client instance (defaults to the shared async client for the provider)
+        model (str, optional): The model to use
+        provider (str): The API provider to use
+        image_path (str, optional): Path to an image file to attach
+        image_paths (List[str], optional): Paths to several image files to attach in one request
+        response_schema (Dict, optional): JSON schema the response must follow
+        cache (bool, optional): Serve identical requests from the on-disk response cache
+            (defaults to the LLM_CACHE environment variable)
+        image_detail (str, optional): "low" or "high" image detail
+        max_tokens (int, optional): Limit on the completion tokens
+        hedge_provider (str, optional): Backup provider for slow or failing requests
+            (defaults to the LLM_HEDGE_PROVIDER environment variable)
+        
+    Returns:
+        Optional[str]: The LLM's response or None if there was an error
+    """
+    load_environment()
+    try:
+        if client is None:
+            client = get_async_llm_client(provider)
+        
+        if model is None:
+            model = default_model(provider)
+        
+        images = ([image_path] if image_path else []) + list(image_paths or [])
+        
+        response_cache = key = None
+        if cache_enabled_by_default() if cache is None else cache:
+            # Hashing images and SQLite lookups block; keep them off the event loop
+            response_cache, key, content = await asyncio.to_thread(
+                lookup_cached_response, prompt, provider, model, images, response_schema, image_detail, max_tokens
             )
-            
-            # Track the request
-            api_response = APIResponse(
-                content=response.content[0].text,
-                token_usage=token_usage,
-                cost=cost,
-                thinking_time=thinking_time,
-                provider=provider,
-                model=model
+            if content is not None:
+                return content
+        
+        request_args = (prompt, images, response_schema, image_detail, max_tokens)
+        hedge_provider = hedge_provider_from_env() if hedge_provider is None else hedge_provider
+        if hedge_provider and hedge_provider != provider and (accepts_images(hedge_provider) or not images):
+            hedge_model = hedge_model_for(hedge_provider)
+            reserved = reserves_capacity(provider)
+            (content, total_tokens, cost), answered_by, answered_model = await get_request_hedger().acall(
+                provider, model, lambda: asend_request(client, provider, model, *request_args, reserved=reserved),
+                hedge_provider, hedge_model,
+                lambda: asend_request(get_async_llm_client(hedge_provider), hedge_provider, hedge_model, *request_args),
+                reserve=lambda: areserve_hedged_request(provider, model, prompt, images, max_tokens)
             )
-            get_token_tracker().track_request(api_response)
-            
-            return response.content[0].text
-            
-        elif provider == "gemini":
-            model = client.GenerativeModel(model)
-            response = model.generate_content(prompt)
-            return response.text
+            if response_cache is not None and (answered_by, answered_model) != (provider, model):
+                key = response_cache_key(prompt, answered_by, answered_model, images, response_schema,
+                                         image_detail, max_tokens)
+        else:
+            content, total_tokens, cost = await asend_request(client, provider, model, *request_args)
+            answered_by, answered_model = provider, model
+        if response_cache is not None:
+            await asyncio.to_thread(store_cached_response, response_cache, key, answered_by, answered_model,
+                                    content, total_tokens, cost)
+        return content
             
     except Exception as e:
         print(f"Error querying LLM: {e}", file=sys.stderr)
         return None
 
+async def gather_limited(awaitables: Iterable[Awaitable], limit: int, return_exceptions: bool = False) -> List:
+    """
+    Await many coroutines with at most `limit` of them running at once.
+    
+    Args:
+        awaitables (Iterable[Awaitable]): Coroutines to run, e.g. aquery_llm calls
+        limit (int): Maximum number running concurrently
+        return_exceptions (bool): Return exceptions as results instead of raising the first one
+        
+    Returns:
+        List: Results in the same order as the awaitables
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+    
+    async def run(awaitable):
+        async with semaphore:
+            return await awaitable
+    
+    return await asyncio.gather(*(run(awaitable) for awaitable in awaitables), return_exceptions=return_exceptions)
+
 def main():
     parser = argparse.ArgumentParser(description='Query an LLM with a prompt')
     parser.add_argument('--prompt', type=str, help='The prompt to send to the LLM', required=True)
     parser.add_argument('--provider', choices=['openai','anthropic','gemini','local','deepseek','azure'], default='openai', help='The API provider to use')
     parser.add_argument('--model', type=str, help='The model to use (default depends on provider)')
     parser.add_argument('--image', type=str, help='Path to an image file to attach to the prompt')
+    parser.add_argument('--cache', action='store_true', help='Reuse cached responses to identical requests')
+    parser.add_argument('--max-tokens', type=int, help='Limit on the completion tokens')
+    parser.add_argument('--hedge', choices=['openai','anthropic','gemini','local','deepseek','azure'],
+                        help='Backup provider for slow or failing requests')
     args = parser.parse_args()
 
+    load_environment()
     if not args.model:
         if args.provider == 'openai':
             args.model = "gpt-4o" 
@@ -307,7 +931,8 @@ def main():
             args.model = os.getenv('AZURE_OPENAI_MODEL_DEPLOYMENT', 'gpt-4o-ms')  # Get from env with fallback
 
     client = create_llm_client(args.provider)
-    response = query_llm(args.prompt, client, model=args.model, provider=args.provider, image_path=args.image)
+    response = query_llm(args.prompt, client, model=args.model, provider=args.provider, image_path=args.image,
+                         cache=args.cache or None, max_tokens=args.max_tokens, hedge_provider=args.hedge)
     if response:
         print(response)
     else:
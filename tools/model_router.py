@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import time
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Tuple, Any, Optional
+
+@dataclass(frozen=True)
+class ModelTier:
+    """One model (optionally at a given image detail) the router can send a request to"""
+    provider: str
+    model: str
+    detail: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.model}@{self.detail}" if self.detail else self.model
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider}/{self.label}"
+
+class ModelRouter:
+    """Send each request to the cheapest tier first and escalate only when needed.
+
+    Tiers are ordered cheapest first. A request is tried on a tier and its result is
+    scored with a confidence between 0 and 1; results below `min_confidence` (or
+    requests that raise) escalate to the next tier. The last tier's result is always
+    returned, and counted as low confidence if it scores below the threshold.
+    Attempts, outcomes and latency are recorded per tier so the threshold can be tuned.
+    """
+    def __init__(self, tiers: List[ModelTier], min_confidence: float = 0.75, clock=time.perf_counter):
+        if not tiers:
+            raise ValueError("ModelRouter needs at least one tier")
+        self.tiers = list(tiers)
+        self.min_confidence = min_confidence
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stats = {
+            tier.name: {"attempts": 0, "accepted": 0, "escalated": 0, "low_confidence": 0, "errors": 0,
+                        "latency": 0.0, "max_latency": 0.0}
+            for tier in self.tiers
+        }
+
+    @property
+    def name(self) -> str:
+        """Stable identifier of the tier chain (e.g. for cache keys)"""
+        return ">".join(tier.label for tier in self.tiers)
+
+    def _record(self, tier: ModelTier, elapsed: float, outcome: str):
+        with self._lock:
+            stats = self._stats[tier.name]
+            stats["attempts"] += 1
+            stats[outcome] += 1
+            stats["latency"] += elapsed
+            stats["max_latency"] = max(stats["max_latency"], elapsed)
+
+    def run(self, attempt: Callable[[ModelTier], Tuple[Any, float]]) -> Tuple[Any, ModelTier]:
+        """
+        Run a request through the tiers.
+
+        Args:
+            attempt (Callable): Called with a tier; returns (result, confidence). Exceptions
+                raised on a lower tier escalate; on the last tier they propagate.
+
+        Returns:
+            Tuple[Any, ModelTier]: The accepted result and the tier that produced it
+        """
+        for tier in self.tiers[:-1]:
+            start = self._clock()
+            try:
+                result, confidence = attempt(tier)
+            except Exception as e:
+                print(f"{tier.name} failed ({e}); escalating")
+                self._record(tier, self._clock() - start, "errors")
+                continue
+            if confidence >= self.min_confidence:
+                self._record(tier, self._clock() - start, "accepted")
+                return result, tier
+            print(f"{tier.name} confidence {confidence:.2f} below {self.min_confidence:.2f}; escalating")
+            self._record(tier, self._clock() - start, "escalated")
+
+        tier = self.tiers[-1]
+        start = self._clock()
+        try:
+            result, confidence = attempt(tier)
+        except Exception:
+            self._record(tier, self._clock() - start, "errors")
+            raise
+        self._record(tier, self._clock() - start, "accepted" if confidence >= self.min_confidence else "low_confidence")
+        return result, tier
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per-tier attempts, outcome counts, acceptance rate and mean/max latency"""
+        with self._lock:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+        for values in stats.values():
+            attempts = values["attempts"]
+            values["success_rate"] = values["accepted"] / attempts if attempts else 0.0
+            values["mean_latency"] = values["latency"] / attempts if attempts else 0.0
+        return stats
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import importlib
+import threading
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_ENGINE = "tesseract"
+DEFAULT_MIN_CONFIDENCE = 0.8  # Mean word confidence needed to trust the recognized text
+MIN_WORDS = 10  # Fewer recognized words usually means a photo or a graphic-heavy flyer
+
+@dataclass
+class OCRResult:
+    """Text recognized in an image.
+
+    Attributes:
+        text: Recognized text, one line per line of text in the image
+        confidence: Mean word confidence between 0 and 1
+        words: Number of words recognized
+        elapsed: Seconds the engine took
+    """
+    text: str
+    confidence: float
+    words: int
+    elapsed: float = 0.0
+
+def tesseract_engine(image_path: str) -> OCRResult:
+    """Recognize text with Tesseract (needs the pytesseract package and the tesseract binary)"""
+    import pytesseract
+    from PIL import Image, ImageOps
+
+    with Image.open(image_path) as image:
+        image = ImageOps.exif_transpose(image).convert("L")
+        data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+
+    lines: Dict[Tuple[int, int, int], List[str]] = {}
+    confidences = []
+    for i, word in enumerate(data["text"]):
+        word = word.strip()
+        confidence = float(data["conf"][i])
+        if not word or confidence < 0:
+            continue
+        lines.setdefault((data["block_num"][i], data["par_num"][i], data["line_num"][i]), []).append(word)
+        confidences.append(confidence)
+    text = "\n".join(" ".join(words) for words in lines.values())
+    return OCRResult(text, sum(confidences) / len(confidences) / 100 if confidences else 0.0, len(confidences))
+
+ENGINES: Dict[str, Callable[[str], OCRResult]] = {
+    "tesseract": tesseract_engine,
+}
+
+def resolve_engine(engine: str) -> Callable[[str], OCRResult]:
+    """
+    Look up an OCR engine.
+
+    Args:
+        engine (str): A name in ENGINES, or "package.module:function" for a custom engine.
+            A custom engine takes an image path and returns an OCRResult; it is named by
+            import path so worker processes can load it too.
+
+    Returns:
+        Callable[[str], OCRResult]: The engine
+
+    Raises:
+        ValueError: If the engine cannot be found
+    """
+    if engine in ENGINES:
+        return ENGINES[engine]
+    module_name, _, function_name = engine.partition(":")
+    if not function_name:
+        raise ValueError(f"Unknown OCR engine: {engine} (use one of {', '.join(ENGINES)} or module:function)")
+    try:
+        return getattr(importlib.import_module(module_name), function_name)
+    except (ImportError, AttributeError) as e:
+        raise ValueError(f"Cannot load OCR engine {engine}: {e}")
+
+def check_engine(engine: str):
+    """Raise if an engine cannot run here (e.g. Tesseract is not installed)"""
+    resolve_engine(engine)
+    if engine == "tesseract":
+        import pytesseract
+        pytesseract.get_tesseract_version()
+
+def run_ocr(image_path: str, engine: str = DEFAULT_ENGINE) -> Tuple[Optional[OCRResult], Optional[str]]:
+    """
+    Recognize the text in one image (runs in a worker process).
+
+    Returns:
+        Tuple[Optional[OCRResult], Optional[str]]: (result, None) on success, (None, error) on failure
+    """
+    start = time.perf_counter()
+    try:
+        result = resolve_engine(engine)(image_path)
+    except Exception as e:
+        return None, str(e)
+    result.elapsed = time.perf_counter() - start
+    return result, None
+
+class OCRPool:
+    """Runs an OCR engine over images in a process pool, ahead of the LLM requests.
+
+    Images are submitted up front so recognition overlaps with the extraction of other
+    images; `get` waits for one image's result, submitting it first if needed. A result
+    is `confident` when its mean word confidence reaches `min_confidence` and it has at
+    least MIN_WORDS words.
+    """
+    def __init__(self, engine: str = DEFAULT_ENGINE, workers: Optional[int] = None,
+                 min_confidence: float = DEFAULT_MIN_CONFIDENCE):
+        check_engine(engine)
+        self.engine = engine
+        self.workers = workers or os.cpu_count() or 1
+        self.min_confidence = min_confidence
+        self._executor = None
+        self._futures: Dict[str, Future] = {}
+        self._stats = {"images": 0, "confident": 0, "errors": 0, "ocr_time": 0.0}
+        self._lock = threading.Lock()
+
+    def submit(self, image_paths: List[str]):
+        """Start recognizing images in the background"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            for image_path in image_paths:
+                if image_path not in self._futures:
+                    self._futures[image_path] = self._executor.submit(run_ocr, image_path, self.engine)
+
+    def get(self, image_path: str) -> Optional[OCRResult]:
+        """Wait for an image's OCR result (None if the engine failed on it)"""
+        self.submit([image_path])
+        with self._lock:
+            future = self._futures.pop(image_path)
+        try:
+            result, error = future.result()
+        except Exception as e:
+            result, error = None, str(e)
+        with self._lock:
+            self._stats["images"] += 1
+            if result is None:
+                self._stats["errors"] += 1
+            else:
+                self._stats["ocr_time"] += result.elapsed
+                self._stats["confident"] += self.confident(result)
+        if error is not None:
+            print(f"OCR failed for {image_path}: {error}", file=sys.stderr)
+        return result
+
+    def confident(self, result: Optional[OCRResult]) -> bool:
+        """Whether the recognized text can be used instead of the image"""
+        return result is not None and result.confidence >= self.min_confidence and result.words >= MIN_WORDS
+
+    def close(self):
+        """Stop the worker processes, cancelling images that were never asked for"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._futures.clear()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def get_stats(self) -> Dict:
+        """Images recognized, how many were confident, engine errors and total OCR time"""
+        with self._lock:
+            return dict(self._stats)
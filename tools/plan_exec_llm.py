@@ -7,6 +7,7 @@ from dotenv import load_dotenv
 import sys
 import time
 from tools.token_tracker import TokenUsage, APIResponse, get_token_tracker
+from tools.response_cache import CACHE_ENV_VAR
 from tools.llm_api import query_llm, create_llm_client
 
 STATUS_FILE = '.cursorrules'
@@ -94,10 +95,14 @@ def main():
     parser.add_argument('--file', type=str, help='Path to a file whose content should be included in the prompt', required=False)
     parser.add_argument('--provider', choices=['openai','anthropic','gemini','local','deepseek','azure'], default='openai', help='The API provider to use')
     parser.add_argument('--model', type=str, help='The model to use (default depends on provider)')
+    parser.add_argument('--cache', action='store_true', help='Reuse cached responses to identical requests')
     args = parser.parse_args()
 
     # Load environment variables
     load_environment()
+    if args.cache:
+        # query_llm consults the response cache when LLM_CACHE is set
+        os.environ[CACHE_ENV_VAR] = "1"
 
     # Read plan status
     plan_content = read_plan_status()
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import sys
+import math
+import time
+import random
+import asyncio
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Tuple, Callable, Mapping, Awaitable
+
+# Conservative per-model limits (requests and tokens per minute) used until the provider's
+# rate-limit headers report the real ones. Override with <PROVIDER>_RPM / <PROVIDER>_TPM
+# environment variables, e.g. OPENAI_RPM=5000.
+DEFAULT_LIMITS = {
+    "openai": (500, 30000),
+    "azure": (300, 50000),
+    "deepseek": (300, 100000),
+    "anthropic": (50, 40000),
+    "gemini": (60, 32000),
+    "local": (10000, 10000000),
+}
+FALLBACK_LIMITS = (60, 30000)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+DEFAULT_MAX_RETRIES = 5
+BACKOFF_BASE = 1.0  # seconds
+BACKOFF_CAP = 60.0  # seconds
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+def parse_reset(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Parse a rate-limit reset or retry-after header value into seconds from now.
+
+    Handles plain seconds ("20"), OpenAI durations ("6m0s", "1.5s", "20ms") and
+    Anthropic RFC 3339 timestamps ("2025-04-12T10:00:30Z").
+
+    Args:
+        value (str, optional): Header value
+        now (float, optional): Current wall-clock time (for timestamps)
+
+    Returns:
+        Optional[float]: Seconds until the limit resets, or None if unparseable
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(number + unit for number, unit in parts) == value:
+        return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+    try:
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if reset_at.tzinfo is None:
+            reset_at = reset_at.replace(tzinfo=timezone.utc)
+        return max(0.0, reset_at.timestamp() - (now if now is not None else time.time()))
+    except ValueError:
+        return None
+
+def parse_retry_after(headers: Mapping[str, str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Seconds a throttled response asks the client to wait before retrying.
+
+    Reads retry-after-ms, then retry-after (seconds or an HTTP date). Malformed values
+    are ignored so the caller falls back to backoff instead of failing.
+
+    Args:
+        headers (Mapping[str, str]): Response headers with lower-case names
+        now (float, optional): Current wall-clock time (for HTTP dates)
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if no usable header was sent
+    """
+    delay = None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            delay = max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+    retry_after = headers.get("retry-after")
+    if delay is None and retry_after:
+        delay = parse_reset(retry_after, now)
+        if delay is None:
+            try:
+                retry_at = parsedate_to_datetime(retry_after).timestamp()
+                delay = max(0.0, retry_at - (now if now is not None else time.time()))
+            except (TypeError, ValueError):
+                pass
+    return delay if delay is not None and math.isfinite(delay) else None
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """Exponential backoff with full jitter for the given (0-based) retry attempt"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status code of an SDK error, if it has one"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+def error_headers(error: Exception) -> Mapping[str, str]:
+    """Response headers of an SDK error, if it has any"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    return headers if headers is not None else {}
+
+class TokenBucket:
+    """Token bucket refilled continuously at capacity per minute.
+
+    Callers reserve tokens up front and the level may go negative; the returned wait is
+    how long the caller must sleep before its reservation is covered. This serves
+    waiting callers in the order they reserved.
+    """
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount tokens; returns the seconds to wait until they are available"""
+        self._refill(now)
+        # A request larger than the whole bucket could otherwise never be served
+        self.level -= min(amount, self.capacity)
+        wait = -self.level / self.rate if self.level < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+    def refund(self, amount: float, now: float):
+        """Return tokens that were reserved but not used (negative amounts take more)"""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+    def set_limit(self, per_minute: float, now: float):
+        """Adopt a new per-minute limit, e.g. as reported by the provider"""
+        self._refill(now)
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = min(self.level, self.capacity)
+
+    def sync(self, remaining: float, reset_seconds: Optional[float], now: float):
+        """Never assume more headroom than the provider says is left"""
+        self._refill(now)
+        self.level = min(self.level, remaining)
+        if remaining <= 0 and reset_seconds is not None:
+            self.block(now + reset_seconds)
+
+    def block(self, until: float):
+        """Hold back all reservations until the given monotonic time"""
+        self.blocked_until = max(self.blocked_until, until)
+
+class _ModelLimiter:
+    """Request and token buckets plus metrics for one provider/model"""
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.stats = {
+            "requests": 0,
+            "queued": 0,
+            "max_queued": 0,
+            "wait_time": 0.0,
+            "max_wait": 0.0,
+            "throttled": 0,
+            "retries": 0,
+        }
+
+class RateLimiter:
+    """Process-wide scheduler that keeps LLM requests within provider rate limits.
+
+    Each provider/model has a requests-per-minute and a tokens-per-minute bucket. A
+    request reserves one request and its estimated tokens and sleeps until both are
+    available, so concurrent callers are spread out instead of all hitting 429s. The
+    buckets adapt to the rate-limit headers returned with every response (limits,
+    remaining and reset times, retry-after on errors), and retryable failures are
+    retried with jittered exponential backoff.
+    """
+    def __init__(self, max_retries: int = DEFAULT_MAX_RETRIES, sleep: Callable[[float], None] = time.sleep):
+        self.max_retries = max_retries
+        self._sleep = sleep
+        self._limiters: Dict[Tuple[str, str], _ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, provider: str, model: str, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        """Set the request and/or token limits for a provider/model"""
+        with self._lock:
+            limiter = self._get(provider, model)
+            now = time.monotonic()
+            if rpm:
+                limiter.requests.set_limit(rpm, now)
+            if tpm:
+                limiter.tokens.set_limit(tpm, now)
+
+    def _get(self, provider: str, model: str) -> _ModelLimiter:
+        key = (provider, model)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            rpm, tpm = DEFAULT_LIMITS.get(provider, FALLBACK_LIMITS)
+            rpm = float(os.getenv(f"{provider.upper()}_RPM", rpm))
+            tpm = float(os.getenv(f"{provider.upper()}_TPM", tpm))
+            limiter = self._limiters[key] = _ModelLimiter(rpm, tpm)
+        return limiter
+
+    def _reserve(self, provider: str, model: str, estimated_tokens: int) -> Tuple[_ModelLimiter, float]:
+        """Reserve capacity for a request and return how long it has to wait"""
+        with self._lock:
+            limiter = self._get(provider, model)
+            now = time.monotonic()
+            wait = max(limiter.requests.reserve(1, now), limiter.tokens.reserve(estimated_tokens, now))
+            limiter.stats["requests"] += 1
+            if wait > 0:
+                limiter.stats["queued"] += 1
+                limiter.stats["max_queued"] = max(limiter.stats["max_queued"], limiter.stats["queued"])
+        return limiter, wait
+
+    def _waited(self, limiter: _ModelLimiter, wait: float):
+        """Record that a queued request has finished waiting"""
+        with self._lock:
+            limiter.stats["queued"] -= 1
+            limiter.stats["wait_time"] += wait
+            limiter.stats["max_wait"] = max(limiter.stats["max_wait"], wait)
+
+    def acquire(self, provider: str, model: str, estimated_tokens: int) -> float:
+        """
+        Block until a request with the estimated token count may be sent.
+
+        Args:
+            provider (str): The API provider
+            model (str): The model name
+            estimated_tokens (int): Estimated prompt plus completion tokens
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        limiter, wait = self._reserve(provider, model, estimated_tokens)
+        if wait > 0:
+            self._sleep(wait)
+            self._waited(limiter, wait)
+        return wait
+
+    async def aacquire(self, provider: str, model: str, estimated_tokens: int) -> float:
+        """Async version of acquire that waits without blocking the event loop"""
+        limiter, wait = self._reserve(provider, model, estimated_tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+            self._waited(limiter, wait)
+        return wait
+
+    def record_usage(self, provider: str, model: str, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the actual token usage of a request is known"""
+        with self._lock:
+            self._get(provider, model).tokens.refund(estimated_tokens - actual_tokens, time.monotonic())
+
+    def update_from_headers(self, provider: str, model: str, headers: Mapping[str, str]):
+        """
+        Adapt the buckets to rate-limit headers returned by the provider.
+
+        Understands OpenAI's x-ratelimit-{limit,remaining,reset}-{requests,tokens} and
+        Anthropic's anthropic-ratelimit-{requests,tokens}-{limit,remaining,reset}.
+        """
+        headers = {key.lower(): value for key, value in dict(headers).items()}
+        with self._lock:
+            limiter = self._get(provider, model)
+            now = time.monotonic()
+            for kind, bucket in (("requests", limiter.requests), ("tokens", limiter.tokens)):
+                limit = headers.get(f"x-ratelimit-limit-{kind}") or headers.get(f"anthropic-ratelimit-{kind}-limit")
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}") or headers.get(f"anthropic-ratelimit-{kind}-remaining")
+                reset = headers.get(f"x-ratelimit-reset-{kind}") or headers.get(f"anthropic-ratelimit-{kind}-reset")
+                try:
+                    if limit is not None:
+                        bucket.set_limit(float(limit), now)
+                    if remaining is not None:
+                        bucket.sync(float(remaining), parse_reset(reset), now)
+                except ValueError:
+                    continue
+
+    def retry_delay(self, provider: str, model: str, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Decide whether a failed request should be retried and after how long.
+
+        Args:
+            provider (str): The API provider
+            model (str): The model name
+            error (Exception): The error raised by the SDK
+            attempt (int): Number of retries already made
+
+        Returns:
+            Optional[float]: Seconds to wait before retrying, or None to give up
+        """
+        status = error_status(error)
+        if status not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+            return None
+
+        headers = {key.lower(): value for key, value in dict(error_headers(error)).items()}
+        self.update_from_headers(provider, model, headers)
+        retry_after = parse_retry_after(headers)
+        delay = retry_after if retry_after is not None else backoff_delay(attempt)
+
+        with self._lock:
+            limiter = self._get(provider, model)
+            limiter.stats["retries"] += 1
+            if status == 429:
+                # Hold back every caller of this model, not just the one that was throttled
+                limiter.stats["throttled"] += 1
+                limiter.requests.block(time.monotonic() + delay)
+        return delay
+
+    def call(self, provider: str, model: str, estimated_tokens: int, request: Callable[[], object],
+             reserved: bool = False):
+        """
+        Run a request within the rate limits, retrying retryable failures.
+
+        Args:
+            provider (str): The API provider
+            model (str): The model name
+            estimated_tokens (int): Estimated prompt plus completion tokens
+            request (Callable): Function that sends the request
+            reserved (bool): The caller already acquired capacity for the first attempt
+
+        Returns:
+            The request's return value
+
+        Raises:
+            Exception: The last error once it is not retryable or retries are exhausted
+        """
+        attempt = 0
+        while True:
+            if attempt or not reserved:
+                self.acquire(provider, model, estimated_tokens)
+            try:
+                return request()
+            except Exception as e:
+                delay = self.retry_delay(provider, model, e, attempt)
+                if delay is None:
+                    raise
+                # The failed attempt did not use its tokens
+                self.record_usage(provider, model, estimated_tokens, 0)
+                print(f"{provider}/{model} request failed ({e}); retrying in {delay:.1f}s", file=sys.stderr)
+                self._sleep(delay)
+                attempt += 1
+
+    async def acall(self, provider: str, model: str, estimated_tokens: int, request: Callable[[], Awaitable],
+                    reserved: bool = False):
+        """Async version of call; request returns an awaitable that sends the request"""
+        attempt = 0
+        while True:
+            if attempt or not reserved:
+                await self.aacquire(provider, model, estimated_tokens)
+            try:
+                return await request()
+            except Exception as e:
+                delay = self.retry_delay(provider, model, e, attempt)
+                if delay is None:
+                    raise
+                # The failed attempt did not use its tokens
+                self.record_usage(provider, model, estimated_tokens, 0)
+                print(f"{provider}/{model} request failed ({e}); retrying in {delay:.1f}s", file=sys.stderr)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests currently waiting for capacity, across all models"""
+        with self._lock:
+            return sum(limiter.stats["queued"] for limiter in self._limiters.values())
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Get live metrics per provider/model"""
+        with self._lock:
+            return {
+                f"{provider}/{model}": dict(limiter.stats,
+                                            rpm=limiter.requests.capacity,
+                                            tpm=limiter.tokens.capacity)
+                for (provider, model), limiter in self._limiters.items()
+            }
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """Get or create the global rate limiter shared by all LLM calls"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import copy
+import threading
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, List, Tuple
+
+from .extraction_cache import hash_file
+from .response_parser import PARSER_VERSION, parse_activities_response
+
+DEFAULT_RAW_DIR = Path("output") / "raw_responses"
+MANIFEST_FILE = "manifest.json"
+RESPONSE_SUFFIX = "_response.json"
+# Below this many responses, starting a process pool costs more than it saves
+PARALLEL_THRESHOLD = 64
+
+def parse_raw_file(raw_file: str) -> Tuple[Optional[List[Dict]], Optional[str]]:
+    """
+    Parse one stored raw response (runs in a worker process).
+
+    Args:
+        raw_file (str): Path to the raw response file
+
+    Returns:
+        Tuple[Optional[List[Dict]], Optional[str]]: (activities, None) on success, (None, error) on failure
+    """
+    try:
+        with open(raw_file, "r") as f:
+            response = f.read()
+        return parse_activities_response(response), None
+    except Exception as e:
+        return None, str(e)
+
+class RawResponseStore:
+    """Directory of raw LLM responses with a manifest index.
+
+    The manifest records, per response file, the source image, content hash, the
+    fingerprint of the prompt that produced it, the parser version that last parsed it,
+    the parse status and the parsed activities. A replay only re-parses responses that
+    are new, whose content changed, or that were parsed by an older PARSER_VERSION;
+    the rest are served from the manifest.
+    """
+    def __init__(self, raw_dir: Optional[Path] = None):
+        self.raw_dir = Path(raw_dir or DEFAULT_RAW_DIR)
+        self.manifest_file = self.raw_dir / MANIFEST_FILE
+        self.entries: Dict[str, Dict] = {}
+        self.reparsed = 0  # responses parsed by the last replay
+        self.reused = 0  # responses served from the manifest by the last replay
+        self._dirty = False
+        self._lock = threading.Lock()
+
+        if self.manifest_file.exists():
+            try:
+                with open(self.manifest_file, "r") as f:
+                    self.entries = json.load(f).get("entries", {})
+            except Exception as e:
+                print(f"Error loading raw response manifest {self.manifest_file}: {e}", file=sys.stderr)
+
+    def save(self, image_path: str, response: str, prompt_fingerprint: Optional[str] = None) -> Path:
+        """
+        Store a raw response and index it in the manifest.
+
+        Args:
+            image_path (str): Path to the image the response belongs to
+            response (str): Raw response text
+            prompt_fingerprint (str, optional): Fingerprint of the prompt that produced it
+
+        Returns:
+            Path: Path of the stored response file
+        """
+        image_name = os.path.basename(image_path)
+        file_name = os.path.splitext(image_name)[0] + RESPONSE_SUFFIX
+        raw_file = self.raw_dir / file_name
+        with self._lock:
+            self.raw_dir.mkdir(parents=True, exist_ok=True)
+            with open(raw_file, "w") as f:
+                f.write(response)
+            self.entries[file_name] = {
+                "file": file_name,
+                "image": image_name,
+                "prompt_fingerprint": prompt_fingerprint,
+                "status": "unparsed"
+            }
+            self._dirty = True
+        return raw_file
+
+    def flush(self):
+        """Write the manifest to disk if anything changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self.raw_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.manifest_file.with_suffix(".tmp")
+            with open(tmp_file, "w") as f:
+                json.dump({"entries": self.entries}, f)
+            os.replace(tmp_file, self.manifest_file)
+            self._dirty = False
+
+    def _refresh_entry(self, file_name: str) -> Dict:
+        """Bring a manifest entry up to date with the file on disk"""
+        raw_file = self.raw_dir / file_name
+        entry = self.entries.get(file_name)
+        if entry is None:
+            # Responses saved before the manifest existed; their image was assumed to be a jpg
+            entry = {
+                "file": file_name,
+                "image": file_name[:-len(RESPONSE_SUFFIX)] + ".jpg",
+                "prompt_fingerprint": None,
+                "status": "unparsed"
+            }
+            self.entries[file_name] = entry
+
+        stat = raw_file.stat()
+        if entry.get("size") != stat.st_size or entry.get("mtime_ns") != stat.st_mtime_ns:
+            content_hash = hash_file(str(raw_file))
+            if content_hash != entry.get("hash"):
+                entry["hash"] = content_hash
+                entry["parser_version"] = None
+            entry["size"] = stat.st_size
+            entry["mtime_ns"] = stat.st_mtime_ns
+            self._dirty = True
+        return entry
+
+    def replay(self, workers: Optional[int] = None) -> List[Dict]:
+        """
+        Return the activities from every stored response, re-parsing only what changed.
+
+        Args:
+            workers (int, optional): Number of parser processes (defaults to the CPU count)
+
+        Returns:
+            List[Dict]: Activities in response-file order, each tagged with its source image
+        """
+        file_names = sorted(
+            path.name for path in self.raw_dir.glob(f"*{RESPONSE_SUFFIX}")
+        ) if self.raw_dir.exists() else []
+
+        with self._lock:
+            # Forget responses that were deleted
+            for file_name in set(self.entries) - set(file_names):
+                del self.entries[file_name]
+                self._dirty = True
+
+            entries = [self._refresh_entry(file_name) for file_name in file_names]
+            stale = [entry for entry in entries if entry.get("parser_version") != PARSER_VERSION]
+            self.reparsed = len(stale)
+            self.reused = len(entries) - len(stale)
+
+            paths = [str(self.raw_dir / entry["file"]) for entry in stale]
+            workers = workers or os.cpu_count() or 1
+            if workers > 1 and len(paths) >= PARALLEL_THRESHOLD:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(parse_raw_file, paths, chunksize=max(1, len(paths) // (workers * 4))))
+            else:
+                results = [parse_raw_file(path) for path in paths]
+
+            for entry, (activities, error) in zip(stale, results):
+                entry["parser_version"] = PARSER_VERSION
+                entry["status"] = "ok" if error is None else "error"
+                entry["activities"] = activities
+                entry["error"] = error
+                self._dirty = True
+
+            all_activities = []
+            for entry in entries:
+                if entry["status"] != "ok":
+                    print(f"Could not parse {entry['file']}: {entry.get('error')}")
+                    continue
+                for activity in copy.deepcopy(entry["activities"]):
+                    if isinstance(activity, dict):
+                        activity["source_file"] = entry["image"]
+                        all_activities.append(activity)
+
+        self.flush()
+        return all_activities
+
+    def get_stats(self) -> Dict:
+        """Get manifest size and parse counts"""
+        statuses = [entry.get("status") for entry in self.entries.values()]
+        return {
+            "responses": len(self.entries),
+            "ok": statuses.count("ok"),
+            "errors": statuses.count("error"),
+            "reparsed": self.reparsed,
+            "reused": self.reused
+        }
+
+_raw_store = None
+_raw_store_lock = threading.Lock()
+
+def get_raw_store(raw_dir: Optional[Path] = None) -> RawResponseStore:
+    """Get or create the global raw response store"""
+    global _raw_store
+    with _raw_store_lock:
+        if _raw_store is None or (raw_dir is not None and Path(raw_dir) != _raw_store.raw_dir):
+            _raw_store = RawResponseStore(raw_dir)
+        return _raw_store
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional, Dict, List
+
+from .extraction_cache import hash_file
+
+DEFAULT_CACHE_DB = Path("output") / "cache" / "llm_responses.sqlite3"
+DEFAULT_TTL = 7 * 24 * 3600  # seconds
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Setting this environment variable to 1/true/yes turns the cache on for every query_llm call
+CACHE_ENV_VAR = "LLM_CACHE"
+
+def cache_enabled_by_default() -> bool:
+    """Whether the response cache is enabled through the LLM_CACHE environment variable"""
+    return os.getenv(CACHE_ENV_VAR, "").strip().lower() in ("1", "true", "yes", "on")
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize line endings and surrounding/trailing whitespace so cosmetic edits still hit"""
+    return "\n".join(line.rstrip() for line in prompt.strip().splitlines())
+
+def make_cache_key(provider: str, model: str, prompt: str, images: Optional[List[str]] = None,
+                   temperature: Optional[float] = None, response_schema: Optional[Dict] = None,
+                   image_detail: Optional[str] = None, max_tokens: Optional[int] = None) -> str:
+    """
+    Build the cache key for a request.
+
+    Args:
+        provider (str): The API provider
+        model (str): The model used
+        prompt (str): The text prompt (normalized before hashing)
+        images (List[str], optional): Paths of attached images; their contents are hashed
+        temperature (float, optional): Sampling temperature sent with the request
+        response_schema (Dict, optional): JSON schema the response must follow
+        image_detail (str, optional): Image detail the images are sent at
+        max_tokens (int, optional): Limit on the completion tokens
+
+    Returns:
+        str: SHA-256 hex digest identifying the request
+    """
+    request = {
+        "provider": provider,
+        "model": model,
+        "prompt": normalize_prompt(prompt),
+        "images": [hash_file(path) for path in images or []],
+        "temperature": temperature,
+        "response_schema": response_schema,
+    }
+    if image_detail is not None:
+        request["image_detail"] = image_detail
+    if max_tokens is not None:
+        request["max_tokens"] = max_tokens
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """SQLite cache of LLM responses with a TTL and size-capped LRU eviction.
+
+    Each row stores the response text with the tokens and cost of the request that
+    produced it, so a hit can report what it saved. Entries older than `ttl` seconds are
+    treated as misses and purged; when the stored responses exceed `max_bytes`, the least
+    recently used ones are evicted.
+    """
+    def __init__(self, db_file: Optional[Path] = None, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES, clock=time.time):
+        self.db_file = Path(db_file or DEFAULT_CACHE_DB)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_file), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " provider TEXT, model TEXT,"
+            " content TEXT NOT NULL,"
+            " total_tokens INTEGER NOT NULL DEFAULT 0,"
+            " cost REAL NOT NULL DEFAULT 0,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up a cached response and mark it as recently used.
+
+        Returns:
+            Optional[Dict]: {"content", "total_tokens", "cost"} on a hit, None on a miss
+        """
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, total_tokens, cost, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[3] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return {"content": row[0], "total_tokens": row[1], "cost": row[2]}
+
+    def put(self, key: str, content: str, provider: Optional[str] = None, model: Optional[str] = None,
+            total_tokens: int = 0, cost: float = 0.0):
+        """Store a response, then purge expired entries and evict down to max_bytes"""
+        now = self._clock()
+        size = len(content.encode("utf-8")) + len(key)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (key, provider, model, content, total_tokens, cost, size, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, content, total_tokens or 0, cost or 0.0, size, now, now)
+            )
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self.evictions += len(victims)
+
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss statistics for this run and the cache size"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size
+        }
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache(db_file: Optional[Path] = None) -> Optional[ResponseCache]:
+    """Get or create the global response cache (None if the database cannot be opened)"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None or (db_file is not None and Path(db_file) != _response_cache.db_file):
+            try:
+                _response_cache = ResponseCache(db_file)
+            except sqlite3.Error as e:
+                print(f"Error opening LLM response cache: {e}", file=sys.stderr)
+                return None
+        return _response_cache
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+import re
+import json
+from typing import Dict, List
+
+# Bump whenever parse_activities_response changes behaviour; stored raw responses
+# parsed by an older version are re-parsed on the next --from-raw replay.
+PARSER_VERSION = 3
+
+_decoder = json.JSONDecoder()
+_CODE_FENCE = re.compile(r'```(?:json)?\s*(.*?)```', re.DOTALL)
+
+def load_json_response(response: str):
+    """
+    Load the JSON value from an LLM response, tolerating text around it.
+
+    The response is parsed as-is first. Otherwise the contents of a ```json code fence
+    (or the whole response) are searched for the outermost JSON value: the first '{' or
+    '[' that starts one, decoded with JSONDecoder.raw_decode, which stops at the end of
+    that value so prose after it is ignored. Braces in prose ("{see below}") are skipped,
+    but a value that starts decoding and then breaks off, such as a response cut short
+    by the token limit, is an error rather than a shorter nested value.
+
+    Args:
+        response (str): Raw text returned by the LLM
+
+    Returns:
+        The decoded JSON value
+
+    Raises:
+        ValueError: If the response contains no complete JSON object or array
+    """
+    try:
+        return json.loads(response)
+    except json.JSONDecodeError:
+        pass
+
+    fence = _CODE_FENCE.search(response)
+    text = fence.group(1) if fence else response
+    start = 0
+    while True:
+        starts = [i for i in (text.find("{", start), text.find("[", start)) if i != -1]
+        if not starts:
+            raise ValueError("No JSON object or array found in response")
+        start = min(starts)
+        try:
+            value, _ = _decoder.raw_decode(text, start)
+            return value
+        except json.JSONDecodeError as e:
+            if text[start + 1:e.pos].strip():
+                raise ValueError(f"Incomplete JSON in response: {e}") from e
+            start += 1
+
+def parse_activities_response(response: str) -> List[Dict]:
+    """
+    Parse the activities out of a raw LLM response.
+
+    Args:
+        response (str): Raw text returned by the LLM
+
+    Returns:
+        List[Dict]: List of activity dictionaries
+
+    Raises:
+        ValueError: If no usable JSON is found in the response
+    """
+    data = load_json_response(response)
+
+    # Handle both single objects and arrays
+    if isinstance(data, dict):
+        # Check if it has an 'activities' field with an array
+        if 'activities' in data and isinstance(data['activities'], list):
+            return data['activities']  # Return the activities array directly
+        return [data]  # Convert single object to a list for consistent handling
+    elif isinstance(data, list):
+        return data
+    raise ValueError("Unexpected JSON structure")
@@ -9,6 +9,7 @@ from typing import Optional, Dict, List
 from pathlib import Path
 import uuid
 import sys
+import threading
 from tabulate import tabulate
 from datetime import datetime
 
@@ -44,6 +45,8 @@ class TokenTracker:
         self.session_id = session_id or datetime.now().strftime("%Y-%m-%d")
         self.session_start = time.time()
         self.requests: List[Dict] = []
+        self.savings: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.RLock()  # Requests are tracked from concurrent workers
         
         # Create logs directory if it doesn't exist
         self._logs_dir = logs_dir or Path("token_logs")
@@ -59,6 +62,7 @@ class TokenTracker:
                     data = json.load(f)
                     self.session_start = data.get('start_time', self.session_start)
                     self.requests = data.get('requests', [])
+                    self.savings = data.get('savings', {})
             except Exception as e:
                 print(f"Error loading existing session file: {e}", file=sys.stderr)
         
@@ -66,14 +70,16 @@ class TokenTracker:
     
     def _save_session(self):
         """Save current session data to file"""
-        session_data = {
-            "session_id": self.session_id,
-            "start_time": self.session_start,
-            "requests": self.requests,
-            "summary": self.get_session_summary()
-        }
-        with open(self._session_file, "w") as f:
-            json.dump(session_data, f, indent=2)
+        with self._lock:
+            session_data = {
+                "session_id": self.session_id,
+                "start_time": self.session_start,
+                "requests": self.requests,
+                "savings": self.savings,
+                "summary": self.get_session_summary()
+            }
+            with open(self._session_file, "w") as f:
+                json.dump(session_data, f, indent=2)
     
     @property
     def logs_dir(self) -> Path:
@@ -108,13 +114,14 @@ class TokenTracker:
                     data = json.load(f)
                     self.session_start = data.get('start_time', self.session_start)
                     self.requests = data.get('requests', [])
+                    self.savings = data.get('savings', {})
             except Exception as e:
                 print(f"Error loading existing session file: {e}", file=sys.stderr)
     
     @staticmethod
     def calculate_openai_cost(prompt_tokens: int, completion_tokens: int, model: str) -> float:
         """Calculate OpenAI API cost based on model and token usage"""
-        # Only support o1, gpt-4o, and deepseek-chat models
+        # Only support o1, gpt-4o, gpt-4o-mini, and deepseek-chat models
         if model == "o1":
             # o1 pricing per 1M tokens
             INPUT_PRICE_PER_M = 15.0
@@ -123,12 +130,16 @@ class TokenTracker:
             # gpt-4o pricing per 1M tokens
             INPUT_PRICE_PER_M = 10.0
             OUTPUT_PRICE_PER_M = 30.0
+        elif model == "gpt-4o-mini":
+            # gpt-4o-mini pricing per 1M tokens
+            INPUT_PRICE_PER_M = 0.15
+            OUTPUT_PRICE_PER_M = 0.6
         elif model == "deepseek-chat":
             # DeepSeek pricing per 1M tokens
             INPUT_PRICE_PER_M = 0.2  # $0.20 per million input tokens
             OUTPUT_PRICE_PER_M = 0.2  # $0.20 per million output tokens
         else:
-            raise ValueError(f"Unsupported OpenAI model for cost calculation: {model}. Only o1, gpt-4o, and deepseek-chat are supported.")
+            raise ValueError(f"Unsupported OpenAI model for cost calculation: {model}. Only o1, gpt-4o, gpt-4o-mini, and deepseek-chat are supported.")
         
         input_cost = (prompt_tokens / 1_000_000) * INPUT_PRICE_PER_M
         output_cost = (completion_tokens / 1_000_000) * OUTPUT_PRICE_PER_M
@@ -168,8 +179,21 @@ class TokenTracker:
             "cost": response.cost,
             "thinking_time": response.thinking_time
         }
-        self.requests.append(request_data)
-        self._save_session()
+        with self._lock:
+            self.requests.append(request_data)
+            self._save_session()
+    
+    def record_savings(self, category: str, **amounts: float):
+        """Accumulate savings (bytes, tokens, cost, time, ...) under a category.
+        
+        Example:
+            tracker.record_savings("image_preprocessing", images=1, bytes_saved=120000, tokens_saved=1190)
+        """
+        with self._lock:
+            totals = self.savings.setdefault(category, {})
+            for name, amount in amounts.items():
+                totals[name] = totals.get(name, 0) + amount
+            self._save_session()
     
     def get_session_summary(self) -> Dict:
         """Get summary of token usage and costs for the current session"""
@@ -201,6 +225,7 @@ class TokenTracker:
             "total_cost": total_cost,
             "total_thinking_time": total_thinking_time,
             "provider_stats": provider_stats,
+            "savings": self.savings,
             "session_duration": time.time() - self.session_start
         }
 
@@ -293,6 +318,21 @@ def display_session_summary(session_data: Dict, show_requests: bool = False):
         tablefmt="simple"
     ))
     
+    # Print savings (image preprocessing, caches, ...) if any were recorded
+    savings = summary.get("savings", {})
+    if savings:
+        print("\nSavings")
+        print("=======")
+        savings_data = []
+        for category, amounts in savings.items():
+            for name, amount in amounts.items():
+                savings_data.append([category, name, f"{amount:,.6g}"])
+        print(tabulate(
+            savings_data,
+            headers=["Category", "Metric", "Total"],
+            tablefmt="simple"
+        ))
+    
     # Print individual requests if requested
     if show_requests:
         print("\nIndividual Requests")